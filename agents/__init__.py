@@ -1,8 +1,9 @@
+from .registry import AgentRegistry, agent_registry
 from .discovery_agent import DiscoveryPhaseAgent
-from .architect_agent import architect_agent
-from .researcher_agent import researcher_agent
-from .reviewer_agent import reviewer_agent
-from .writer_agent import writer_agent
-from .senior_pm_agent import create_senior_pm_for
+from .architect_agent import create_architect_agent, create_architect_reviser
+from .researcher_agent import create_researcher_agent
+from .reviewer_agent import create_reviewer_agent, create_flow_analyzer
+from .writer_agent import create_writer_agent
+from .senior_pm_agent import create_senior_pm_for, stream_audit
 
-__all__ = ['DiscoveryPhaseAgent', 'architect_agent', 'researcher_agent', 'reviewer_agent', 'writer_agent', 'create_senior_pm_for']
\ No newline at end of file
+__all__ = ['AgentRegistry', 'agent_registry', 'DiscoveryPhaseAgent', 'create_architect_agent', 'create_architect_reviser', 'create_researcher_agent', 'create_reviewer_agent', 'create_flow_analyzer', 'create_writer_agent', 'create_senior_pm_for', 'stream_audit']
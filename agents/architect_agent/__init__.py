@@ -1,3 +1,5 @@
-from .agent import architect_agent
+from .agent import create_architect_agent
+from .reviser import ArchitectReviser, create_architect_reviser
+from .sections import BlueprintDocument, Section, SectionPatch, parse_patches
 
-__all__ = ['architect_agent']
+__all__ = ['create_architect_agent', 'ArchitectReviser', 'create_architect_reviser', 'BlueprintDocument', 'Section', 'SectionPatch', 'parse_patches']
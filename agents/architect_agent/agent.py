@@ -1,12 +1,28 @@
+from google.adk.agents.callback_context import CallbackContext
 from google.adk.agents.llm_agent import Agent
-from utils import MODEL
-from utils.load_prompt import load_prompt
-from utils import AgentInfo
-
-architect_agent = Agent(
-    model=MODEL,
-    name=AgentInfo.ARCHITECT_AGENT['name'],
-    description=AgentInfo.ARCHITECT_AGENT['description'],
-    instruction=load_prompt(AgentInfo.ARCHITECT_AGENT['instruction_path']),
-    output_key=AgentInfo.ARCHITECT_AGENT['output_key'],
-)
+from utils import create_model
+from utils import prompt_registry
+from utils import AgentInfo, blob_store
+from agents.registry import agent_registry
+from .sections import BlueprintDocument
+
+
+def store_sections(callback_context: CallbackContext) -> None:
+    """初稿完成后把蓝图按章节写入 state，供终稿 (ArchitectReviser) 按章节编号修订"""
+    text = blob_store.resolve(callback_context.state.get(AgentInfo.ARCHITECT_AGENT['output_key']))
+    if text:
+        callback_context.state[AgentInfo.ARCHITECT_AGENT['sections_key']] = BlueprintDocument.parse(text).to_state()
+
+
+def create_architect_agent() -> Agent:
+    return Agent(
+        model=create_model(AgentInfo.ARCHITECT_AGENT),
+        name=AgentInfo.ARCHITECT_AGENT['name'],
+        description=AgentInfo.ARCHITECT_AGENT['description'],
+        instruction=prompt_registry.instruction(AgentInfo.ARCHITECT_AGENT['instruction_path']),
+        output_key=AgentInfo.ARCHITECT_AGENT['output_key'],
+        after_agent_callback=store_sections,
+    )
+
+
+agent_registry.register(AgentInfo.ARCHITECT_AGENT, create_architect_agent)
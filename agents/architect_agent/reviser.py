@@ -0,0 +1,100 @@
+from typing import AsyncGenerator
+
+from google.adk.agents import BaseAgent, InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from utils import AgentInfo, blob_store, create_model, logger, metrics, prompt_registry, tracer
+from agents.registry import agent_registry
+from .sections import BlueprintDocument, has_patch_markers, looks_like_rewrite, parse_patches
+
+
+class ArchitectReviser(BaseAgent):
+    """
+    Step 2.4 终稿：不再让 Architect 重新生成整份蓝图，
+    而是请模型针对审计意见与调研情报输出章节级补丁 (见 sections.parse_patches)，在本地合并进初稿。
+    输出 token 与审计意见的条数成正比，与蓝图长度无关。
+
+    合并后的蓝图以本智能体名义产出一条事件：正文供后续智能体在对话历史中读取，
+    state_delta 同时更新 output_key 与章节列表 (sections_key)。
+    """
+    model: BaseLlm
+    instruction_path: str
+    output_key: str
+    sections_key: str
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = blob_store.resolve_mapping(ctx.session.state)
+        draft = BlueprintDocument.from_state(state.get(self.sections_key), state.get(self.output_key) or "")
+        instruction = prompt_registry.render(
+            self.instruction_path,
+            blueprint_sections=draft.annotated(),
+            reviewer_output=state.get(AgentInfo.REVIEWER_AGENT["output_key"]) or "（无）",
+            researcher_output=state.get(AgentInfo.RESEARCHER_AGENT["output_key"]) or "（无）",
+        )
+        request = LlmRequest(
+            contents=[types.Content(role="user", parts=[types.Part(text="请按补丁格式输出蓝图修订。")])],
+            config=types.GenerateContentConfig(system_instruction=instruction),
+        )
+        text = ""
+        async for response in self.model.generate_content_async(request):
+            if response.content and response.content.parts:
+                text += "".join(part.text for part in response.content.parts if part.text and not part.thought)
+
+        revised = self._revise(draft, text)
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            content=types.Content(role="model", parts=[types.Part(text=revised.render())]),
+            actions=EventActions(state_delta={
+                self.output_key: revised.render(),
+                self.sections_key: revised.to_state(),
+            }),
+        )
+
+    def _revise(self, draft: BlueprintDocument, text: str) -> BlueprintDocument:
+        """合并补丁；模型未按补丁格式输出时，只有回复像一份完整蓝图才视为整份重写，否则保留初稿"""
+        span = tracer.current()
+        if not has_patch_markers(text):
+            if not text.strip():
+                logger.info(f"[{self.name}] 修订模型没有输出，保留初稿")
+                return draft
+            if not looks_like_rewrite(text, draft):
+                # 例如只回了一句说明或半截内容，不能拿它覆盖整份蓝图
+                logger.warning(f"[{self.name}] 修订模型既未按补丁格式输出，也不像完整蓝图，保留初稿")
+                metrics.increment("architect.full_rewrite", outcome="rejected")
+                return draft
+            logger.info(f"[{self.name}] 修订模型未按补丁格式输出，按整份重写处理")
+            metrics.increment("architect.full_rewrite", outcome="applied")
+            if span is not None:
+                span.set(full_rewrite=True)
+            return BlueprintDocument.parse(text)
+
+        revised, applied, rejected = draft.apply(parse_patches(text))
+        metrics.increment("architect.patches", len(applied), outcome="applied")
+        if rejected:
+            logger.info(f"[{self.name}] 忽略引用了不存在章节的补丁: {[patch.section_id for patch in rejected]}")
+            metrics.increment("architect.patches", len(rejected), outcome="rejected")
+        if span is not None:
+            span.set(patches=len(applied), rejected_patches=len(rejected))
+        logger.info(f"[{self.name}] 已合并 {len(applied)} 个章节补丁")
+        return revised
+
+
+def create_architect_reviser() -> ArchitectReviser:
+    config = AgentInfo.ARCHITECT_REVISER_AGENT
+    return ArchitectReviser(
+        name=config['name'],
+        description=config['description'],
+        model=create_model(config),
+        instruction_path=config['instruction_path'],
+        output_key=config['output_key'],
+        sections_key=config['sections_key'],
+    )
+
+
+agent_registry.register(AgentInfo.ARCHITECT_REVISER_AGENT, create_architect_reviser)
@@ -0,0 +1,182 @@
+import re
+from dataclasses import dataclass, replace
+from typing import Iterable, Optional
+
+# Markdown 标题行；代码围栏 (Mermaid 等) 内的行不参与切分
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+# 补丁块的起始行，例如 "=== REPLACE S2 ===" / "=== END ==="
+_PATCH_MARKER = re.compile(r"^===\s*(REPLACE|APPEND|INSERT_AFTER)\s+(S\d+)\s*===\s*$|^===\s*END\s*===\s*$", re.MULTILINE)
+
+PATCH_OPS = ("REPLACE", "APPEND", "INSERT_AFTER")
+# 标题之前的开场白 (如 "[Architect_Expert] ...") 作为编号为 S0 的章节
+PREAMBLE_TITLE = "(开场白)"
+
+
+@dataclass(frozen=True)
+class Section:
+    """
+    蓝图中的一个可寻址章节
+
+    Attributes:
+        id: 章节编号 (S0, S1, ...)，在一份蓝图内唯一，修订补丁按编号定位
+        title: 标题文本，开场白为 PREAMBLE_TITLE
+        level: 标题级别 (# 的个数)，开场白为 0
+        text: 章节全文，包含标题行与其后的空行
+    """
+    id: str
+    title: str
+    level: int
+    text: str
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "title": self.title, "level": self.level, "text": self.text}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Section":
+        return cls(str(data["id"]), str(data["title"]), int(data["level"]), str(data["text"]))
+
+
+@dataclass(frozen=True)
+class SectionPatch:
+    """
+    针对单个章节的修订
+
+    Attributes:
+        op: REPLACE (整节替换，含标题行) / APPEND (追加到节末) / INSERT_AFTER (在该节之后插入新章节)
+        section_id: 目标章节编号
+        content: 补丁内容
+    """
+    op: str
+    section_id: str
+    content: str
+
+
+class BlueprintDocument:
+    """
+    按 Markdown 标题切分的架构蓝图
+
+    每个标题开启一个新章节 (不区分层级，子标题同样单独寻址)，章节全文按行拼接即还原原文。
+    """
+
+    def __init__(self, sections: Iterable[Section]):
+        self.sections = list(sections)
+
+    @classmethod
+    def parse(cls, text: str) -> "BlueprintDocument":
+        # (标题, 级别, 行)；第一个块是标题之前的开场白
+        chunks: list[tuple[str, int, list[str]]] = [(PREAMBLE_TITLE, 0, [])]
+        in_fence = False
+        for line in (text or "").split("\n"):
+            if _FENCE.match(line):
+                in_fence = not in_fence
+            heading = None if in_fence else _HEADING.match(line)
+            if heading:
+                chunks.append((heading.group(2), len(heading.group(1)), []))
+            chunks[-1][2].append(line)
+
+        sections = []
+        for number, (title, level, lines) in enumerate(chunks):
+            body = "\n".join(lines)
+            # 空的开场白省略，第一个标题始终是 S1
+            if number == 0 and not body.strip():
+                continue
+            sections.append(Section(f"S{number}", title, level, body))
+        return cls(sections)
+
+    @classmethod
+    def from_state(cls, sections: Optional[list], text: str) -> "BlueprintDocument":
+        """优先使用 state 中已存储的章节，与正文不一致 (例如从检查点恢复了正文) 时重新切分"""
+        if sections:
+            document = cls(Section.from_dict(section) for section in sections)
+            if document.render() == (text or ""):
+                return document
+        return cls.parse(text)
+
+    def get(self, section_id: str) -> Optional[Section]:
+        return next((section for section in self.sections if section.id == section_id), None)
+
+    def render(self) -> str:
+        return "\n".join(section.text for section in self.sections)
+
+    def to_state(self) -> list[dict]:
+        return [section.to_dict() for section in self.sections]
+
+    def annotated(self) -> str:
+        """带章节编号的全文，供修订模型按编号引用"""
+        return "\n".join(f"<<{section.id}>> {section.title}\n{section.text}" for section in self.sections)
+
+    def _next_id(self) -> str:
+        return f"S{max((int(section.id[1:]) for section in self.sections), default=-1) + 1}"
+
+    def apply(self, patches: Iterable[SectionPatch]) -> tuple["BlueprintDocument", list[SectionPatch], list[SectionPatch]]:
+        """
+        在本地依次应用补丁，返回 (修订后的蓝图, 已应用的补丁, 因章节不存在而被拒绝的补丁)
+        原蓝图不变；新插入的章节获得新的编号，可被后续补丁继续引用
+        """
+        document = BlueprintDocument(self.sections)
+        applied, rejected = [], []
+        for patch in patches:
+            index = next((i for i, s in enumerate(document.sections) if s.id == patch.section_id), None)
+            if index is None or patch.op not in PATCH_OPS:
+                rejected.append(patch)
+                continue
+            section = document.sections[index]
+            # 修订过的章节以空行结尾，与下一个标题隔开
+            content = patch.content.strip("\n") + "\n"
+            if patch.op == "REPLACE":
+                heading = _HEADING.match(content.splitlines()[0]) if content else None
+                if section.level and heading is None:
+                    # 模型只给出了正文时保留原标题行
+                    content = f"{section.text.splitlines()[0]}\n{content}"
+                document.sections[index] = replace(section, text=content)
+            elif patch.op == "APPEND":
+                document.sections[index] = replace(section, text=f"{section.text.rstrip()}\n\n{content}")
+            else:
+                heading = _HEADING.match(content.splitlines()[0]) if content else None
+                title, level = (heading.group(2), len(heading.group(1))) if heading else ("", section.level)
+                if not section.text.endswith("\n"):
+                    document.sections[index] = replace(section, text=f"{section.text}\n")
+                document.sections.insert(index + 1, Section(document._next_id(), title, level, content))
+            applied.append(patch)
+        return document, applied, rejected
+
+
+def parse_patches(text: str) -> list[SectionPatch]:
+    """
+    解析修订模型的输出：
+
+        === REPLACE S2 ===
+        (该章节修订后的全文)
+        === APPEND S4 ===
+        (追加到该章节末尾的内容)
+        === END ===
+
+    第一个标记之前与 END 之后的内容被忽略
+    """
+    patches = []
+    markers = list(_PATCH_MARKER.finditer(text or ""))
+    for marker, following in zip(markers, markers[1:] + [None]):
+        if marker.group(1) is None:
+            break
+        end = following.start() if following else len(text)
+        patches.append(SectionPatch(marker.group(1), marker.group(2), text[marker.end():end].strip("\n")))
+    return patches
+
+
+def has_patch_markers(text: str) -> bool:
+    return bool(_PATCH_MARKER.search(text or ""))
+
+
+_MERMAID = re.compile(r"^\s*(```|~~~)\s*mermaid\b", re.MULTILINE)
+
+
+def looks_like_rewrite(text: str, draft: BlueprintDocument, min_ratio: float = 0.5) -> bool:
+    """
+    没有补丁标记的回复是否像一份完整重写的蓝图：含 Markdown 标题或 Mermaid 代码块，
+    且长度不低于初稿的 min_ratio 倍 (初稿为空时不限长度)
+    """
+    document = BlueprintDocument.parse(text)
+    structured = any(section.level > 0 for section in document.sections) or bool(_MERMAID.search(text or ""))
+    baseline = len(draft.render().strip())
+    return structured and len((text or "").strip()) >= baseline * min_ratio
@@ -1,30 +1,80 @@
-import json
-from typing import AsyncGenerator
+import asyncio
+import os
+from contextlib import aclosing
+from typing import AsyncGenerator, Optional
 from google.adk.agents import Agent, LoopAgent, BaseAgent
-from agents.senior_pm_agent import create_senior_pm_for
+from agents.senior_pm_agent import create_senior_pm_for, stream_audit, SANITY_CHECK_FIELDS, QUALITY_AUDIT_FIELDS, PASS_SCORE
 from google.adk.agents import InvocationContext
 from google.adk.events import Event
-from utils.load_prompt import load_prompt
-from utils import MODEL, AgentInfo, logger
+from utils import prompt_registry
+from utils import create_model, AgentInfo, blob_store, logger, metrics, tracer
+from agents.registry import agent_registry
+
+# 完成需求挖掘时执行者输出中的标记
+FINISHED_MARKER = "[Discovery_Expert] 需求挖掘已完成"
+
+
+class _BufferedRun:
+    """
+    在后台任务中提前运行一个事件流，产出的事件先缓冲起来，
+    由调用方在审计结论明确后决定放行 (events) 或取消 (cancel)
+    """
+    _DONE = object()
+
+    def __init__(self, events: AsyncGenerator[Event, None], name: str):
+        self.error: Optional[BaseException] = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._produce(events), name=name)
+
+    async def _produce(self, events: AsyncGenerator[Event, None]):
+        try:
+            async with aclosing(events) as stream:
+                async for event in stream:
+                    self._queue.put_nowait(event)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._queue.put_nowait(self._DONE)
+
+    async def events(self) -> AsyncGenerator[Event, None]:
+        """先放出已缓冲的事件，再跟随后续产出；调用方提前退出时取消后台任务"""
+        try:
+            while (event := await self._queue.get()) is not self._DONE:
+                yield event
+            if self.error is not None:
+                raise self.error
+        finally:
+            await self.cancel()
+
+    async def cancel(self):
+        if not self.task.done():
+            self.task.cancel()
+        await asyncio.wait([self.task])
 
 
 class DiscoveryPhaseAgent(BaseAgent):
     """
     自定义 Discovery 阶段智能体：
-    1. 统一契约：PM 输出 JSON，代码解析。
+    1. 统一契约：PM 输出 JSON，代码流式增量解析，结论明确即提前结束生成。
     2. 后端过滤：屏蔽 JSON，给用户返回 human_message。
     3. 流程控制：代码通过 ctx.actions.escalate 控制退出，不再使用工具。
+
+    开启 optimistic (环境变量 DISCOVERY_OPTIMISTIC_GATE=1) 时，审计与执行者的对话轮次并发运行：
+    - 准入验证：执行者的事件先缓冲，PASS 后放行，REJECT 时立即取消执行者
+    质量审计的结论决定是否还需要执行者，不做预跑，两种模式产出的事件一致。
     """
     discovery_actor: BaseAgent
     senior_pm: BaseAgent
+    # 审计与执行者是否并发运行
+    optimistic: bool = False
     
     model_config = {"arbitrary_types_allowed": True}
     
     def __init__(self):
         discovery_actor = Agent(
-            model=MODEL,
+            model=create_model(AgentInfo.DISCOVERY_AGENT),
             name=AgentInfo.DISCOVERY_AGENT['name'],
-            instruction=load_prompt(AgentInfo.DISCOVERY_AGENT['instruction_path']),
+            instruction=prompt_registry.instruction(AgentInfo.DISCOVERY_AGENT['instruction_path']),
             output_key=AgentInfo.DISCOVERY_AGENT['output_key'],
         )
         # 工厂函数生成的 PM 指令中已包含目标 key
@@ -35,9 +85,41 @@ class DiscoveryPhaseAgent(BaseAgent):
             description="管理需求挖掘全过程：准入、对话、审计",
             sub_agents=[discovery_actor, senior_pm],
             discovery_actor=discovery_actor,
-            senior_pm=senior_pm
+            senior_pm=senior_pm,
+            optimistic=os.getenv("DISCOVERY_OPTIMISTIC_GATE", "").lower() in ("1", "true", "on"),
         )
 
+    def _run_actor(self, ctx: InvocationContext, **attributes) -> AsyncGenerator[Event, None]:
+        actor = self.discovery_actor
+        return tracer.trace_events(actor.run_async(ctx), actor.name, "agent", **attributes)
+
+    def _start_actor(self, ctx: InvocationContext) -> Optional[_BufferedRun]:
+        """乐观模式下在审计的同时启动执行者的对话轮次"""
+        if not self.optimistic:
+            return None
+        return _BufferedRun(self._run_actor(ctx, optimistic=True), name=f"{self.name}:{ctx.session.id}")
+
+    @staticmethod
+    async def _settle(actor_run: Optional[_BufferedRun], release: bool) -> Optional[_BufferedRun]:
+        """根据审计结论放行或取消预跑的执行者，返回可放行的预跑"""
+        if actor_run is None:
+            return None
+        metrics.increment("discovery.optimistic", outcome="released" if release else "discarded")
+        if release:
+            return actor_run
+        await actor_run.cancel()
+        return None
+
+    async def _audit(self, ctx: InvocationContext, fields: dict, actor_run: Optional[_BufferedRun]) -> dict:
+        """流式运行审计；审计失败 (或被取消) 时一并取消预跑的执行者，避免后台任务脱离会话继续运行"""
+        try:
+            audit = await stream_audit(self.senior_pm, ctx, fields)
+        except BaseException:
+            if actor_run is not None:
+                await actor_run.cancel()
+            raise
+        return audit.report
+
     async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
         output_key = AgentInfo.DISCOVERY_AGENT['output_key']
         pm_output_key = AgentInfo.SENIOR_PM_AGENT['output_key']
@@ -47,21 +129,22 @@ class DiscoveryPhaseAgent(BaseAgent):
             ctx.session.state[output_key] = "执行者尚未产出阶段性总结。"
 
         is_sanity_passed = ctx.session.state.get("is_sanity_passed", False)
-        
+        # 审计只写入 pm_output_key，不影响挖掘是否完成的判断，可以在审计之前确定
+        discovery_output = blob_store.resolve(ctx.session.state.get(output_key, ""))
+        has_finished_mining = FINISHED_MARKER in discovery_output
+        actor_run: Optional[_BufferedRun] = None
+
         # --- [阶段一]：职责 A - 需求准入验证 ---
         if not is_sanity_passed:
             logger.info(f"[{self.name}] CPO 正在静默审计需求准入...")
-            
-            # 捕获 PM 输出并手动解析
-            full_content = ""
-            async for event in self.senior_pm.run_async(ctx):
-                if event.content and event.content.parts:
-                    part = event.content.parts[0]
-                    if hasattr(part, "text") and part.text:
-                        full_content += part.text
-            
-            pm_report = self._parse_json(full_content)
+            if not has_finished_mining:
+                # 执行者提示词不依赖审计结果，乐观模式下与准入验证并发
+                actor_run = self._start_actor(ctx)
+
+            # 流式解析 PM 输出：verdict (及 REJECT 的引导语) 一旦明确即取消剩余生成
+            pm_report = await self._audit(ctx, SANITY_CHECK_FIELDS, actor_run)
             ctx.session.state[pm_output_key] = pm_report
+            actor_run = await self._settle(actor_run, pm_report.get("verdict") != "REJECT")
 
             # 如果准入不通过，向用户显示温和引导
             if pm_report.get("verdict") == "REJECT":
@@ -71,24 +154,15 @@ class DiscoveryPhaseAgent(BaseAgent):
 
 
         # --- [阶段二]：执行阶段 - 需求挖掘对话 ---
-        discovery_output = ctx.session.state.get(output_key, "")
-        has_finished_mining = "[Discovery_Expert] 需求挖掘已完成" in discovery_output
-
         if not has_finished_mining:
-            async for event in self.discovery_actor.run_async(ctx):
+            events = actor_run.events() if actor_run else self._run_actor(ctx)
+            async for event in events:
                 yield event
         else:
             # --- [阶段三]：职责 B - 质量审计 ---
             logger.info(f"[{self.name}] 检测到终产物，触发 CPO 质量审计...")
-            
-            full_content = ""
-            async for event in self.senior_pm.run_async(ctx):
-                if event.content and event.content.parts:
-                    part = event.content.parts[0]
-                    if hasattr(part, "text") and part.text:
-                        full_content += part.text
-            
-            pm_report = self._parse_json(full_content)
+            # 质量审计不预跑执行者：未达标时只返回审计意见，由用户的下一轮输入驱动执行者完善，两种模式产出的事件一致
+            pm_report = await self._audit(ctx, QUALITY_AUDIT_FIELDS, None)
             ctx.session.state[pm_output_key] = pm_report
             
             if pm_report.get("verdict") == "REJECT":
@@ -96,20 +170,11 @@ class DiscoveryPhaseAgent(BaseAgent):
                 yield Event(author="Senior_PM_Auditor", content={"parts": [{"text": f"审计未通过：{system_ins}"}]})
             else:
                 score = pm_report.get("score", 0)
-                if score >= 6:
+                if score >= PASS_SCORE:
                     yield Event(author="Senior_PM_Auditor", content={"parts": [{"text": f"CPO 审计通过 (得分: {score})。"}]})
                     ctx.actions.escalate = True # 代码控制流程跳转
                 else:
                     yield Event(author="Senior_PM_Auditor", content={"parts": [{"text": f"得分 {score}，请继续优化。"}]})
 
-    def _parse_json(self, text: str) -> dict:
-        """安全解析 LLM 返回的 JSON"""
-        try:
-            clean_json = text.strip().strip('`').replace('json\n', '', 1)
-            return json.loads(clean_json)
-        except Exception as e:
-            logger.info(f"JSON 解析失败: {e}")
-            return {}
-
-# 导出实例
-discovery_phase_agent = DiscoveryPhaseAgent()
\ No newline at end of file
+# 阶段智能体在编排器首次进入需求阶段时才构建
+agent_registry.register(AgentInfo.DISCOVERY_AGENT, DiscoveryPhaseAgent)
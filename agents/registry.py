@@ -0,0 +1,48 @@
+import threading
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
+
+if TYPE_CHECKING:
+    from google.adk.agents import BaseAgent
+
+
+class AgentRegistry:
+    """
+    智能体注册表：以 AgentInfo 条目为键登记工厂函数，首次获取时才构建实例
+
+    构建智能体需要读取提示词、创建模型客户端，这些开销推迟到编排器第一次进入对应阶段时才发生；
+    长驻服务可以在启动后调用 warm_up 一次性构建全部智能体。
+    """
+
+    def __init__(self):
+        self._factories: dict[str, Callable[[], "BaseAgent"]] = {}
+        self._instances: dict[str, "BaseAgent"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, agent_config: dict, factory: Callable[[], "BaseAgent"]):
+        """登记某个 AgentInfo 条目对应的工厂函数"""
+        self._factories[agent_config["name"]] = factory
+
+    def get(self, agent_config: dict) -> "BaseAgent":
+        """获取智能体实例，不存在时调用工厂构建 (线程安全，只构建一次)"""
+        name = agent_config["name"]
+        agent = self._instances.get(name)
+        if agent is not None:
+            return agent
+        with self._lock:
+            if name not in self._instances:
+                if name not in self._factories:
+                    raise KeyError(f"未注册的智能体: {name}")
+                self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+    def is_built(self, agent_config: dict) -> bool:
+        return agent_config["name"] in self._instances
+
+    def warm_up(self, agent_configs: Optional[Iterable[dict]] = None) -> list["BaseAgent"]:
+        """预先构建指定 (默认全部) 已登记的智能体"""
+        names = [config["name"] for config in agent_configs] if agent_configs is not None else list(self._factories)
+        return [self.get({"name": name}) for name in names]
+
+
+# 全局注册表实例
+agent_registry = AgentRegistry()
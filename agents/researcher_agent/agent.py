@@ -1,12 +1,18 @@
 from google.adk.agents.llm_agent import Agent
-from utils import MODEL
-from utils.load_prompt import load_prompt
+from utils import create_model
+from utils import prompt_registry
 from utils import AgentInfo
+from agents.registry import agent_registry
 
-researcher_agent = Agent(
-    model=MODEL,
-    name=AgentInfo.RESEARCHER_AGENT['name'],
-    description=AgentInfo.RESEARCHER_AGENT['description'],
-    instruction=load_prompt(AgentInfo.RESEARCHER_AGENT['instruction_path']),
-    output_key=AgentInfo.RESEARCHER_AGENT['output_key'],
-)
+
+def create_researcher_agent() -> Agent:
+    return Agent(
+        model=create_model(AgentInfo.RESEARCHER_AGENT),
+        name=AgentInfo.RESEARCHER_AGENT['name'],
+        description=AgentInfo.RESEARCHER_AGENT['description'],
+        instruction=prompt_registry.instruction(AgentInfo.RESEARCHER_AGENT['instruction_path']),
+        output_key=AgentInfo.RESEARCHER_AGENT['output_key'],
+    )
+
+
+agent_registry.register(AgentInfo.RESEARCHER_AGENT, create_researcher_agent)
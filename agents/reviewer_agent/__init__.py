@@ -1,3 +1,5 @@
-from .agent import reviewer_agent
+from .agent import create_reviewer_agent
+from .analyzer import FlowAnalyzerAgent, create_flow_analyzer, review_is_redundant
+from .mermaid import FlowFinding, FlowGraph, FlowReport, analyze_blueprint, parse_flowchart
 
-__all__ = ['reviewer_agent']
+__all__ = ['create_reviewer_agent', 'FlowAnalyzerAgent', 'create_flow_analyzer', 'review_is_redundant', 'FlowFinding', 'FlowGraph', 'FlowReport', 'analyze_blueprint', 'parse_flowchart']
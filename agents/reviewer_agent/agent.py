@@ -1,12 +1,20 @@
 from google.adk.agents.llm_agent import Agent
-from utils import MODEL
-from utils.load_prompt import load_prompt
+from utils import create_model
+from utils import prompt_registry
 from utils import AgentInfo
+from agents.registry import agent_registry
+from .analyzer import remember_reviewed_diagram
 
-reviewer_agent = Agent(
-    model=MODEL,
-    name=AgentInfo.REVIEWER_AGENT['name'],
-    description=AgentInfo.REVIEWER_AGENT['description'],
-    instruction=load_prompt(AgentInfo.REVIEWER_AGENT['instruction_path']),
-    output_key=AgentInfo.REVIEWER_AGENT['output_key']
-)
+
+def create_reviewer_agent() -> Agent:
+    return Agent(
+        model=create_model(AgentInfo.REVIEWER_AGENT),
+        name=AgentInfo.REVIEWER_AGENT['name'],
+        description=AgentInfo.REVIEWER_AGENT['description'],
+        instruction=prompt_registry.instruction(AgentInfo.REVIEWER_AGENT['instruction_path']),
+        output_key=AgentInfo.REVIEWER_AGENT['output_key'],
+        after_agent_callback=remember_reviewed_diagram,
+    )
+
+
+agent_registry.register(AgentInfo.REVIEWER_AGENT, create_reviewer_agent)
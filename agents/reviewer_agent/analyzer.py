@@ -0,0 +1,82 @@
+from typing import AsyncGenerator
+
+from google.adk.agents import BaseAgent, InvocationContext
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.events import Event, EventActions
+
+from utils import AgentInfo, blob_store, logger, metrics, tracer
+from agents.registry import agent_registry
+from .mermaid import analyze_blueprint
+
+
+class FlowAnalyzerAgent(BaseAgent):
+    """
+    Step 2.3 之前的本地预检：解析 architect_output 中的 Mermaid 流程图，
+    确定性地找出不可达节点、死路、单出口判断、缺少失败分支的外部操作与死循环。
+
+    不调用模型，只产出一条 state_delta 事件：
+    - output_key: 渲染好的事实清单，Reviewer 提示词通过 {mermaid_findings?} 读取
+    - report_key: 结构化的问题列表
+    - fingerprint_key: 流程图结构指纹，配合 review_is_redundant 判断能否跳过 LLM 审计
+    """
+    source_key: str
+    output_key: str
+    report_key: str
+    fingerprint_key: str
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        report = analyze_blueprint(blob_store.resolve(ctx.session.state.get(self.source_key)) or "")
+        for finding in report.findings:
+            metrics.increment("flow_analyzer.finding", kind=finding.kind)
+        span = tracer.current()
+        if span is not None:
+            span.set(diagrams=report.diagrams, findings=len(report.findings), clean=report.clean)
+        logger.info(f"[{self.name}] 检查了 {report.diagrams} 张流程图，发现 {len(report.findings)} 个结构性问题")
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            actions=EventActions(state_delta={
+                self.output_key: report.render(),
+                self.report_key: [finding.to_dict() for finding in report.findings],
+                self.fingerprint_key: report.fingerprint if report.clean else None,
+            }),
+        )
+
+
+def remember_reviewed_diagram(callback_context: CallbackContext) -> None:
+    """Reviewer 完成后记下本次审计所针对的流程图指纹"""
+    config = AgentInfo.FLOW_ANALYZER_AGENT
+    callback_context.state[config['reviewed_key']] = callback_context.state.get(config['fingerprint_key'])
+
+
+def review_is_redundant(state) -> bool:
+    """
+    流程图没有结构性问题，且与上次 Reviewer 审计时完全一致 (已有审计意见) 时，可以跳过本次 LLM 审计
+    只有预检通过时才写入指纹，因此指纹非空即代表流程图干净
+
+    预检干净本身不足以跳过：Reviewer 审计的是整份蓝图的业务逻辑，流程图结构只是其中一部分。
+    每轮 Architect 初稿都会重写蓝图，reviewed_key 又只在 Reviewer 完成后写入，
+    所以实际只在阶段 2 中断后从检查点续跑 (初稿与审计意见都已恢复) 时才会命中
+    """
+    config = AgentInfo.FLOW_ANALYZER_AGENT
+    fingerprint = state.get(config['fingerprint_key'])
+    return bool(
+        fingerprint
+        and fingerprint == state.get(config['reviewed_key'])
+        and state.get(AgentInfo.REVIEWER_AGENT['output_key'])
+    )
+
+
+def create_flow_analyzer() -> FlowAnalyzerAgent:
+    config = AgentInfo.FLOW_ANALYZER_AGENT
+    return FlowAnalyzerAgent(
+        name=config['name'],
+        description=config['description'],
+        source_key=AgentInfo.ARCHITECT_AGENT['output_key'],
+        output_key=config['output_key'],
+        report_key=config['report_key'],
+        fingerprint_key=config['fingerprint_key'],
+    )
+
+
+agent_registry.register(AgentInfo.FLOW_ANALYZER_AGENT, create_flow_analyzer)
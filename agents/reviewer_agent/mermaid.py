@@ -0,0 +1,328 @@
+import hashlib
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+# ```mermaid 代码块
+_MERMAID_BLOCK = re.compile(r"```\s*mermaid\s*\n(.*?)```", re.DOTALL | re.IGNORECASE)
+_HEADER = re.compile(r"^\s*(graph|flowchart)\b", re.IGNORECASE)
+# 节点：ID 后可跟形状与文字，如 A[文字] B{判断} C([开始]) D((圆)) E[/输入/] F>旗标]
+_NODE = re.compile(
+    r"\s*([A-Za-z0-9_一-鿿]+)\s*"
+    r"(\(\[.*?\]\)|\[\[.*?\]\]|\[\(.*?\)\]|\(\(.*?\)\)|\{\{.*?\}\}|\[/.*?/\]|\[\\.*?\\\]|\[.*?\]|\(.*?\)|\{.*?\}|>.*?\])?"
+)
+# 连线：-->、---、-.->、==>、--o、--x，可带 |文字| 或 -- 文字 --> 形式的标签
+_EDGE = re.compile(
+    r"\s*(?:--\s*([^-|>][^|>]*?)\s*(-->|---|-\.->|==>)|(-{2,}>|-{3,}|-\.+->|={2,}>|--o|--x|<-->)\s*(?:\|([^|]*)\|)?)"
+)
+_IGNORED = re.compile(r"^\s*(subgraph|end\b|classDef|class\s|style\s|linkStyle|click\s|direction\s|%%)", re.IGNORECASE)
+
+# 起点 / 终点节点的常见文字；以及通常需要失败 / 超时分支的外部操作
+START_WORDS = ("开始", "起点", "start", "begin")
+TERMINAL_WORDS = ("结束", "完成", "终止", "退出", "end", "done", "finish", "stop")
+EXTERNAL_WORDS = ("支付", "付款", "退款", "调用", "请求", "提交", "上传", "下载", "网络", "回调", "登录", "验证", "同步",
+                  "pay", "api", "request", "upload", "submit", "login", "callback", "sync")
+ERROR_WORDS = ("失败", "异常", "超时", "错误", "重试", "取消", "拒绝", "fail", "error", "timeout", "retry", "cancel", "否")
+
+
+@dataclass(frozen=True)
+class FlowNode:
+    id: str
+    label: str
+    shape: str  # rect / decision / terminal / round / other
+
+
+@dataclass(frozen=True)
+class FlowEdge:
+    source: str
+    target: str
+    label: str = ""
+
+
+@dataclass
+class FlowGraph:
+    """一张 Mermaid 流程图的节点与连线"""
+    nodes: dict[str, FlowNode] = field(default_factory=dict)
+    edges: list[FlowEdge] = field(default_factory=list)
+
+    def successors(self, node_id: str) -> list[FlowEdge]:
+        return [edge for edge in self.edges if edge.source == node_id]
+
+    def predecessors(self, node_id: str) -> list[FlowEdge]:
+        return [edge for edge in self.edges if edge.target == node_id]
+
+    def fingerprint(self) -> str:
+        """与书写顺序、空白无关的结构指纹"""
+        canonical = "\n".join(sorted(f"N|{n.id}|{n.label}|{n.shape}" for n in self.nodes.values()))
+        canonical += "\n" + "\n".join(sorted(f"E|{e.source}|{e.target}|{e.label}" for e in self.edges))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class FlowFinding:
+    """
+    一条结构性问题
+
+    Attributes:
+        kind: unreachable / dead_end / single_branch_decision / missing_error_path /
+              dead_loop / no_start / no_terminal / missing_diagram / parse_error
+        node: 相关节点 ID (整图问题为空)
+        message: 给审计员阅读的说明
+        diagram: 所在流程图的序号 (从 1 开始)
+    """
+    kind: str
+    node: str
+    message: str
+    diagram: int = 1
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _shape(token: Optional[str]) -> tuple[str, str]:
+    """由形状记号得到 (形状, 文字)"""
+    if not token:
+        return "other", ""
+    if token.startswith("([") or token.startswith("(("):
+        return "terminal", token[2:-2]
+    if token.startswith("{{"):
+        return "decision", token[2:-2]
+    if token.startswith("{"):
+        return "decision", token[1:-1]
+    if token.startswith("[[") or token.startswith("[(") or token.startswith("[/") or token.startswith("[\\"):
+        return "rect", token[2:-2]
+    if token.startswith("["):
+        return "rect", token[1:-1]
+    if token.startswith("("):
+        return "round", token[1:-1]
+    return "other", token[1:-1]
+
+
+def _add_node(graph: FlowGraph, node_id: str, token: Optional[str]):
+    shape, label = _shape(token)
+    label = label.strip().strip('"')
+    existing = graph.nodes.get(node_id)
+    # 节点可能先以裸 ID 出现，之后才定义形状与文字
+    if existing is None or (token and existing.shape == "other" and not existing.label):
+        graph.nodes[node_id] = FlowNode(node_id, label or (existing.label if existing else ""), shape)
+
+
+def _parse_group(line: str, pos: int, graph: FlowGraph) -> tuple[list[str], int]:
+    """解析 A 或 A & B 形式的节点组"""
+    ids = []
+    while True:
+        match = _NODE.match(line, pos)
+        if not match:
+            return ids, pos
+        _add_node(graph, match.group(1), match.group(2))
+        ids.append(match.group(1))
+        pos = match.end()
+        amp = re.match(r"\s*&", line[pos:])
+        if not amp:
+            return ids, pos
+        pos += amp.end()
+
+
+def _split_statements(line: str) -> list[str]:
+    """按分号拆分同一行中的多条语句；引号、括号与 |边标签| 内的分号属于节点或边的文字"""
+    statements, start, depth, quoted, in_label = [], 0, 0, False, False
+    for index, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif quoted:
+            continue
+        elif char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth = max(depth - 1, 0)
+        elif char == "|" and depth == 0:
+            in_label = not in_label
+        elif char == ";" and depth == 0 and not in_label:
+            statements.append(line[start:index])
+            start = index + 1
+    statements.append(line[start:])
+    return statements
+
+
+def parse_flowchart(source: str) -> FlowGraph:
+    """
+    解析 graph / flowchart 语法的流程图 (不支持的语句被忽略)
+
+    Raises:
+        ValueError: 不是 graph / flowchart 类型的图
+    """
+    graph = FlowGraph()
+    lines = [line for line in source.splitlines() if line.strip()]
+    if not lines or not _HEADER.match(lines[0]):
+        raise ValueError("不是 graph / flowchart 类型的 Mermaid 图")
+    for raw in lines[1:]:
+        for statement in _split_statements(raw):
+            if not statement.strip() or _IGNORED.match(statement):
+                continue
+            sources, pos = _parse_group(statement, 0, graph)
+            while sources:
+                edge = _EDGE.match(statement, pos)
+                if not edge:
+                    break
+                label = (edge.group(1) or edge.group(4) or "").strip().strip('"')
+                targets, pos = _parse_group(statement, edge.end(), graph)
+                for source_id in sources:
+                    for target_id in targets:
+                        graph.edges.append(FlowEdge(source_id, target_id, label))
+                sources = targets
+    return graph
+
+
+def extract_flowcharts(text: str) -> list[FlowGraph]:
+    """提取文本中全部 graph / flowchart 代码块，其他类型的 Mermaid 图被忽略"""
+    graphs = []
+    for block in _MERMAID_BLOCK.findall(text or ""):
+        try:
+            graphs.append(parse_flowchart(block))
+        except ValueError:
+            continue
+    return graphs
+
+
+def _matches(text: str, words: tuple[str, ...]) -> bool:
+    text = text.lower()
+    return any(word in text for word in words)
+
+
+def _is_terminal(node: FlowNode) -> bool:
+    return node.shape == "terminal" or _matches(node.label or node.id, TERMINAL_WORDS)
+
+
+def _reachable(graph: FlowGraph, roots: list[str]) -> set[str]:
+    seen, stack = set(roots), list(roots)
+    while stack:
+        for edge in graph.successors(stack.pop()):
+            if edge.target not in seen:
+                seen.add(edge.target)
+                stack.append(edge.target)
+    return seen
+
+
+def _closed_loops(graph: FlowGraph) -> list[set[str]]:
+    """没有出口的强连通分量 (死循环)：Tarjan 算法"""
+    index: dict[str, int] = {}
+    low: dict[str, int] = {}
+    stack: list[str] = []
+    on_stack: set[str] = set()
+    components: list[set[str]] = []
+
+    def visit(node_id: str):
+        index[node_id] = low[node_id] = len(index)
+        stack.append(node_id)
+        on_stack.add(node_id)
+        for edge in graph.successors(node_id):
+            if edge.target not in index:
+                visit(edge.target)
+                low[node_id] = min(low[node_id], low[edge.target])
+            elif edge.target in on_stack:
+                low[node_id] = min(low[node_id], index[edge.target])
+        if low[node_id] == index[node_id]:
+            component = set()
+            while True:
+                member = stack.pop()
+                on_stack.discard(member)
+                component.add(member)
+                if member == node_id:
+                    break
+            components.append(component)
+
+    for node_id in graph.nodes:
+        if node_id not in index:
+            visit(node_id)
+
+    loops = []
+    for component in components:
+        is_cycle = len(component) > 1 or any(
+            edge.target == edge.source for edge in graph.successors(next(iter(component)))
+        )
+        exits = any(edge.target not in component for member in component for edge in graph.successors(member))
+        if is_cycle and not exits:
+            loops.append(component)
+    return loops
+
+
+def analyze_flowchart(graph: FlowGraph, diagram: int = 1) -> list[FlowFinding]:
+    """对单张流程图做确定性的结构检查"""
+    findings: list[FlowFinding] = []
+
+    def add(kind: str, node: str, message: str):
+        findings.append(FlowFinding(kind, node, message, diagram))
+
+    def name(node_id: str) -> str:
+        label = graph.nodes[node_id].label
+        return f"{node_id}[{label}]" if label else node_id
+
+    if not graph.nodes:
+        add("parse_error", "", "流程图中没有解析到任何节点")
+        return findings
+
+    roots = [node_id for node_id in graph.nodes if not graph.predecessors(node_id)]
+    if not roots:
+        add("no_start", "", "没有入度为 0 的起始节点，整张图是一个环")
+    else:
+        # 以标注为“开始”的节点为入口，没有时按 Mermaid 惯例取第一个出现的起始节点；其余入口视为游离
+        starts = [node_id for node_id in roots if _matches(graph.nodes[node_id].label or node_id, START_WORDS)]
+        reachable = _reachable(graph, starts or roots[:1])
+        for node_id in graph.nodes:
+            if node_id not in reachable:
+                add("unreachable", node_id, f"节点 {name(node_id)} 从起点不可达")
+
+    terminals = [node_id for node_id, node in graph.nodes.items() if not graph.successors(node_id) and _is_terminal(node)]
+    if not terminals:
+        add("no_terminal", "", "没有明确的结束节点")
+
+    for node_id, node in graph.nodes.items():
+        edges = graph.successors(node_id)
+        if not edges and not _is_terminal(node):
+            add("dead_end", node_id, f"节点 {name(node_id)} 没有后续也不是结束节点，流程在此中断")
+        if node.shape == "decision" and len({edge.target for edge in edges}) < 2:
+            add("single_branch_decision", node_id, f"判断节点 {name(node_id)} 只有 {len(edges)} 个出口，缺少另一分支")
+        if edges and not _is_terminal(node) and _matches(node.label or node_id, EXTERNAL_WORDS):
+            handled = any(
+                _matches(edge.label, ERROR_WORDS) or _matches(graph.nodes[edge.target].label, ERROR_WORDS)
+                for edge in edges
+            )
+            if not handled:
+                add("missing_error_path", node_id, f"外部操作 {name(node_id)} 没有失败 / 超时分支")
+
+    for loop in _closed_loops(graph):
+        members = ", ".join(sorted(loop))
+        add("dead_loop", sorted(loop)[0], f"节点 {members} 构成没有出口的循环")
+    return findings
+
+
+@dataclass
+class FlowReport:
+    """architect_output 中全部流程图的检查结果"""
+    findings: list[FlowFinding]
+    fingerprint: Optional[str]
+    diagrams: int
+
+    @property
+    def clean(self) -> bool:
+        return self.diagrams > 0 and not self.findings
+
+    def render(self) -> str:
+        """渲染为交给审计员的事实清单"""
+        if self.diagrams == 0:
+            return "- 未找到 graph / flowchart 类型的 Mermaid 流程图。"
+        if not self.findings:
+            return f"- 已检查 {self.diagrams} 张流程图，未发现结构性问题 (可达性、死路、判断分支、异常分支、死循环)。"
+        return "\n".join(f"- [图{f.diagram}] {f.kind}: {f.message}" for f in self.findings)
+
+
+def analyze_blueprint(text: str) -> FlowReport:
+    """检查蓝图中的全部流程图；指纹覆盖全部图的结构，任一图变化都会改变"""
+    graphs = extract_flowcharts(text)
+    findings = [finding for number, graph in enumerate(graphs, start=1) for finding in analyze_flowchart(graph, number)]
+    if not graphs:
+        findings.append(FlowFinding("missing_diagram", "", "蓝图中没有 graph / flowchart 类型的 Mermaid 流程图", 0))
+    fingerprint = None
+    if graphs:
+        fingerprint = hashlib.sha256("|".join(graph.fingerprint() for graph in graphs).encode("utf-8")).hexdigest()[:16]
+    return FlowReport(findings, fingerprint, len(graphs))
@@ -1,3 +1,6 @@
-from .agent import create_senior_pm_for
+from .agent import create_senior_pm_for, create_auditor_model
+from .cascade import CascadeLlm
+from .schema import AuditMetadata, AuditReport, PASS_SCORE
+from .audit import AuditResult, stream_audit, parse_audit_json, SANITY_CHECK_FIELDS, QUALITY_AUDIT_FIELDS
 
-__all__ = ['create_senior_pm_for']
+__all__ = ['create_senior_pm_for', 'create_auditor_model', 'CascadeLlm', 'AuditMetadata', 'AuditReport', 'PASS_SCORE', 'AuditResult', 'stream_audit', 'parse_audit_json', 'SANITY_CHECK_FIELDS', 'QUALITY_AUDIT_FIELDS']
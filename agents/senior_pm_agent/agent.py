@@ -1,27 +1,48 @@
 from google.adk.agents import Agent # 注意：修复了导入路径
-from utils import MODEL, AgentInfo
-from utils.load_prompt import load_prompt
+from google.adk.models.base_llm import BaseLlm
+from utils import create_model, get_fast_model_name, AgentInfo, supports_structured_output
+from utils import prompt_registry
 from tools import exif_loop
+from .cascade import CascadeLlm
+from .schema import AuditReport
+
+
+def create_auditor_model() -> BaseLlm:
+    """
+    审计员使用的模型：配置了快速模型 (AgentInfo.SENIOR_PM_AGENT["fast_model"] / FAST_MODEL_NAME) 时
+    返回快速模型在前、主模型兜底的 CascadeLlm，否则直接返回主模型
+    """
+    strong = create_model(AgentInfo.SENIOR_PM_AGENT)
+    fast_model_name = get_fast_model_name(AgentInfo.SENIOR_PM_AGENT)
+    if fast_model_name is None:
+        return strong
+    fast = create_model(AgentInfo.SENIOR_PM_AGENT, model_name=fast_model_name)
+    return CascadeLlm(fast, strong, margin=AgentInfo.SENIOR_PM_AGENT.get("cascade_margin", 1.0))
+
 
 def create_senior_pm_for(agent_config: dict):
     """
     最佳实践：为特定的执行者生成对应的 Senior PM 评审员
     """
-    raw_instruction = load_prompt(AgentInfo.SENIOR_PM_AGENT['instruction_path'])
-    
-    # 动态填充提示词模板
+    # 静态指令作为逐字节一致的前缀，审计目标等变量追加在末尾，便于供应商前缀缓存命中
     # 1. target_agent_name: 告诉 PM 它是谁的面试官
     # 2. content_to_audit: 将其设为 "{output_key}" 的形式
     #    这样 ADK 运行时会自动从全局 state[output_key] 中读取内容
-    final_instruction = raw_instruction.replace(
-        '{target_agent_name}', agent_config['name']
-    ).replace(
-        '{content_to_audit}', f"{{{agent_config['output_key']}}}"  # 双花括号表示保留占位符供运行时解析
+    final_instruction = prompt_registry.instruction(
+        AgentInfo.SENIOR_PM_AGENT['instruction_path'],
+        target_agent_name=agent_config['name'],
+        content_to_audit=f"{{{agent_config['output_key']}}}",  # 保留占位符供运行时解析
     )
-    
+    model = create_auditor_model()
+    # 级联时快速模型与主模型都支持才启用结构化输出
+    models = [model.fast, model.strong] if isinstance(model, CascadeLlm) else [model]
+    structured = all(supports_structured_output(m.model) for m in models)
+
     return Agent(
-        model=MODEL,
+        model=model,
         name=f"Senior_PM_Auditor_for_{agent_config['name']}",
         instruction=final_instruction,
+        # 供应商支持时通过结构化输出约束审计报告格式
+        output_schema=AuditReport if structured else None,
         # tools=[exif_loop] # 必须挂载退出工具
     )
\ No newline at end of file
@@ -0,0 +1,193 @@
+import json
+from contextlib import aclosing
+from dataclasses import dataclass, field
+
+from google.adk.agents import BaseAgent, InvocationContext, LlmAgent, RunConfig
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.agents.run_config import StreamingMode
+from google.adk.models.llm_request import LlmRequest
+from google.adk.utils.instructions_utils import inject_session_state
+from google.genai import types
+
+from utils import blob_store, logger, metrics, repair_json, tracer
+from utils.streaming_json import IncrementalJsonParser
+from .schema import AuditReport, normalize_report
+
+# 需求准入 (阶段一)：PASS 只需 verdict；REJECT 还需给用户的引导语
+SANITY_CHECK_FIELDS = {"PASS": (), "REJECT": ("human_message",)}
+# 质量审计 (阶段二)：PASS 需要分数判断是否达标；REJECT 需要给执行者的处方
+QUALITY_AUDIT_FIELDS = {"PASS": ("score",), "REJECT": ("system_instructions",)}
+# 字段缺失时的补问次数上限
+MAX_REPAIR_RETRIES = 1
+
+
+@dataclass
+class AuditResult:
+    """
+    一次 Senior PM 审计的结果
+
+    Attributes:
+        report: 已解析出的审计字段 (verdict / score / human_message / system_instructions ...)
+        raw_text: 截至结束时收到的原始文本
+        cancelled: 是否在生成完成前因判定已明确而提前取消
+        retries: 为补齐缺失字段而追加的 LLM 调用次数
+    """
+    report: dict = field(default_factory=dict)
+    raw_text: str = ""
+    cancelled: bool = False
+    retries: int = 0
+
+
+def parse_audit_json(text: str, record_metrics: bool = True) -> dict:
+    """
+    宽容解析审计员返回的 JSON (代码围栏 / 截断 / 尾随逗号)，失败时返回空字典
+    严格解析失败即计入 senior_pm.parse_failure 指标 (record_metrics=False 时不计入)
+    """
+    try:
+        report = json.loads(text)
+        if isinstance(report, dict):
+            return report
+    except ValueError:
+        pass
+    if record_metrics:
+        metrics.increment("senior_pm.parse_failure")
+    try:
+        report = repair_json(text)
+        if record_metrics:
+            metrics.increment("senior_pm.parse_repaired")
+        return report
+    except ValueError as e:
+        if record_metrics:
+            logger.info(f"JSON 解析失败: {e}")
+        return {}
+
+
+def _missing_fields(report: dict, required_fields: dict[str, tuple[str, ...]]) -> list[str]:
+    """当前报告还缺哪些字段才能做出判定"""
+    verdict = report.get("verdict")
+    if verdict not in required_fields:
+        needed = ["verdict", *dict.fromkeys(name for names in required_fields.values() for name in names)]
+    else:
+        needed = list(required_fields[verdict])
+    return [name for name in needed if name not in report]
+
+
+def _is_decided(fields: dict, required_fields: dict[str, tuple[str, ...]]) -> bool:
+    return not _missing_fields(normalize_report(fields), required_fields)
+
+
+async def _ask_for_missing_fields(
+    auditor: LlmAgent, ctx: InvocationContext, raw_text: str, missing: list[str]
+) -> dict:
+    """
+    定向补问：沿用审计员的系统指令 (前缀可命中供应商缓存)，附上上一次的输出，
+    只要求模型返回缺失的字段，输出 token 与缺失字段数量成正比
+    """
+    readonly_context = ReadonlyContext(ctx)
+    instruction, bypass_state_injection = await auditor.canonical_instruction(readonly_context)
+    if not bypass_state_injection:
+        instruction = await inject_session_state(instruction, readonly_context)
+    instruction = blob_store.expand(instruction)
+
+    schema = AuditReport.model_json_schema()["properties"]
+    field_specs = "\n".join(f"- {name}: {schema[name].get('description', '')}" for name in missing)
+    request = LlmRequest(
+        contents=[
+            types.Content(role="user", parts=[types.Part(text="请输出审计报告。")]),
+            types.Content(role="model", parts=[types.Part(text=raw_text or "（无输出）")]),
+            types.Content(role="user", parts=[types.Part(text=(
+                "上面的审计报告缺少或无法解析以下字段：\n"
+                f"{field_specs}\n"
+                "请只输出一个仅包含这些字段的 JSON 对象，不要重复其他字段，不要任何解释。"
+            ))]),
+        ],
+        config=types.GenerateContentConfig(system_instruction=instruction),
+    )
+    text = ""
+    async for response in auditor.canonical_model.generate_content_async(request):
+        if response.content and response.content.parts:
+            text += "".join(part.text for part in response.content.parts if part.text and not part.thought)
+    return parse_audit_json(text)
+
+
+def _streaming_context(ctx: InvocationContext) -> InvocationContext:
+    """复制调用上下文并强制 SSE 流式，使审计员逐块产出 partial 事件"""
+    run_config = (ctx.run_config or RunConfig()).model_copy(update={"streaming_mode": StreamingMode.SSE})
+    return ctx.model_copy(update={"run_config": run_config})
+
+
+async def stream_audit(
+    auditor: BaseAgent,
+    ctx: InvocationContext,
+    required_fields: dict[str, tuple[str, ...]] = QUALITY_AUDIT_FIELDS,
+) -> AuditResult:
+    """
+    流式运行由 create_senior_pm_for 创建的审计员，并增量解析其 JSON 报告
+
+    一旦 verdict 以及该 verdict 所需的字段 (required_fields) 都已完整，
+    立即关闭审计员的事件流 (进而取消底层 LLM 生成)，不再等待剩余输出。
+    审计员事件不会转发给用户，与静默审计的语义一致。
+    结论 (verdict / score / 是否提前取消 / 补问次数) 记录在审计员的 agent 跨度上。
+    """
+    with tracer.span(auditor.name, "agent", audit=_audit_kind(required_fields)) as span:
+        result = await _run_audit(auditor, ctx, required_fields)
+        span.set(
+            verdict=result.report.get("verdict"),
+            score=result.report.get("score"),
+            cancelled=result.cancelled,
+            retries=result.retries,
+        )
+    metrics.increment("senior_pm.verdict", verdict=result.report.get("verdict", "UNKNOWN"))
+    return result
+
+
+def _audit_kind(required_fields: dict[str, tuple[str, ...]]) -> str:
+    if required_fields == SANITY_CHECK_FIELDS:
+        return "sanity"
+    if required_fields == QUALITY_AUDIT_FIELDS:
+        return "quality"
+    return "custom"
+
+
+async def _run_audit(
+    auditor: BaseAgent,
+    ctx: InvocationContext,
+    required_fields: dict[str, tuple[str, ...]],
+) -> AuditResult:
+    parser = IncrementalJsonParser()
+    raw_text = ""
+    final_text = ""
+    async with aclosing(auditor.run_async(_streaming_context(ctx))) as events:
+        async for event in events:
+            if not (event.content and event.content.parts):
+                continue
+            text = "".join(part.text for part in event.content.parts if part.text and not part.thought)
+            if not event.partial:
+                # 聚合后的最终事件；模型不支持流式时只有这一条
+                final_text = text
+                continue
+            raw_text += text
+            parser.feed(text)
+            if _is_decided(parser.fields, required_fields):
+                logger.info(f"[{auditor.name}] 审计结论已明确 ({parser.fields.get('verdict')})，提前结束生成")
+                return AuditResult(report=normalize_report(parser.fields), raw_text=raw_text, cancelled=True)
+
+    raw_text = raw_text or final_text
+    report = parse_audit_json(raw_text)
+    if not report:
+        # 本地修复也失败时，保留增量解析出的字段
+        report = dict(parser.fields) or IncrementalJsonParser().feed(raw_text)
+    report = normalize_report(report)
+
+    retries = 0
+    missing = _missing_fields(report, required_fields)
+    while missing and retries < MAX_REPAIR_RETRIES and isinstance(auditor, LlmAgent):
+        retries += 1
+        metrics.increment("senior_pm.repair_retry")
+        logger.info(f"[{auditor.name}] 审计报告缺少字段 {missing}，定向补问 ({retries}/{MAX_REPAIR_RETRIES})")
+        report = normalize_report({**report, **await _ask_for_missing_fields(auditor, ctx, raw_text, missing)})
+        missing = _missing_fields(report, required_fields)
+    if missing:
+        metrics.increment("senior_pm.unrecoverable")
+        logger.info(f"[{auditor.name}] 审计报告仍缺少字段 {missing}")
+    return AuditResult(report=report, raw_text=raw_text, retries=retries)
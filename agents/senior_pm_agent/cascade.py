@@ -0,0 +1,130 @@
+import asyncio
+from contextlib import aclosing
+from typing import AsyncGenerator, Optional
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from utils import DeadlineExceeded, logger, metrics, tracer
+from utils.streaming_json import IncrementalJsonParser
+from .audit import parse_audit_json
+from .schema import PASS_SCORE, normalize_report
+
+
+class CascadeLlm(BaseLlm):
+    """
+    审计员的级联模型：快速模型先判定，必要时升级到主模型
+
+    大多数准入 / 审计结论一目了然，由快速模型给出即可；以下情况才交给主模型重新生成：
+    - 快速模型的输出无法解析出 verdict，或调用本身失败
+    - 分数落在及格线附近 (|score - PASS_SCORE| < margin)
+    快速模型的输出边生成边增量解析，verdict 与 score 一出现即做出判定：
+    之前的分块缓冲起来，无需升级时先回放缓冲、之后的分块直接转发；需要升级时取消快速模型。
+    上层的流式解析与提前取消逻辑不受影响。
+    """
+    fast: BaseLlm
+    strong: BaseLlm
+    margin: float = 1.0
+
+    def __init__(self, fast: BaseLlm, strong: BaseLlm, margin: float = 1.0):
+        super().__init__(model=strong.model, fast=fast, strong=strong, margin=margin)
+
+    def _report_reason(self, report: dict) -> Optional[str]:
+        report = normalize_report(report)
+        if report.get("verdict") not in ("PASS", "REJECT"):
+            return "parse_failure"
+        score = report.get("score")
+        if score is not None and abs(score - PASS_SCORE) < self.margin:
+            return "borderline"
+        return None
+
+    def escalation_reason(self, text: str) -> Optional[str]:
+        """快速模型的输出需要升级的原因，None 表示可以直接采用"""
+        return self._report_reason(parse_audit_json(text, record_metrics=False))
+
+    def _early_decision(self, parser: IncrementalJsonParser) -> tuple[bool, Optional[str]]:
+        """
+        根据已流式解析出的字段判定：返回 (是否已能判定, 升级原因)
+        verdict 出现后还需等到 score (或对象闭合) 才能排除及格线附近的情况；verdict 非法时立即升级
+        """
+        fields = parser.fields
+        if "verdict" not in fields:
+            return False, None
+        reason = self._report_reason(fields)
+        if reason is None and "score" not in fields and not parser.closed:
+            return False, None
+        return True, reason
+
+    def _accept(self):
+        metrics.increment("senior_pm.cascade", outcome="fast")
+        span = tracer.current()
+        if span is not None:
+            span.set(cascade="fast", model=self.fast.model)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        fast_request = llm_request.model_copy(deep=True)
+        fast_request.model = self.fast.model
+        parser = IncrementalJsonParser()
+        buffered: list[LlmResponse] = []
+        partial_text, final_text = "", ""
+        accepted, reason = False, None
+        try:
+            async with aclosing(self.fast.generate_content_async(fast_request, stream)) as responses:
+                async for response in responses:
+                    if accepted:
+                        yield response
+                        continue
+                    buffered.append(response)
+                    if response.error_code:
+                        reason = "fast_error"
+                        break
+                    if response.content and response.content.parts:
+                        text = "".join(part.text for part in response.content.parts if part.text and not part.thought)
+                        if response.partial:
+                            partial_text += text
+                            parser.feed(text)
+                        else:
+                            final_text = text
+                            # 聚合后的最终响应与流式分块内容重复，只在没有流式分块时解析
+                            if not partial_text:
+                                parser.feed(text)
+                    decided, reason = self._early_decision(parser)
+                    if decided and reason is not None:
+                        break
+                    if decided:
+                        accepted = True
+                        self._accept()
+                        for buffered_response in buffered:
+                            yield buffered_response
+                        buffered.clear()
+        except (DeadlineExceeded, asyncio.CancelledError):
+            # 截止时间已过或调用被取消时不再升级到主模型
+            raise
+        except Exception as e:
+            if accepted:
+                # 已经转发了快速模型的输出，不能再换用主模型重新生成
+                raise
+            logger.info(f"[CascadeLlm] 快速模型 {self.fast.model} 调用失败: {e}")
+            reason = "fast_error"
+        if accepted:
+            return
+        if reason is None:
+            # 流结束仍未判定 (例如输出不是标准 JSON)：按完整文本宽容解析
+            reason = self.escalation_reason(final_text or partial_text)
+            if reason is None:
+                self._accept()
+                for response in buffered:
+                    yield response
+                return
+
+        metrics.increment("senior_pm.cascade", outcome="escalated", reason=reason)
+        span = tracer.current()
+        if span is not None:
+            span.set(cascade=f"escalated:{reason}", model=self.strong.model)
+        logger.info(f"[CascadeLlm] 升级到主模型 {self.strong.model} ({reason})")
+        llm_request.model = self.strong.model
+        async for response in self.strong.generate_content_async(llm_request, stream):
+            yield response
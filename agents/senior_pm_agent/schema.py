@@ -0,0 +1,49 @@
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, Field
+
+# 质量审计的及格线：score >= PASS_SCORE 视为达标
+PASS_SCORE = 6
+
+
+class AuditMetadata(BaseModel):
+    """审计元信息 (current_stage / target)"""
+    model_config = ConfigDict(extra="forbid")
+
+    current_stage: Literal["SanityCheck", "Auditor"] = Field(description="审计阶段：SanityCheck 为准入验证，Auditor 为质量审计")
+    target: str = Field(description="被审计的智能体名称")
+
+
+class AuditReport(BaseModel):
+    """
+    Senior PM 审计报告 (与 senior_pm.md 中的统一输出规范一致)
+    所有字段均为必填且不允许额外字段，满足严格模式 json_schema 供应商的要求
+    """
+    model_config = ConfigDict(extra="forbid")
+
+    verdict: Literal["PASS", "REJECT"] = Field(description="审计结论")
+    score: float = Field(ge=0, le=10, description="质量评分 0-10，>=6 视为达标")
+    human_message: str = Field(description="给用户的引导语；阶段二通过时为'审计通过'")
+    system_instructions: str = Field(description="给执行者的处方级指令，REJECT 时以 'COMMAND:' 开头")
+    # 引用子模型的字段不加 description：严格模式不允许 $ref 带有同级关键字
+    audit_metadata: AuditMetadata
+
+
+def normalize_report(report: dict) -> dict:
+    """
+    对宽容解析出的报告做类型归一：verdict 统一大写，score 转为 0-10 的浮点数
+    无法归一的字段会被移除，交由补问流程重新获取
+    """
+    normalized = dict(report)
+    if "verdict" in normalized:
+        verdict = str(normalized["verdict"]).strip().upper()
+        if verdict in ("PASS", "REJECT"):
+            normalized["verdict"] = verdict
+        else:
+            normalized.pop("verdict")
+    if "score" in normalized:
+        try:
+            normalized["score"] = min(max(float(normalized["score"]), 0.0), 10.0)
+        except (TypeError, ValueError):
+            normalized.pop("score")
+    return normalized
@@ -1,3 +1,5 @@
-from .agent import writer_agent
+from .agent import SectionedPrdWriter, create_writer_agent
+from .document import StreamingDocument
+from .modules import PRD_MODULES, PrdModule
 
-__all__ = ["writer_agent"]
\ No newline at end of file
+__all__ = ['SectionedPrdWriter', 'create_writer_agent', 'StreamingDocument', 'PRD_MODULES', 'PrdModule']
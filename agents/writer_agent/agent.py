@@ -1,12 +1,184 @@
-from google.adk.agents.llm_agent import Agent
-from utils import MODEL
-from utils.load_prompt import load_prompt
-from utils import AgentInfo
-
-writer_agent = Agent(
-    model=MODEL,
-    name=AgentInfo.WRITER_AGENT['name'],
-    description=AgentInfo.WRITER_AGENT['description'],
-    instruction=load_prompt(AgentInfo.WRITER_AGENT['instruction_path']),
-    output_key=AgentInfo.WRITER_AGENT['output_key'],
-)
+import asyncio
+import os
+import re
+from pathlib import Path
+from typing import AsyncGenerator, Optional
+
+from google.adk.agents import BaseAgent, InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from utils import create_model
+from utils import prompt_registry
+from utils import AgentInfo, DeadlineExceeded, blob_store, logger, metrics, tracer
+from agents.registry import agent_registry
+from .document import StreamingDocument
+from .modules import PRD_MODULES, PrdModule
+
+DOCUMENT_HEADER = "# Product Requirement Document\n\n"
+# PRD_OUTPUT_DIR 的默认值：项目根目录下的 outputs (与 .pm_state 一样不随启动目录变化)
+DEFAULT_OUTPUT_DIR = str(Path(__file__).parent.parent.parent / "outputs")
+
+
+class SectionedPrdWriter(BaseAgent):
+    """
+    分模块并发生成 PRD (文档信息 / 业务流程图 / 核心功能说明 / 非功能性需求 / 异常处理清单)
+
+    - 每个模块只读取相关的 state key，各自发起一次流式生成，互不等待
+    - 生成内容按文档顺序流式写入 Product_Requirement_Document.md 的临时文件，全部完成后原子改名
+    - 每个模块完整写入后产出一条 partial 事件，便于界面逐段展示；最终事件携带完整文档并写入 output_key
+    - 单个模块生成失败时在该位置标记 [待补充]，不影响其他模块
+
+    输出路径：state[path_key] 指定时使用该路径，否则为 PRD_OUTPUT_DIR (默认项目根目录下的 outputs) 下以会话 ID 命名的目录，
+    PRD_OUTPUT_DIR=off 时不写文件。state[defer_key] 为真时 (预跑的会话副本) 不写文件，由编排器提交预跑结果时调用 save。
+    """
+    model: BaseLlm
+    instruction_path: str
+    output_key: str
+    path_key: str
+    defer_key: str
+    file_name: str
+    modules: tuple[PrdModule, ...] = PRD_MODULES
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _output_path(self, ctx: InvocationContext) -> Optional[str]:
+        path = ctx.session.state.get(self.path_key)
+        if path:
+            return path
+        output_dir = os.getenv("PRD_OUTPUT_DIR", DEFAULT_OUTPUT_DIR)
+        if output_dir.lower() == "off":
+            return None
+        session_dir = re.sub(r"[^A-Za-z0-9_.-]+", "_", ctx.session.id).strip("._") or "session"
+        return os.path.join(output_dir, session_dir, self.file_name)
+
+    def save(self, ctx: InvocationContext) -> Optional[str]:
+        """把 state 中已生成的 PRD 原子写入输出路径，返回路径；未生成或不写文件时返回 None"""
+        text = blob_store.resolve(ctx.session.state.get(self.output_key))
+        path = self._output_path(ctx)
+        if not text or not path:
+            return None
+        document = StreamingDocument(path, 1)
+        document.write(0, text)
+        document.finish(0)
+        document.commit()
+        logger.info(f"[{self.name}] PRD 已写入 {path}")
+        return path
+
+    def _request(self, ctx: InvocationContext, module: PrdModule) -> LlmRequest:
+        state = ctx.session.state
+        materials = "\n\n".join(
+            f"#### {key}\n{blob_store.resolve(state[key])}" for key in module.inputs if state.get(key)
+        ) or "（无）"
+        instruction = prompt_registry.render(
+            self.instruction_path,
+            module_title=module.title,
+            module_requirements=module.requirements,
+            materials=materials,
+        )
+        return LlmRequest(
+            contents=[types.Content(role="user", parts=[types.Part(text=f"请撰写 PRD 模块：{module.title}")])],
+            config=types.GenerateContentConfig(system_instruction=instruction),
+        )
+
+    async def _generate(
+        self, ctx: InvocationContext, index: int, document: Optional[StreamingDocument], parts: list[list[str]]
+    ):
+        """流式生成第 index 个模块，边生成边交给 document 写盘"""
+        module = self.modules[index]
+
+        def emit(text: str):
+            parts[index].append(text)
+            if document is not None:
+                document.write(index, text)
+
+        emit(f"## {index + 1}. {module.title}\n\n")
+        with tracer.span(module.key, "section", title=module.title) as span:
+            try:
+                streamed = False
+                async for response in self.model.generate_content_async(self._request(ctx, module), stream=True):
+                    if not (response.content and response.content.parts):
+                        continue
+                    # 聚合后的最终响应与流式分块内容重复；模型不支持流式时只有这一条
+                    if not response.partial and streamed:
+                        continue
+                    streamed = streamed or bool(response.partial)
+                    emit("".join(part.text for part in response.content.parts if part.text and not part.thought))
+            except (DeadlineExceeded, asyncio.CancelledError):
+                # 阶段超时交给编排器处理 (提示用户并可续跑)，不能写出带占位符的文档
+                raise
+            except Exception as e:
+                logger.warning(f"[{self.name}] 模块 {module.title} 生成失败: {e}")
+                metrics.increment("writer.section_failed", module=module.key)
+                span.set(error=type(e).__name__)
+                emit("\n[待补充] 本模块生成失败，请重新生成。")
+        emit("\n\n")
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        # 预跑结果可能被丢弃，不能在用户确认前写出文件
+        path = None if ctx.session.state.get(self.defer_key) else self._output_path(ctx)
+        document = StreamingDocument(path, len(self.modules), DOCUMENT_HEADER) if path else None
+        parts: list[list[str]] = [[] for _ in self.modules]
+        tasks = {
+            asyncio.create_task(self._generate(ctx, index, document, parts), name=f"prd:{module.key}"): index
+            for index, module in enumerate(self.modules)
+        }
+        completed: set[int] = set()
+        cursor = 0
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+                    completed.add(tasks[task])
+                    if document is not None:
+                        document.finish(tasks[task])
+                # 按文档顺序逐段展示已完成的模块
+                while cursor in completed:
+                    yield Event(
+                        author=self.name,
+                        invocation_id=ctx.invocation_id,
+                        partial=True,
+                        content=types.Content(role="model", parts=[types.Part(text="".join(parts[cursor]))]),
+                    )
+                    cursor += 1
+            if document is not None:
+                document.commit()
+                logger.info(f"[{self.name}] PRD 已写入 {path}")
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if document is not None:
+                document.abort()
+            raise
+
+        text = DOCUMENT_HEADER + "".join("".join(module_parts) for module_parts in parts)
+        state_delta = {self.output_key: text}
+        if path:
+            state_delta[self.path_key] = path
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            actions=EventActions(state_delta=state_delta),
+        )
+
+
+def create_writer_agent() -> SectionedPrdWriter:
+    return SectionedPrdWriter(
+        name=AgentInfo.WRITER_AGENT['name'],
+        description=AgentInfo.WRITER_AGENT['description'],
+        model=create_model(AgentInfo.WRITER_AGENT),
+        instruction_path=AgentInfo.WRITER_AGENT['instruction_path'],
+        output_key=AgentInfo.WRITER_AGENT['output_key'],
+        path_key=AgentInfo.WRITER_AGENT['path_key'],
+        defer_key=AgentInfo.WRITER_AGENT['defer_key'],
+        file_name=AgentInfo.WRITER_AGENT['file_name'],
+    )
+
+
+agent_registry.register(AgentInfo.WRITER_AGENT, create_writer_agent)
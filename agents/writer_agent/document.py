@@ -0,0 +1,74 @@
+import os
+from typing import Optional, TextIO
+
+
+class StreamingDocument:
+    """
+    把并发生成的多个模块按文档顺序流式写入磁盘
+
+    写入先落在同目录的临时文件中：排在最前的未完成模块边生成边写入，
+    其后的模块先在内存中缓冲，轮到它时一次性写出再继续跟随生成。
+    commit 时刷盘并原子改名为目标文件，读者不会看到写了一半的文档；abort 删除临时文件。
+    """
+
+    def __init__(self, path: str, count: int, header: str = ""):
+        self.path = path
+        self._tmp_path = f"{path}.tmp"
+        self._buffers: list[list[str]] = [[] for _ in range(count)]
+        self._done = [False] * count
+        self._cursor = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file: Optional[TextIO] = open(self._tmp_path, "w", encoding="utf-8")
+        self._write(header)
+
+    def _write(self, text: str):
+        if text:
+            self._file.write(text)
+            self._file.flush()
+
+    def write(self, index: int, text: str):
+        """追加第 index 个模块的内容"""
+        if index == self._cursor:
+            self._write(text)
+        else:
+            self._buffers[index].append(text)
+
+    def finish(self, index: int) -> list[int]:
+        """
+        标记第 index 个模块生成完毕
+
+        Returns:
+            因此而完整写入文件的模块序号 (按文档顺序)
+        """
+        self._done[index] = True
+        flushed = []
+        while self._cursor < len(self._done) and self._done[self._cursor]:
+            flushed.append(self._cursor)
+            self._cursor += 1
+            if self._cursor < len(self._done):
+                # 下一个模块此前缓冲的内容，之后的内容直接写入
+                self._write("".join(self._buffers[self._cursor]))
+                self._buffers[self._cursor].clear()
+        return flushed
+
+    def commit(self) -> str:
+        """刷盘并原子改名为目标文件，返回目标路径"""
+        if self._cursor < len(self._done):
+            raise RuntimeError(f"仍有 {len(self._done) - self._cursor} 个模块未完成，不能提交文档")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+        os.replace(self._tmp_path, self.path)
+        return self.path
+
+    def abort(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            try:
+                os.remove(self._tmp_path)
+            except OSError:
+                pass
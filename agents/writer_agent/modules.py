@@ -0,0 +1,55 @@
+from dataclasses import dataclass
+
+from utils import AgentInfo
+
+
+@dataclass(frozen=True)
+class PrdModule:
+    """
+    PRD 的一个模块 (对应 README “关键交付物结构”)
+
+    Attributes:
+        key: 模块标识，用于日志与追踪
+        title: 文档中的模块标题
+        requirements: 交给模型的撰写要求
+        inputs: 生成该模块需要读取的 state key，只把相关产出交给模型
+    """
+    key: str
+    title: str
+    requirements: str
+    inputs: tuple[str, ...]
+
+
+_DISCOVERY = AgentInfo.DISCOVERY_AGENT['output_key']
+_ARCHITECT = AgentInfo.ARCHITECT_AGENT['output_key']
+_REVIEWER = AgentInfo.REVIEWER_AGENT['output_key']
+_RESEARCHER = AgentInfo.RESEARCHER_AGENT['output_key']
+
+# 按文档顺序排列；各模块互不依赖，可以并发生成
+PRD_MODULES: tuple[PrdModule, ...] = (
+    PrdModule(
+        "doc_info", "文档信息",
+        "包含项目名称、修订记录表 (版本 / 日期 / 说明，初版即可)、背景与目标、核心用户画像与使用场景。",
+        (_DISCOVERY, _RESEARCHER),
+    ),
+    PrdModule(
+        "flows", "业务流程图",
+        "给出业务总流程的 Mermaid 代码块 (graph TD) 及关键分支说明，并列出系统运行的核心业务规则。",
+        (_ARCHITECT,),
+    ),
+    PrdModule(
+        "features", "核心功能说明",
+        "按模块拆解功能点，每个功能点说明输入、用户路径、处理逻辑与输出，可附功能清单表格与状态流转。",
+        (_DISCOVERY, _ARCHITECT),
+    ),
+    PrdModule(
+        "nfr", "非功能性需求",
+        "说明性能要求、安全性 (鉴权、数据保护)、交互与状态提示要求，以及核心考核指标与建议的埋点统计项。",
+        (_DISCOVERY, _RESEARCHER, _ARCHITECT),
+    ),
+    PrdModule(
+        "exceptions", "异常处理清单",
+        "以表格列出异常场景、触发条件、处理策略与用户提示，优先采用 Reviewer 提供的错误处理策略。",
+        (_REVIEWER, _ARCHITECT),
+    ),
+)
@@ -0,0 +1,23 @@
+from .fake_llm_server import DEFAULT_SCRIPT, FakeLlmServer, ScriptedReply
+from .pipeline_bench import (
+    BenchmarkReport,
+    PhaseTiming,
+    SessionResult,
+    configure_environment,
+    format_report,
+    run_benchmark,
+    run_session,
+)
+
+__all__ = [
+    "DEFAULT_SCRIPT",
+    "FakeLlmServer",
+    "ScriptedReply",
+    "BenchmarkReport",
+    "PhaseTiming",
+    "SessionResult",
+    "configure_environment",
+    "format_report",
+    "run_benchmark",
+    "run_session",
+]
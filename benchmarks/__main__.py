@@ -0,0 +1,93 @@
+"""
+离线端到端基准测试 (依赖 bench 可选依赖：uv sync --extra bench)
+
+    python -m benchmarks --sessions 8 --latency 0.05 --tps 200
+
+启动本地 OpenAI 兼容桩服务，驱动 PMAgentCenter 跑完三个阶段，
+输出各阶段墙钟时间、首事件时间、编排开销以及 N 个并发会话的吞吐。
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import warnings
+
+from .fake_llm_server import DEFAULT_SCRIPT, FakeLlmServer, ScriptedReply
+from .pipeline_bench import (
+    DEFAULT_APPROVAL,
+    DEFAULT_IDEA,
+    configure_environment,
+    format_report,
+    run_benchmark,
+    temporary_state_dir,
+)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="PM Agent 离线基准测试")
+    parser.add_argument("--sessions", type=int, default=4, help="并发会话数")
+    parser.add_argument("--solo", type=int, default=3, help="串行测量的会话数")
+    parser.add_argument("--warmup", type=int, default=1, help="不计入结果的预热会话数")
+    parser.add_argument("--latency", type=float, default=0.05, help="桩服务首 token 延迟 (秒)")
+    parser.add_argument("--tps", type=float, default=200.0, help="桩服务输出速率 (token/秒)，<=0 不限速")
+    parser.add_argument("--script", help="自定义脚本 JSON 文件：[{\"match\": ..., \"text\": ..., \"latency\": ...}]")
+    parser.add_argument("--idea", default=DEFAULT_IDEA, help="第一轮输入的产品想法")
+    parser.add_argument("--approval", default=DEFAULT_APPROVAL, help="HITL 确认点的回复")
+    parser.add_argument("--no-checkpoints", action="store_true", help="关闭子步骤检查点")
+    parser.add_argument("--speculative", action="store_true", help="在确认点后台预跑下一阶段 (PM_SPECULATIVE)")
+    parser.add_argument(
+        "--optimistic", action="store_true", help="需求准入审计与执行者并发 (DISCOVERY_OPTIMISTIC_GATE)"
+    )
+    parser.add_argument(
+        "--hedge", action="store_true", help="首分块超过历史百分位耗时时发出对冲请求 (LLM_HEDGE)"
+    )
+    parser.add_argument("--think-time", type=float, default=0.0, help="用户在每个确认点停留的秒数，不计入阶段耗时")
+    parser.add_argument("--json", help="将完整结果写入该 JSON 文件")
+    parser.add_argument("--log-level", default="WARNING", help="流水线日志级别")
+    return parser.parse_args(argv)
+
+
+def load_script(path: str) -> tuple[ScriptedReply, ...]:
+    with open(path, "r", encoding="utf-8") as file:
+        return tuple(ScriptedReply(**entry) for entry in json.load(file))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level)
+    # LiteLLM 序列化流式分块时的已知告警，与基准结果无关
+    warnings.filterwarnings("ignore", message="Pydantic serializer warnings", category=UserWarning)
+    from utils import logger
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    script = load_script(args.script) if args.script else DEFAULT_SCRIPT
+    with FakeLlmServer(script=script, latency=args.latency, tokens_per_second=args.tps) as server, \
+            temporary_state_dir() as state_dir:
+        configure_environment(
+            server,
+            state_dir,
+            checkpoints=not args.no_checkpoints,
+            speculative=args.speculative,
+            optimistic=args.optimistic,
+            hedge=args.hedge,
+        )
+        report = asyncio.run(run_benchmark(
+            server,
+            sessions=args.sessions,
+            solo_runs=args.solo,
+            warmup=args.warmup,
+            idea=args.idea,
+            approval=args.approval,
+            think_time=args.think_time,
+        ))
+
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report.to_dict(), file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
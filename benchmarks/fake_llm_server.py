@@ -0,0 +1,280 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+
+@dataclass(frozen=True)
+class ScriptedReply:
+    """
+    一条脚本化回复：系统指令中包含 match 时返回 text
+
+    Attributes:
+        match: 在系统指令 (没有系统指令时为最后一条消息) 中查找的子串
+        text: 回复内容
+        latency: 首 token 延迟 (秒)，None 表示使用服务器的默认值
+        model: 只匹配该模型的请求 (例如级联审计中的快速模型)，None 表示不限
+    """
+    match: str
+    text: str
+    latency: Optional[float] = None
+    model: Optional[str] = None
+
+
+# 默认脚本：按各智能体提示词首行中的角色名匹配，保证整条流水线一次跑通
+# Reviewer 与 Writer 的提示词中也提到了 "Architect Agent"，架构师的回复必须排在最后
+DEFAULT_SCRIPT: tuple[ScriptedReply, ...] = (
+    ScriptedReply(
+        "Blueprint Reviser",
+        "=== APPEND S0 ===\n异常分支：支付失败时回滚积分；储值退款按原路退回\n=== END ===",
+    ),
+    ScriptedReply(
+        "Chief Product Officer",
+        json.dumps({
+            "verdict": "PASS",
+            "score": 8,
+            "human_message": "审计通过",
+            "system_instructions": "",
+            "audit_metadata": {"current_stage": "Auditor", "target": "Discovery_Expert"},
+        }, ensure_ascii=False),
+    ),
+    ScriptedReply(
+        "Chief Discovery Specialist",
+        "[Discovery_Expert] 需求挖掘已完成。以下是本项目的产品定义锚点：\n"
+        "1. 目标用户：独立咖啡店店主\n2. 核心场景：会员积分与储值\n3. 核心痛点：复购率低、对账繁琐",
+    ),
+    ScriptedReply(
+        "Interview-based Research Specialist",
+        "[Researcher_Expert] 情报摘要\n- 竞品：主流 SaaS 收银系统均内置会员模块\n- 避坑：储值涉及预付卡监管，需要资金存管",
+    ),
+    ScriptedReply(
+        "Senior QA & Technical Auditor",
+        "[Reviewer_Expert] 审计意见\n1. 支付失败时积分需要回滚\n2. 储值退款流程缺失",
+    ),
+    ScriptedReply(
+        "Senior Product Documentation Specialist",
+        "### 要点\n- 基准测试生成的模块内容\n- 会员积分、储值\n- 支付失败回滚积分，储值退款按原路退回",
+    ),
+    ScriptedReply(
+        "Architect Agent",
+        "[Architect_Expert] 业务逻辑蓝图\n```mermaid\ngraph TD\n"
+        "A[顾客到店] --> B{是否会员}\nB -->|是| C[积分抵扣]\nB -->|否| D[引导注册]\nD --> C\nC --> E[完成支付]\n```",
+    ),
+)
+
+# 没有匹配到脚本时的回复
+FALLBACK_REPLY = "OK"
+
+
+@dataclass
+class RequestRecord:
+    """服务器侧记录的一次请求：用于计算 LLM 忙碌时间与编排开销"""
+    started_at: float
+    finished_at: float
+    matched: Optional[str]
+    stream: bool
+    completion_tokens: int
+
+
+@dataclass
+class FakeLlmServer:
+    """
+    本地 OpenAI 兼容的 LLM 桩服务 (POST /v1/chat/completions，支持 stream)
+
+    在独立线程中运行 uvicorn，LiteLLM 通过 OPENAI_API_BASE 指向 base_url 即可，
+    无需联网与密钥。延迟模型：首 token 等待 latency 秒，之后按 tokens_per_second 匀速输出。
+
+    Attributes:
+        script: 脚本化回复，按顺序匹配，第一条命中者生效
+        latency: 默认首 token 延迟 (秒)
+        tokens_per_second: 输出速率，<=0 表示不限速
+        chunk_tokens: 流式输出时每个 SSE 分块包含的 token 数
+        chars_per_token: 估算 token 数时每个 token 对应的字符数
+    """
+    script: Sequence[ScriptedReply] = DEFAULT_SCRIPT
+    latency: float = 0.05
+    tokens_per_second: float = 200.0
+    chunk_tokens: int = 4
+    chars_per_token: int = 4
+    host: str = "127.0.0.1"
+    port: int = 0
+    records: list[RequestRecord] = field(default_factory=list, init=False)
+
+    def __post_init__(self):
+        self._server: Optional[uvicorn.Server] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    # --------------------------------------------------------------
+    # 脚本与延迟模型
+    # --------------------------------------------------------------
+
+    def match(self, messages: list[dict], model: Optional[str] = None) -> Optional[ScriptedReply]:
+        system_prompt = "\n".join(_message_text(m) for m in messages if m.get("role") == "system")
+        haystack = system_prompt or (_message_text(messages[-1]) if messages else "")
+        for reply in self.script:
+            if reply.model is not None and reply.model != model:
+                continue
+            if reply.match in haystack:
+                return reply
+        return None
+
+    def _chunks(self, text: str) -> list[str]:
+        size = max(1, self.chunk_tokens * self.chars_per_token)
+        return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+    def _token_delay(self, text: str) -> float:
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return len(text) / self.chars_per_token / self.tokens_per_second
+
+    def _usage(self, messages: list[dict], text: str) -> dict:
+        prompt_tokens = sum(len(_message_text(m)) for m in messages) // self.chars_per_token
+        completion_tokens = max(1, len(text) // self.chars_per_token)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def _record(self, started_at: float, reply: Optional[ScriptedReply], stream: bool, usage: dict):
+        with self._lock:
+            self.records.append(RequestRecord(
+                started_at, time.perf_counter(), reply.match if reply else None, stream, usage["completion_tokens"]
+            ))
+
+    # --------------------------------------------------------------
+    # HTTP 接口
+    # --------------------------------------------------------------
+
+    async def _chat_completions(self, request: Request):
+        started_at = time.perf_counter()
+        body = await request.json()
+        messages = body.get("messages", [])
+        model = body.get("model", "fake")
+        reply = self.match(messages, model)
+        text = reply.text if reply else FALLBACK_REPLY
+        latency = self.latency if reply is None or reply.latency is None else reply.latency
+        usage = self._usage(messages, text)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await asyncio.sleep(latency + self._token_delay(text))
+            self._record(started_at, reply, False, usage)
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+        def chunk(delta: dict, finish_reason: Optional[str] = None, **extra) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                **extra,
+            }
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        async def events():
+            try:
+                await asyncio.sleep(latency)
+                yield chunk({"role": "assistant", "content": ""})
+                for piece in self._chunks(text):
+                    await asyncio.sleep(self._token_delay(piece))
+                    yield chunk({"content": piece})
+                yield chunk({}, "stop", usage=usage)
+                yield "data: [DONE]\n\n"
+            finally:
+                # 客户端提前断开 (例如审计结论已明确) 时同样记录
+                self._record(started_at, reply, True, usage)
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    def app(self) -> Starlette:
+        return Starlette(routes=[
+            Route("/v1/chat/completions", self._chat_completions, methods=["POST"]),
+            Route("/chat/completions", self._chat_completions, methods=["POST"]),
+        ])
+
+    # --------------------------------------------------------------
+    # 生命周期
+    # --------------------------------------------------------------
+
+    def start(self) -> "FakeLlmServer":
+        """在后台线程启动服务，返回时端口已就绪"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        self.port = sock.getsockname()[1]
+
+        config = uvicorn.Config(self.app(), log_level="warning", access_log=False, lifespan="off")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(
+            target=self._server.run, kwargs={"sockets": [sock]}, name="fake-llm-server", daemon=True
+        )
+        self._thread.start()
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError("Fake LLM server 启动失败")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join(timeout=5)
+            self._server = None
+
+    def __enter__(self) -> "FakeLlmServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def busy_time(self, start: float, end: float) -> float:
+        """[start, end] 内至少有一个请求在处理的总时长 (区间并集)"""
+        with self._lock:
+            intervals = sorted(
+                (max(r.started_at, start), min(r.finished_at, end))
+                for r in self.records if r.finished_at > start and r.started_at < end
+            )
+        busy, cursor = 0.0, start
+        for begin, finish in intervals:
+            begin = max(begin, cursor)
+            if finish > begin:
+                busy += finish - begin
+                cursor = finish
+        return busy
+
+
+def _message_text(message: dict) -> str:
+    """OpenAI 消息的 content 可能是字符串或分段列表"""
+    content = message.get("content") or ""
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") for part in content if isinstance(part, dict))
@@ -0,0 +1,293 @@
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Optional
+
+from google.genai import types
+
+from .fake_llm_server import FakeLlmServer
+
+APP_NAME = "pm_benchmark"
+FAKE_MODEL_NAME = "openai/fake-pm-model"
+
+# 三个阶段各对应一轮用户输入：(阶段名, 该轮结束后应处于的 workflow_step)
+PHASES: tuple[tuple[str, str], ...] = (
+    ("discovery", "discovery_check"),
+    ("logic_feasibility", "logic_check"),
+    ("documentation", "completed"),
+)
+
+DEFAULT_IDEA = "我想做一个帮助独立咖啡店管理会员积分和储值的小程序"
+DEFAULT_APPROVAL = "继续"
+
+
+@dataclass
+class PhaseTiming:
+    """
+    一轮对话 (一个阶段) 的耗时
+
+    Attributes:
+        phase: 阶段名
+        wall: 从发出用户消息到事件流结束的墙钟时间 (秒)
+        ttfe: 首个事件到达的时间 (time-to-first-event，秒)
+        llm_busy: 该阶段内至少有一个 LLM 请求在处理的时长；并发会话下为 None
+        events: 产出的事件数
+    """
+    phase: str
+    wall: float
+    ttfe: Optional[float]
+    llm_busy: Optional[float]
+    events: int
+
+    @property
+    def overhead(self) -> Optional[float]:
+        """编排开销：墙钟时间中没有任何 LLM 请求在处理的部分"""
+        return None if self.llm_busy is None else max(self.wall - self.llm_busy, 0.0)
+
+
+@dataclass
+class SessionResult:
+    session_id: str
+    phases: list[PhaseTiming] = field(default_factory=list)
+
+    @property
+    def wall(self) -> float:
+        return sum(phase.wall for phase in self.phases)
+
+
+@dataclass
+class BenchmarkReport:
+    """
+    基准测试结果
+
+    Attributes:
+        solo: 逐个串行运行的会话，用于测量单会话的阶段耗时与编排开销
+        concurrent: 同时启动的 N 个会话，用于测量吞吐
+        concurrent_wall: 并发批次的总墙钟时间
+        llm_requests: 桩服务收到的请求总数
+        metrics: 进程内指标快照 (utils.metrics)
+        agent_stats: 按智能体汇总的 LLM 跨度 (调用数、延迟、TTFT、token)，见 summarize_llm_spans
+    """
+    solo: list[SessionResult]
+    concurrent: list[SessionResult]
+    concurrent_wall: float
+    llm_requests: int
+    metrics: dict[str, int]
+    agent_stats: dict[str, dict] = field(default_factory=dict)
+
+    @property
+    def throughput(self) -> float:
+        """并发批次每秒完成的会话数"""
+        return len(self.concurrent) / self.concurrent_wall if self.concurrent_wall else 0.0
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["throughput"] = self.throughput
+        return data
+
+
+def configure_environment(
+    server: FakeLlmServer,
+    state_dir: str,
+    checkpoints: bool = True,
+    speculative: bool = False,
+    optimistic: bool = False,
+    hedge: bool = False,
+):
+    """
+    让流水线指向本地桩服务并隔离本地状态
+    必须在导入 multi_agents_app 之前调用 (模型名与检查点路径在首次使用时读取)
+    """
+    os.environ["MODEL_NAME"] = FAKE_MODEL_NAME
+    os.environ["OPENAI_API_BASE"] = server.base_url
+    os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+    os.environ["STRUCTURED_OUTPUT"] = "off"
+    # 响应缓存会让第二次运行完全不经过桩服务，基准测试中始终关闭
+    os.environ["LLM_CACHE_MODE"] = "bypass"
+    os.environ["PM_CHECKPOINT_DB"] = (
+        os.path.join(state_dir, "checkpoints.sqlite3") if checkpoints else "off"
+    )
+    os.environ["PM_SPECULATIVE"] = "1" if speculative else "0"
+    os.environ["DISCOVERY_OPTIMISTIC_GATE"] = "1" if optimistic else "0"
+    os.environ["LLM_HEDGE"] = "on" if hedge else "off"
+    os.environ["PRD_OUTPUT_DIR"] = os.path.join(state_dir, "prd")
+    os.environ["PM_BLOB_STORE"] = os.path.join(state_dir, "blobs")
+    os.environ["PM_KNOWLEDGE_INDEX"] = os.path.join(state_dir, "knowledge.sqlite3")
+
+
+def _percentile(values: list[float], q: float) -> float:
+    """最近秩百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize_llm_spans(spans) -> dict[str, dict]:
+    """按 llm 跨度所属的智能体汇总，定位 p95 延迟与 token 开销的来源"""
+    by_agent: dict[str, list] = {}
+    for span in spans:
+        if span.kind == "llm":
+            by_agent.setdefault(span.attributes.get("agent", "unknown"), []).append(span)
+    stats = {}
+    for agent, agent_spans in sorted(by_agent.items()):
+        latencies = [span.duration for span in agent_spans if span.duration is not None]
+        ttfts = [span.attributes["ttft"] for span in agent_spans if "ttft" in span.attributes]
+        stats[agent] = {
+            "calls": len(agent_spans),
+            "latency_p50": _percentile(latencies, 50),
+            "latency_p95": _percentile(latencies, 95),
+            "ttft_p50": _percentile(ttfts, 50) if ttfts else None,
+            "prompt_tokens": sum(span.attributes.get("prompt_tokens", 0) for span in agent_spans),
+            "completion_tokens": sum(span.attributes.get("completion_tokens", 0) for span in agent_spans),
+        }
+    return stats
+
+
+async def run_session(
+    runner,
+    server: FakeLlmServer,
+    idea: str = DEFAULT_IDEA,
+    approval: str = DEFAULT_APPROVAL,
+    measure_llm: bool = True,
+    think_time: float = 0.0,
+) -> SessionResult:
+    """
+    驱动一个会话跑完三个阶段：想法 -> 继续 -> 继续
+    think_time 模拟用户在确认点阅读产出的时间，不计入阶段耗时
+
+    Raises:
+        RuntimeError: 某一轮结束后 workflow_step 不是预期值 (流程回归)
+    """
+    user_id = "bench_user"
+    session = await runner.session_service.create_session(
+        app_name=runner.app_name, user_id=user_id, session_id=f"bench-{uuid.uuid4().hex[:12]}"
+    )
+    result = SessionResult(session.id)
+
+    for turn, ((phase, expected_step), text) in enumerate(zip(PHASES, (idea, approval, approval))):
+        if turn and think_time:
+            await asyncio.sleep(think_time)
+        message = types.Content(role="user", parts=[types.Part(text=text)])
+        started_at = time.perf_counter()
+        ttfe = None
+        events = 0
+        async for _ in runner.run_async(user_id=user_id, session_id=session.id, new_message=message):
+            if ttfe is None:
+                ttfe = time.perf_counter() - started_at
+            events += 1
+        finished_at = time.perf_counter()
+
+        session = await runner.session_service.get_session(
+            app_name=runner.app_name, user_id=user_id, session_id=session.id
+        )
+        workflow_step = session.state.get("workflow_step")
+        if workflow_step != expected_step:
+            raise RuntimeError(
+                f"会话 {session.id} 的阶段 {phase} 结束后 workflow_step={workflow_step!r}，预期 {expected_step!r}"
+            )
+        result.phases.append(PhaseTiming(
+            phase=phase,
+            wall=finished_at - started_at,
+            ttfe=ttfe,
+            llm_busy=server.busy_time(started_at, finished_at) if measure_llm else None,
+            events=events,
+        ))
+    return result
+
+
+async def run_benchmark(
+    server: FakeLlmServer,
+    sessions: int = 4,
+    solo_runs: int = 3,
+    warmup: int = 1,
+    idea: str = DEFAULT_IDEA,
+    approval: str = DEFAULT_APPROVAL,
+    think_time: float = 0.0,
+) -> BenchmarkReport:
+    """
+    依次执行：预热会话 (不计入结果) -> solo_runs 个串行会话 -> sessions 个并发会话
+    调用前需先 configure_environment
+    """
+    from google.adk.runners import InMemoryRunner
+    from multi_agents_app.agent import root_agent
+    from utils import InMemoryExporter, metrics, tracer
+
+    runner = InMemoryRunner(agent=root_agent.warm_up(), app_name=APP_NAME)
+
+    for _ in range(warmup):
+        await run_session(runner, server, idea, approval, think_time=think_time)
+    metrics.reset()
+    exporter = InMemoryExporter()
+    previous_exporter = tracer.exporter
+    tracer.configure(exporter=exporter, sample_rate=1.0)
+    requests_before = len(server.records)
+
+    # 每个会话的想法互不相同，否则相同的请求会被 singleflight 合并，吞吐失真
+    solo = [
+        await run_session(runner, server, f"{idea} (solo-{i})", approval, think_time=think_time)
+        for i in range(solo_runs)
+    ]
+
+    started_at = time.perf_counter()
+    concurrent = await asyncio.gather(*(
+        run_session(runner, server, f"{idea} (session-{i})", approval, measure_llm=False, think_time=think_time)
+        for i in range(sessions)
+    ))
+    concurrent_wall = time.perf_counter() - started_at
+    tracer.configure(exporter=previous_exporter)
+
+    return BenchmarkReport(
+        solo=solo,
+        concurrent=list(concurrent),
+        concurrent_wall=concurrent_wall,
+        llm_requests=len(server.records) - requests_before,
+        metrics=metrics.snapshot(),
+        agent_stats=summarize_llm_spans(exporter.spans),
+    )
+
+
+def format_report(report: BenchmarkReport) -> str:
+    """以文本表格输出各阶段 p50/p95 与吞吐"""
+    def ms(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value * 1000:9.1f}"
+
+    lines = [
+        f"{'phase':<20}{'wall p50':>10}{'wall p95':>10}{'ttfe p50':>10}{'overhead':>10}{'conc p95':>10}  (ms)",
+    ]
+    for index, (phase, _) in enumerate(PHASES):
+        solo = [session.phases[index] for session in report.solo]
+        concurrent = [session.phases[index] for session in report.concurrent]
+        overheads = [timing.overhead for timing in solo if timing.overhead is not None]
+        ttfes = [timing.ttfe for timing in solo if timing.ttfe is not None]
+        lines.append(
+            f"{phase:<20}"
+            f"{ms(_percentile([t.wall for t in solo], 50)) if solo else '-':>10}"
+            f"{ms(_percentile([t.wall for t in solo], 95)) if solo else '-':>10}"
+            f"{ms(_percentile(ttfes, 50)) if ttfes else '-':>10}"
+            f"{ms(_percentile(overheads, 50)) if overheads else '-':>10}"
+            f"{ms(_percentile([t.wall for t in concurrent], 95)) if concurrent else '-':>10}"
+        )
+    lines.append(
+        f"concurrency={len(report.concurrent)}  wall={report.concurrent_wall:.2f}s  "
+        f"throughput={report.throughput:.2f} sessions/s  llm_requests={report.llm_requests}"
+    )
+    if report.agent_stats:
+        lines.append("")
+        lines.append(f"{'agent':<40}{'calls':>6}{'lat p50':>10}{'lat p95':>10}{'ttft p50':>10}{'prompt':>9}{'compl':>8}")
+        for agent, stats in report.agent_stats.items():
+            lines.append(
+                f"{agent:<40}{stats['calls']:>6}{ms(stats['latency_p50'])}{ms(stats['latency_p95'])}"
+                f"{ms(stats['ttft_p50']):>10}{stats['prompt_tokens']:>9}{stats['completion_tokens']:>8}"
+            )
+    if report.metrics:
+        lines.append("metrics: " + ", ".join(f"{k}={v}" for k, v in sorted(report.metrics.items())))
+    return "\n".join(lines)
+
+
+def temporary_state_dir() -> tempfile.TemporaryDirectory:
+    return tempfile.TemporaryDirectory(prefix="pm_bench_")
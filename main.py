@@ -0,0 +1,4 @@
+from multi_agents_app.batch import main
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,18 @@
 import logging
-from typing import AsyncGenerator
+import os
+from typing import AsyncGenerator, ClassVar, Optional
+from pydantic import PrivateAttr
 from google.adk.agents import BaseAgent
-from google.adk.events import Event
+from google.adk.events import Event, EventActions
 from google.adk.agents import InvocationContext
+from google.genai import types
 
-from agents import discovery_agent
-from agents import architect_agent
-from agents import researcher_agent
-from agents import reviewer_agent
-from agents import writer_agent
-from agents import discovery_loop_agent
+from agents import agent_registry
+from agents.reviewer_agent import review_is_redundant
+from utils import AgentInfo, Checkpoint, CheckpointStore, DeadlineExceeded, KnowledgeIndex, blob_store, metrics, tracer
+from utils import deadline, phase_deadline
+from .speculation import Speculation
+from .step_graph import Step, StepGraph
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -20,44 +23,336 @@ class PMAgentCenter(BaseAgent):
     
     实现 README.md 中描述的“混合驱动 (Hybrid Workflow)”架构：
     1. 阶段 1 (Sequential): Discovery Agent 进行需求挖掘
-    2. 阶段 2 (Custom Logic): 逻辑与可行性建模 (Researcher -> Architect -> Reviewer -> Architect)
+    2. 阶段 2 (Custom Logic): 逻辑与可行性建模，按步骤图 (DAG) 调度：
+       Researcher 与 Architect 初稿并发 -> Reviewer 审计初稿 -> Architect 终稿 (章节级补丁)
     3. 阶段 3 (Sequential): Writer Agent 输出标准化 PRD
+
+    开启 speculative (环境变量 PM_SPECULATIVE=1) 时，到达人工确认点后立即在会话副本上
+    后台预跑下一阶段：用户回复“继续”时直接提交预跑结果，回复其他内容则丢弃。
+
+    会话结束时把调研情报、逻辑蓝图与 PRD 写入本地知识索引 (PM_KNOWLEDGE_INDEX)；
+    进入阶段 2 时按需求定义检索历史会话中的相关段落，写入 state 供 Researcher 复用。
+
+    每个阶段在 PM_PHASE_DEADLINES 配置的时限内运行：截止时间经 contextvars 传到模型层，
+    超时的调用抛出 DeadlineExceeded，本轮以提示消息结束，下次运行从未完成的步骤继续。
     """
 
-    discovery_agent: BaseAgent
-    researcher_agent: BaseAgent
-    architect_agent: BaseAgent
-    reviewer_agent: BaseAgent
-    writer_agent: BaseAgent
+    # 子步骤检查点存储，None 表示关闭
+    checkpoint_store: Optional[CheckpointStore] = None
+
+    # 是否在人工确认点预跑下一阶段
+    speculative: bool = False
+
+    # 历史产出的检索索引，None 表示关闭
+    knowledge_index: Optional[KnowledgeIndex] = None
 
     # 允许 Pydantic 处理自定义类类型
     model_config = {"arbitrary_types_allowed": True}
 
+    # 各阶段使用的子智能体 (AgentInfo 条目)，实例由注册表在首次进入该阶段时构建
+    STAGE_AGENTS: ClassVar[tuple[dict, ...]] = (
+        AgentInfo.DISCOVERY_AGENT,
+        AgentInfo.RESEARCHER_AGENT,
+        AgentInfo.ARCHITECT_AGENT,
+        AgentInfo.FLOW_ANALYZER_AGENT,
+        AgentInfo.REVIEWER_AGENT,
+        AgentInfo.ARCHITECT_REVISER_AGENT,
+        AgentInfo.WRITER_AGENT,
+    )
+
+    # 确认点 -> 确认后进入的阶段
+    NEXT_PHASE: ClassVar[dict[str, str]] = {
+        "discovery_check": "logic_feasibility",
+        "logic_check": "documentation",
+    }
+    # 预跑期间允许变化的 state (审批标记与进度)
+    SPECULATION_IGNORED_KEYS: ClassVar[frozenset[str]] = frozenset(
+        {"workflow_step", "discovery_approved", "logic_approved", "state_version"}
+    )
+    # 写入知识索引的产出 (state key -> 提示词中的来源标签)
+    KNOWLEDGE_SOURCES: ClassVar[dict[str, str]] = {
+        AgentInfo.RESEARCHER_AGENT["output_key"]: "调研情报",
+        AgentInfo.ARCHITECT_AGENT["output_key"]: "逻辑蓝图",
+        AgentInfo.WRITER_AGENT["output_key"]: "PRD",
+    }
+    # 同时保留的预跑结果上限，超出时丢弃最早的
+    MAX_SPECULATIONS: ClassVar[int] = 64
+
+    # session_id -> 进行中或已完成的预跑
+    _speculations: dict[str, Speculation] = PrivateAttr(default_factory=dict)
+
     def __init__(self, name="PM_Agent_Center"):
-        # 定义所有参与的子智能体
-        sub_agents = [
-            # discovery_agent,
-            discovery_loop_agent,
-            researcher_agent,
-            architect_agent,
-            reviewer_agent,
-            writer_agent
-        ]
-        
         super().__init__(
             name=name,
             description="虚拟产研中心：从模糊想法到全套 PRD 的产出",
-            sub_agents=sub_agents,
-            # 将智能体实例传入 super().__init__ 以通过 Pydantic 校验
-            # discovery_agent=discovery_agent,
-            discovery_agent=discovery_loop_agent,
-            researcher_agent=researcher_agent,
-            architect_agent=architect_agent,
-            reviewer_agent=reviewer_agent,
-            writer_agent=writer_agent
+            sub_agents=[],
+            checkpoint_store=CheckpointStore.from_env(),
+            knowledge_index=KnowledgeIndex.from_env(),
+            speculative=os.getenv("PM_SPECULATIVE", "").lower() in ("1", "true", "on"),
         )
 
+    def _stage_agent(self, agent_config: dict) -> BaseAgent:
+        """从注册表获取子智能体，首次获取时挂载到智能体树上"""
+        agent = agent_registry.get(agent_config)
+        if agent.parent_agent is None:
+            agent.parent_agent = self
+            self.sub_agents.append(agent)
+        return agent
+
+    @property
+    def discovery_agent(self) -> BaseAgent:
+        return self._stage_agent(AgentInfo.DISCOVERY_AGENT)
+
+    @property
+    def researcher_agent(self) -> BaseAgent:
+        return self._stage_agent(AgentInfo.RESEARCHER_AGENT)
+
+    @property
+    def architect_agent(self) -> BaseAgent:
+        return self._stage_agent(AgentInfo.ARCHITECT_AGENT)
+
+    @property
+    def flow_analyzer(self) -> BaseAgent:
+        return self._stage_agent(AgentInfo.FLOW_ANALYZER_AGENT)
+
+    @property
+    def reviewer_agent(self) -> BaseAgent:
+        return self._stage_agent(AgentInfo.REVIEWER_AGENT)
+
+    @property
+    def architect_reviser(self) -> BaseAgent:
+        return self._stage_agent(AgentInfo.ARCHITECT_REVISER_AGENT)
+
+    @property
+    def writer_agent(self) -> BaseAgent:
+        return self._stage_agent(AgentInfo.WRITER_AGENT)
+
+    def warm_up(self) -> "PMAgentCenter":
+        """
+        一次性构建全部子智能体及其模型客户端 (读取提示词、加载 .env)
+        供长驻服务在启动后调用，避免首个请求承担冷启动开销
+        """
+        for agent_config in self.STAGE_AGENTS:
+            self._stage_agent(agent_config)
+        logger.info(f"[{self.name}] 预热完成，共 {len(self.sub_agents)} 个子智能体")
+        return self
+
+    def _logic_team_graph(self) -> StepGraph:
+        """
+        阶段 2 的步骤图：
+        - 2.1 Researcher 访谈调研 与 2.2 Architect 基于 discovery_output 的初稿 互不依赖，并发执行
+        - 2.3 Reviewer 只依赖初稿；先由本地流程图预检给出结构性问题，
+          流程图干净且与上次审计时一致时跳过 LLM 审计
+        - 2.4 Architect 终稿需要同时吸收调研情报与审计意见：只输出受影响章节的补丁，在本地合并
+        """
+        return StepGraph([
+            Step("research", self.researcher_agent, description="Step 2.1: Researcher 进行访谈与调研"),
+            Step("draft", self.architect_agent, description="Step 2.2: Architect 输出初步逻辑蓝图"),
+            Step("prescreen", self.flow_analyzer, depends_on=("draft",),
+                 description="Step 2.3a: 本地解析 Mermaid 流程图并做结构检查"),
+            Step("review", self.reviewer_agent, depends_on=("prescreen",),
+                 description="Step 2.3: Reviewer 进行逻辑审计与压力测试",
+                 skip_if=lambda ctx: review_is_redundant(ctx.session.state)),
+            Step("finalize", self.architect_reviser, depends_on=("research", "review"),
+                 description="Step 2.4: Architect 根据调研与审计意见输出章节补丁，本地合并为终稿"),
+        ])
+
+    async def _restore_checkpoints(
+        self, ctx: InvocationContext, checkpoints: dict[str, Checkpoint]
+    ) -> AsyncGenerator[Event, None]:
+        """
+        将会话中尚未包含的检查点产出重新写回：
+        以原智能体名义产出一条事件，使 state 与后续智能体看到的对话历史都与中断前一致
+        """
+        for checkpoint in checkpoints.values():
+            if ctx.session.state.get("state_version", 0) >= checkpoint.state_version:
+                continue
+            logger.info(f"[{self.name}] 从检查点恢复步骤 {checkpoint.step} (state_version={checkpoint.state_version})")
+            # 检查点保存原文；较早写入的检查点可能是 blob 引用，对话历史中需要展开
+            output = blob_store.resolve(checkpoint.output)
+            state_delta = {"state_version": checkpoint.state_version}
+            if checkpoint.output_key:
+                state_delta[checkpoint.output_key] = output
+            yield Event(
+                author=checkpoint.agent_name,
+                invocation_id=ctx.invocation_id,
+                content=types.Content(role="model", parts=[types.Part(text=output or "")]),
+                actions=EventActions(state_delta=state_delta),
+            )
+
+    def _state_event(self, ctx: InvocationContext, **state_delta) -> Event:
+        """
+        以 state_delta 事件的形式更新编排状态
+        直接修改 ctx.session.state 不会被 SessionService 持久化，下一轮对话会丢失进度
+        """
+        return Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            actions=EventActions(state_delta=state_delta),
+        )
+
+    def _hitl_event(self, ctx: InvocationContext, message: str) -> Event:
+        return Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            content=types.Content(role="model", parts=[types.Part(text=message)]),
+        )
+
+    def _record_checkpoint(self, ctx: InvocationContext, phase: str, step: Step) -> Event:
+        """步骤完成后记录其产出，返回写入对应 state 版本的事件"""
+        output_key = getattr(step.agent, "output_key", None)
+        # state 中可能是 blob 引用，检查点保存原文 (恢复时既写回 state 也作为对话历史)
+        output = blob_store.resolve(ctx.session.state.get(output_key)) if output_key else None
+        version = self.checkpoint_store.record(
+            ctx.session.id, phase, step.name, step.agent.name, output_key,
+            output if output is None or isinstance(output, str) else str(output),
+        )
+        return self._state_event(ctx, state_version=version)
+
+    def _prior_research_event(self, ctx: InvocationContext) -> Optional[Event]:
+        """用需求定义检索历史会话中的相关产出，返回写入 prior_key 的事件；索引关闭时返回 None"""
+        if self.knowledge_index is None:
+            return None
+        query = blob_store.resolve(ctx.session.state.get(AgentInfo.DISCOVERY_AGENT["output_key"])) or ""
+        with tracer.span("knowledge_index", "retrieval") as span:
+            try:
+                hits = self.knowledge_index.search(query, exclude_session=ctx.session.id)
+            except Exception as e:
+                logger.warning(f"[{self.name}] 历史情报检索失败: {e}")
+                hits = []
+            span.set(hits=len(hits))
+        metrics.increment("knowledge.lookup", outcome="hit" if hits else "miss")
+        if hits:
+            logger.info(f"[{self.name}] 从历史会话检索到 {len(hits)} 段相关情报")
+        return self._state_event(
+            ctx, **{AgentInfo.RESEARCHER_AGENT["prior_key"]: self.knowledge_index.render(hits, self.KNOWLEDGE_SOURCES)}
+        )
+
+    def _index_session(self, ctx: InvocationContext):
+        """会话结束时把本会话的产出写入知识索引 (覆盖同一会话之前写入的内容)"""
+        if self.knowledge_index is None:
+            return
+        documents = {key: blob_store.resolve(ctx.session.state.get(key)) for key in self.KNOWLEDGE_SOURCES}
+        try:
+            count = self.knowledge_index.index_session(
+                ctx.session.id, {key: text for key, text in documents.items() if isinstance(text, str)}
+            )
+        except Exception as e:
+            logger.warning(f"[{self.name}] 写入知识索引失败: {e}")
+            return
+        metrics.increment("knowledge.indexed_passages", count)
+
+    async def _run_logic_team(
+        self, ctx: InvocationContext, record_checkpoints: bool = True
+    ) -> AsyncGenerator[Event, None]:
+        """阶段 2：按步骤图运行逻辑团队；record_checkpoints 为 False 时既不恢复也不记录检查点"""
+        prior_event = self._prior_research_event(ctx)
+        if prior_event is not None:
+            yield prior_event
+
+        graph = self._logic_team_graph()
+        completed = {}
+        on_step_done = None
+        if record_checkpoints and self.checkpoint_store:
+            # 跳过已完成的子步骤，只从第一个未完成的步骤继续
+            completed = self.checkpoint_store.completed(ctx.session.id, "logic_feasibility")
+            async for event in self._restore_checkpoints(ctx, completed):
+                yield event
+            on_step_done = lambda step: self._record_checkpoint(ctx, "logic_feasibility", step)
+            span = tracer.current()
+            if span is not None:
+                span.set(restored_steps=sorted(completed))
+
+        async for event in graph.run(ctx, completed=completed, on_step_done=on_step_done):
+            yield event
+
+    async def _run_documentation(self, ctx: InvocationContext, write_file: bool = True) -> AsyncGenerator[Event, None]:
+        """阶段 3：Writer 输出 PRD；write_file=False 时只生成不写文件 (ctx 为预跑的会话副本)"""
+        agent = self.writer_agent
+        if not write_file:
+            ctx.session.state[AgentInfo.WRITER_AGENT["defer_key"]] = True
+        async for event in tracer.trace_events(agent.run_async(ctx), agent.name, "agent"):
+            yield event
+
+    @staticmethod
+    async def _within_deadline(phase: str, events: AsyncGenerator[Event, None]) -> AsyncGenerator[Event, None]:
+        """在阶段时限内消费阶段事件流；超时由模型层抛出 DeadlineExceeded"""
+        with deadline(phase_deadline(phase)):
+            async for event in events:
+                yield event
+
+    def _phase_runner(self, phase: str):
+        if phase == "logic_feasibility":
+            # 预跑结果可能被丢弃，不能写入检查点
+            return lambda ctx: self._run_logic_team(ctx, record_checkpoints=False)
+        # 预跑结果可能被丢弃，PRD 文件在提交预跑结果时才写出
+        return lambda ctx: self._run_documentation(ctx, write_file=False)
+
+    def _speculate(self, ctx: InvocationContext, gate: str, hitl_event: Event):
+        """到达确认点时在会话副本上后台预跑下一阶段"""
+        phase = self.NEXT_PHASE[gate]
+        self._discard_speculation(ctx.session.id)
+        while len(self._speculations) >= self.MAX_SPECULATIONS:
+            self._discard_speculation(next(iter(self._speculations)))
+
+        runner = self._phase_runner(phase)
+
+        async def run(fork_ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+            events = self._within_deadline(phase, runner(fork_ctx))
+            async for event in tracer.trace_events(events, phase, "phase", speculative=True):
+                yield event
+
+        logger.info(f"[{self.name}] 确认点 {gate}：后台预跑阶段 {phase}")
+        self._speculations[ctx.session.id] = Speculation(phase, ctx, run, pending_events=[hitl_event])
+
+    def _discard_speculation(self, session_id: str):
+        speculation = self._speculations.pop(session_id, None)
+        if speculation is not None:
+            speculation.cancel()
+            logger.info(f"[{self.name}] 丢弃会话 {session_id} 的预跑阶段 {speculation.phase}")
+
+    def _take_speculation(self, ctx: InvocationContext, phase: str) -> Optional[Speculation]:
+        """取出可直接提交的预跑结果；阶段不符或会话在此期间发生了变化时丢弃"""
+        speculation = self._speculations.get(ctx.session.id)
+        if speculation is None:
+            return None
+        if speculation.phase != phase or not speculation.is_valid_for(
+            ctx.session, {"user", self.name}, set(self.SPECULATION_IGNORED_KEYS)
+        ):
+            self._discard_speculation(ctx.session.id)
+            return None
+        del self._speculations[ctx.session.id]
+        logger.info(f"[{self.name}] 提交预跑结果：阶段 {phase}")
+        return speculation
+
     async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        """
+        每次调用对应一个 session 跨度，阶段、子智能体与 LLM 调用的跨度都挂在其下
+
+        事件交给 Runner 写入会话之前，state_delta 中的大段产出转存到 blob 存储，
+        session.state 与持久化的会话只保存引用 (提示词渲染时再展开)
+        """
+        events = self._run_workflow(ctx)
+        try:
+            async for event in tracer.trace_events(
+                events, self.name, "session",
+                session_id=ctx.session.id,
+                invocation_id=ctx.invocation_id,
+                workflow_step=ctx.session.state.get("workflow_step", "discovery"),
+            ):
+                if event.actions and event.actions.state_delta:
+                    blob_store.offload_delta(event.actions.state_delta)
+                yield event
+        except DeadlineExceeded as e:
+            # 阶段进度只在完成后推进，已完成的子步骤有检查点，下次运行从中断处继续
+            phase = ctx.session.state.get("workflow_step", "discovery")
+            logger.warning(f"[{self.name}] 阶段 {phase} 超时: {e}")
+            metrics.increment("workflow.deadline_exceeded", phase=phase)
+            yield self._hitl_event(
+                ctx, f"[Timeout] 阶段 {phase} 未能在时限内完成。已完成的步骤已保存，再次发送消息即可从中断处继续。"
+            )
+
+    async def _run_workflow(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
         """
         核心编排逻辑，支持人机交互 (HITL)
         """
@@ -72,13 +367,16 @@ class PMAgentCenter(BaseAgent):
                     last_user_msg = part.text.strip()
                     break
         
-        if "继续" in last_user_msg:
+        if "继续" not in last_user_msg:
+            # 用户修改了需求 (或没有确认)，预跑结果作废
+            self._discard_speculation(ctx.session.id)
+        else:
             current_workflow_step = ctx.session.state.get("workflow_step")
             if current_workflow_step == "discovery_check":
-                ctx.session.state["discovery_approved"] = True
+                yield self._state_event(ctx, discovery_approved=True)
                 logger.info(f"[{self.name}] 收到人工指令：确认需求阶段，准备进入下一阶段。")
             elif current_workflow_step == "logic_check":
-                ctx.session.state["logic_approved"] = True
+                yield self._state_event(ctx, logic_approved=True)
                 logger.info(f"[{self.name}] 收到人工指令：确认架构阶段，准备输出文档。")
 
         # 获取当前进度
@@ -89,11 +387,15 @@ class PMAgentCenter(BaseAgent):
         # ==========================================
         if current_step == "discovery":
             logger.info(f"[{self.name}] === 进入阶段 1：需求对齐 (Discovery) ===")
-            async for event in self.discovery_agent.run_async(ctx):
+            agent = self.discovery_agent
+            events = self._within_deadline(
+                current_step, tracer.trace_events(agent.run_async(ctx), agent.name, "agent")
+            )
+            async for event in tracer.trace_events(events, current_step, "phase"):
                 yield event
             
             # 标记该阶段完成，进入人工确认
-            ctx.session.state["workflow_step"] = "discovery_check"
+            yield self._state_event(ctx, workflow_step="discovery_check")
             current_step = "discovery_check"
 
         # --- 人工确认点：需求确认 ---
@@ -101,13 +403,16 @@ class PMAgentCenter(BaseAgent):
             approval = ctx.session.state.get("discovery_approved", False)
             if not approval:
                 logger.info(f"[{self.name}] 等待人工确认需求挖掘结果...")
-                yield Event(
-                    author=self.name, 
-                    content="[HITL] 阶段 1 (需求挖掘) 已完成。请检查以上产出并确认。输入 '继续' 或在系统中设置 'discovery_approved=True' 以继续。"
+                hitl_event = self._hitl_event(
+                    ctx,
+                    "[HITL] 阶段 1 (需求挖掘) 已完成。请检查以上产出并确认。输入 '继续' 或在系统中设置 'discovery_approved=True' 以继续。"
                 )
+                if self.speculative:
+                    self._speculate(ctx, "discovery_check", hitl_event)
+                yield hitl_event
                 return # 中断执行，等待下次运行
             
-            ctx.session.state["workflow_step"] = "logic_feasibility"
+            yield self._state_event(ctx, workflow_step="logic_feasibility")
             current_step = "logic_feasibility"
 
         # ==========================================
@@ -116,27 +421,17 @@ class PMAgentCenter(BaseAgent):
         if current_step == "logic_feasibility":
             logger.info(f"[{self.name}] === 进入阶段 2：逻辑与可行性建模 (Logic Team) ===")
             
-            # 2.1 市场/竞品调研 (Researcher)
-            logger.info(f"[{self.name}] Step 2.1: Researcher 进行访谈与调研...")
-            async for event in self.researcher_agent.run_async(ctx):
-                yield event
-
-            # 2.2 初步架构设计 (Architect - Draft)
-            logger.info(f"[{self.name}] Step 2.2: Architect 输出初步逻辑蓝图...")
-            async for event in self.architect_agent.run_async(ctx):
-                yield event
-
-            # 2.3 逻辑审计 (Reviewer)
-            logger.info(f"[{self.name}] Step 2.3: Reviewer 进行逻辑审计与压力测试...")
-            async for event in self.reviewer_agent.run_async(ctx):
-                yield event
-
-            # 2.4 架构修正 (Architect - Finalize)
-            logger.info(f"[{self.name}] Step 2.4: Architect 根据审计意见进行最终修正...")
-            async for event in self.architect_agent.run_async(ctx):
+            speculation = self._take_speculation(ctx, current_step)
+            events = (
+                speculation.replay(ctx.invocation_id) if speculation
+                else self._within_deadline(current_step, self._run_logic_team(ctx))
+            )
+            async for event in tracer.trace_events(
+                events, current_step, "phase", speculative=speculation is not None
+            ):
                 yield event
             
-            ctx.session.state["workflow_step"] = "logic_check"
+            yield self._state_event(ctx, workflow_step="logic_check")
             current_step = "logic_check"
 
         # --- 人工确认点：架构确认 ---
@@ -144,13 +439,16 @@ class PMAgentCenter(BaseAgent):
             approval = ctx.session.state.get("logic_approved", False)
             if not approval:
                 logger.info(f"[{self.name}] 等待人工确认架构设计结果...")
-                yield Event(
-                    author=self.name, 
-                    content="[HITL] 阶段 2 (逻辑与架构) 已完成。请检查架构图与审计建议。确认无误后请回复 '继续'。"
+                hitl_event = self._hitl_event(
+                    ctx,
+                    "[HITL] 阶段 2 (逻辑与架构) 已完成。请检查架构图与审计建议。确认无误后请回复 '继续'。"
                 )
+                if self.speculative:
+                    self._speculate(ctx, "logic_check", hitl_event)
+                yield hitl_event
                 return
             
-            ctx.session.state["workflow_step"] = "documentation"
+            yield self._state_event(ctx, workflow_step="documentation")
             current_step = "documentation"
 
         # ==========================================
@@ -158,10 +456,22 @@ class PMAgentCenter(BaseAgent):
         # ==========================================
         if current_step == "documentation":
             logger.info(f"[{self.name}] === 进入阶段 3：文档标准化 (Documentation) ===")
-            async for event in self.writer_agent.run_async(ctx):
+            speculation = self._take_speculation(ctx, current_step)
+            events = (
+                speculation.replay(ctx.invocation_id) if speculation
+                else self._within_deadline(current_step, self._run_documentation(ctx))
+            )
+            async for event in tracer.trace_events(
+                events, current_step, "phase", speculative=speculation is not None
+            ):
                 yield event
-            
-            ctx.session.state["workflow_step"] = "completed"
+            if speculation is not None:
+                path = self.writer_agent.save(ctx)
+                if path:
+                    yield self._state_event(ctx, **{AgentInfo.WRITER_AGENT["path_key"]: path})
+
+            self._index_session(ctx)
+            yield self._state_event(ctx, workflow_step="completed")
             logger.info(f"[{self.name}] 工作流全部结束。")
 
 # 实例化应用智能体
@@ -0,0 +1,295 @@
+"""
+批量入口：把 JSONL 中的每条产品想法作为独立会话跑完整条流水线
+
+    python main.py ideas.jsonl --output outputs/batch --concurrency 4 --approve auto
+
+输入每行一个 JSON 对象，字段与 requests.jsonl 一致 (request_id / title / body)，
+也接受 {"id": ..., "idea": ...}。每个会话结束后立即写出：
+    <output>/<id>/Product_Requirement_Document.md
+    <output>/<id>/state.json
+并向 <output>/summary.jsonl 追加一行结果。
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import asdict, dataclass
+from typing import Iterable, Optional
+
+from google.adk.agents import BaseAgent
+from google.genai import types
+
+from utils import AgentInfo, blob_store, rate_limiters
+from utils.rate_limiter import parse_rate_limits
+
+logger = logging.getLogger(__name__)
+
+PRD_FILE = "Product_Requirement_Document.md"
+STATE_FILE = "state.json"
+SUMMARY_FILE = "summary.jsonl"
+
+# 人工确认点及其在 session.state 中的审批标记
+GATES = {"discovery": "discovery_approved", "logic": "logic_approved"}
+
+
+@dataclass(frozen=True)
+class IdeaRecord:
+    """一条待处理的产品想法"""
+    id: str
+    text: str
+
+    @classmethod
+    def from_json(cls, data: dict, line_no: int) -> "IdeaRecord":
+        record_id = str(data.get("request_id") or data.get("id") or f"idea-{line_no:04d}")
+        if "idea" in data:
+            text = str(data["idea"])
+        else:
+            text = "\n\n".join(str(data[key]) for key in ("title", "body") if data.get(key))
+        if not text.strip():
+            raise ValueError(f"第 {line_no} 行没有 idea / title / body 字段")
+        return cls(record_id, text)
+
+
+def load_ideas(path: str) -> list[IdeaRecord]:
+    """读取 JSONL，跳过空行；id 重复时报错，避免输出目录互相覆盖"""
+    records = []
+    with open(path, "r", encoding="utf-8") as file:
+        for line_no, line in enumerate(file, start=1):
+            if line.strip():
+                records.append(IdeaRecord.from_json(json.loads(line), line_no))
+    ids = [record.id for record in records]
+    duplicated = sorted({record_id for record_id in ids if ids.count(record_id) > 1})
+    if duplicated:
+        raise ValueError(f"输入中存在重复的 id: {duplicated}")
+    return records
+
+
+@dataclass(frozen=True)
+class ApprovalPolicy:
+    """
+    人工确认点的自动审批策略
+    被自动审批的确认点在会话创建时写入对应的 *_approved 标记，编排器不会在此中断
+    """
+    discovery: bool = True
+    logic: bool = True
+
+    @classmethod
+    def parse(cls, value: str) -> "ApprovalPolicy":
+        """auto (全部自动通过) / none (全部停下等待人工) / 逗号分隔的确认点名称，如 "discovery" """
+        value = value.strip().lower()
+        if value == "auto":
+            return cls(True, True)
+        if value == "none":
+            return cls(False, False)
+        gates = {gate.strip() for gate in value.split(",") if gate.strip()}
+        unknown = gates - set(GATES)
+        if unknown:
+            raise ValueError(f"未知的确认点: {sorted(unknown)}，可选 {sorted(GATES)} / auto / none")
+        return cls(discovery="discovery" in gates, logic="logic" in gates)
+
+    def initial_state(self) -> dict:
+        return {GATES[gate]: True for gate in GATES if getattr(self, gate)}
+
+
+@dataclass
+class BatchResult:
+    """
+    单个会话的批处理结果
+
+    Attributes:
+        status: completed / awaiting_approval (停在未自动审批的确认点) / incomplete / failed / skipped
+    """
+    id: str
+    session_id: str
+    status: str
+    workflow_step: Optional[str] = None
+    wall: float = 0.0
+    prd_path: Optional[str] = None
+    error: Optional[str] = None
+
+
+def _safe_name(record_id: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", record_id).strip("._") or "idea"
+
+
+def _write_atomic(path: str, text: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(tmp_path, path)
+
+
+class BatchRunner:
+    """
+    以有界并发把多条想法送入同一个编排智能体，每条想法一个会话
+
+    同一模型的 LLM 调用在进程内共享令牌桶限流 (utils.rate_limiter)，
+    并发度只决定同时进行中的会话数。
+    """
+
+    def __init__(
+        self,
+        agent: BaseAgent,
+        output_dir: str,
+        concurrency: int = 4,
+        policy: ApprovalPolicy = ApprovalPolicy(),
+        app_name: str = "pm_batch",
+        resume: bool = True,
+    ):
+        from google.adk.runners import InMemoryRunner
+
+        self.runner = InMemoryRunner(agent=agent, app_name=app_name)
+        self.output_dir = output_dir
+        self.concurrency = concurrency
+        self.policy = policy
+        self.resume = resume
+        self.user_id = "batch_user"
+
+    def _record_dir(self, record: IdeaRecord) -> str:
+        return os.path.join(self.output_dir, _safe_name(record.id))
+
+    def _is_done(self, record: IdeaRecord) -> bool:
+        """已有完整产出的想法在续跑时跳过"""
+        state_path = os.path.join(self._record_dir(record), STATE_FILE)
+        try:
+            with open(state_path, "r", encoding="utf-8") as file:
+                return json.load(file).get("workflow_step") == "completed"
+        except (OSError, ValueError):
+            return False
+
+    async def run(self, records: Iterable[IdeaRecord]) -> list[BatchResult]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(record: IdeaRecord) -> BatchResult:
+            async with semaphore:
+                return await self.run_one(record)
+
+        return list(await asyncio.gather(*(bounded(record) for record in records)))
+
+    async def run_one(self, record: IdeaRecord) -> BatchResult:
+        """运行一条想法直到完成或停在确认点，并立即写出产出"""
+        session_id = f"batch-{_safe_name(record.id)}"
+        if self.resume and self._is_done(record):
+            result = BatchResult(record.id, session_id, "skipped", "completed")
+            self._append_summary(result)
+            return result
+
+        started_at = time.perf_counter()
+        logger.info(f"[Batch] 开始处理 {record.id}")
+        # 会话 ID 由想法 ID 决定，重跑 (--no-resume、失败后重试) 时必须从头开始，
+        # 不能恢复上一次运行留下的阶段 2 检查点
+        checkpoint_store = getattr(self.runner.agent, "checkpoint_store", None)
+        if checkpoint_store is not None:
+            checkpoint_store.clear(session_id)
+        session = None
+        try:
+            session = await self.runner.session_service.create_session(
+                app_name=self.runner.app_name,
+                user_id=self.user_id,
+                session_id=session_id,
+                # Writer 直接把 PRD 流式写入该想法的输出目录
+                state={
+                    **self.policy.initial_state(),
+                    AgentInfo.WRITER_AGENT["path_key"]: os.path.join(self._record_dir(record), PRD_FILE),
+                },
+            )
+            message = types.Content(role="user", parts=[types.Part(text=record.text)])
+            async for _ in self.runner.run_async(user_id=self.user_id, session_id=session_id, new_message=message):
+                pass
+            session = await self.runner.session_service.get_session(
+                app_name=self.runner.app_name, user_id=self.user_id, session_id=session_id
+            )
+            workflow_step = session.state.get("workflow_step")
+            if workflow_step == "completed":
+                status = "completed"
+            elif workflow_step in ("discovery_check", "logic_check"):
+                status = "awaiting_approval"
+            else:
+                status = "incomplete"
+            result = BatchResult(record.id, session_id, status, workflow_step)
+        except Exception as e:
+            logger.exception(f"[Batch] {record.id} 处理失败")
+            result = BatchResult(record.id, session_id, "failed", error=f"{type(e).__name__}: {e}")
+        finally:
+            # 同一想法重跑时可以重新创建会话
+            if session is not None:
+                await self.runner.session_service.delete_session(
+                    app_name=self.runner.app_name, user_id=self.user_id, session_id=session_id
+                )
+
+        result.wall = time.perf_counter() - started_at
+        if session is not None:
+            result.prd_path = self._write_outputs(record, session.state)
+        self._append_summary(result)
+        logger.info(f"[Batch] {record.id} 结束: {result.status} ({result.wall:.1f}s)")
+        return result
+
+    def _write_outputs(self, record: IdeaRecord, state: dict) -> Optional[str]:
+        """写出 state 快照与 PRD (若已生成)，返回 PRD 路径；state 中的 blob 引用展开为原文"""
+        state = blob_store.resolve_mapping(state)
+        record_dir = self._record_dir(record)
+        os.makedirs(record_dir, exist_ok=True)
+        _write_atomic(
+            os.path.join(record_dir, STATE_FILE),
+            json.dumps(dict(state), ensure_ascii=False, indent=2, default=str),
+        )
+        prd = state.get(AgentInfo.WRITER_AGENT["output_key"])
+        if not prd:
+            return None
+        prd_path = os.path.join(record_dir, PRD_FILE)
+        if state.get(AgentInfo.WRITER_AGENT["path_key"]) == prd_path and os.path.exists(prd_path):
+            # Writer 已在生成时写入
+            return prd_path
+        _write_atomic(prd_path, prd if isinstance(prd, str) else str(prd))
+        return prd_path
+
+    def _append_summary(self, result: BatchResult):
+        # 单行写入在单个事件循环内不会交错
+        with open(os.path.join(self.output_dir, SUMMARY_FILE), "a", encoding="utf-8") as file:
+            file.write(json.dumps(asdict(result), ensure_ascii=False) + "\n")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="批量生成 PRD：每条想法一个会话")
+    parser.add_argument("ideas", help="JSONL 输入文件 (request_id / title / body)")
+    parser.add_argument("--output", default=os.path.join("outputs", "batch"), help="输出目录")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时进行的会话数")
+    parser.add_argument("--approve", default="auto", help="确认点自动审批策略: auto / none / discovery,logic")
+    parser.add_argument("--rate-limits", help="每个模型的每分钟请求数，如 'openai/gpt-4o=60,*=120'")
+    parser.add_argument("--max-retries", type=int, help="429 后的最大重试次数")
+    parser.add_argument("--no-resume", action="store_true", help="不跳过输出目录中已完成的想法")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> list[BatchResult]:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    # LiteLLM 会为每次调用打印一行 INFO
+    logging.getLogger("LiteLLM").setLevel(logging.WARNING)
+    if args.rate_limits is not None or args.max_retries is not None:
+        # 只传 --max-retries 时保留 LLM_RATE_LIMITS 中的限速
+        limits = parse_rate_limits(args.rate_limits) if args.rate_limits is not None else None
+        rate_limiters.configure(limits, args.max_retries)
+
+    from .agent import root_agent
+    runner = BatchRunner(
+        root_agent.warm_up(),
+        args.output,
+        concurrency=args.concurrency,
+        policy=ApprovalPolicy.parse(args.approve),
+        resume=not args.no_resume,
+    )
+    results = asyncio.run(runner.run(load_ideas(args.ideas)))
+    counts: dict[str, int] = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    logger.info(f"[Batch] 全部结束: {counts}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
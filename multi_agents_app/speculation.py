@@ -0,0 +1,120 @@
+import asyncio
+import copy
+import logging
+from typing import AsyncGenerator, Callable, Iterable, Optional
+
+from google.adk.agents import InvocationContext
+from google.adk.agents.invocation_context import new_invocation_context_id
+from google.adk.events import Event
+from google.adk.sessions import Session
+
+logger = logging.getLogger(__name__)
+
+
+class Speculation:
+    """
+    在分叉的会话副本上后台预跑下一阶段
+
+    分叉时复制当时的会话 (事件与 state)，子智能体产出的事件只作用于副本：
+    state_delta 写入副本的 state，事件追加到副本的历史中，真实会话保持不变。
+    用户确认后由编排器调用 replay 把收集到的事件写回真实会话；
+    用户修改了需求或会话发生了其他变化时丢弃 (cancel)。
+    """
+
+    def __init__(
+        self,
+        phase: str,
+        ctx: InvocationContext,
+        run: Callable[[InvocationContext], AsyncGenerator[Event, None]],
+        pending_events: Iterable[Event] = (),
+    ):
+        """
+        Args:
+            phase: 预跑的阶段名
+            ctx: 到达确认点时的调用上下文
+            run: 阶段执行函数，接收分叉后的上下文
+            pending_events: 本次调用中尚未写入会话、但应出现在副本历史中的事件 (例如 HITL 提示)
+        """
+        self.phase = phase
+        self.base_event_ids = [event.id for event in ctx.session.events]
+        self.base_state = copy.deepcopy(dict(ctx.session.state))
+        self.events: list[Event] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._condition = asyncio.Condition()
+
+        fork: Session = ctx.session.model_copy(deep=True)
+        for event in pending_events:
+            self._apply(fork, event)
+        self._ctx = ctx.model_copy(update={"session": fork, "invocation_id": new_invocation_context_id()})
+        self.task = asyncio.create_task(self._run(run), name=f"speculation:{ctx.session.id}:{phase}")
+
+    @staticmethod
+    def _apply(session: Session, event: Event):
+        """在副本上模拟 SessionService.append_event：应用 state_delta 并追加历史"""
+        if event.actions and event.actions.state_delta:
+            session.state.update({
+                key: value for key, value in event.actions.state_delta.items() if not key.startswith("temp:")
+            })
+        session.events.append(event)
+
+    async def _run(self, run: Callable[[InvocationContext], AsyncGenerator[Event, None]]):
+        try:
+            async for event in run(self._ctx):
+                # partial 事件不会落盘，回放时也不需要
+                if event.partial:
+                    continue
+                self._apply(self._ctx.session, event)
+                async with self._condition:
+                    self.events.append(event)
+                    self._condition.notify_all()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"[Speculation] 预跑阶段 {self.phase} 失败: {e}")
+            self.error = e
+        finally:
+            async with self._condition:
+                self.done = True
+                self._condition.notify_all()
+
+    def is_valid_for(self, session: Session, allowed_authors: set[str], ignored_state_keys: set[str]) -> bool:
+        """
+        判断预跑结果对当前会话是否仍然有效：
+        - 分叉时的历史原样保留，之后只出现了 allowed_authors (用户确认、编排器状态事件) 的事件
+        - 除 ignored_state_keys (审批标记、进度) 外，会话中已持久化的 state 与分叉时一致
+          (分叉时上下文里可能有未持久化的临时写入，只在副本中存在的键不参与比较)
+        - 预跑没有失败
+        """
+        if self.error is not None:
+            return False
+        event_ids = [event.id for event in session.events]
+        if event_ids[:len(self.base_event_ids)] != self.base_event_ids:
+            return False
+        if any(event.author not in allowed_authors for event in session.events[len(self.base_event_ids):]):
+            return False
+        keys = set(session.state) - ignored_state_keys
+        return all(self.base_state.get(key) == session.state[key] for key in keys)
+
+    async def replay(self, invocation_id: str) -> AsyncGenerator[Event, None]:
+        """
+        按产出顺序回放预跑事件 (改写为当前调用的 invocation_id)；
+        预跑尚未结束时边跑边回放，不必等待整个阶段完成
+        """
+        index = 0
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(lambda: index < len(self.events) or self.done)
+                events = self.events[index:]
+                finished = self.done
+            index += len(events)
+            for event in events:
+                yield event.model_copy(update={"invocation_id": invocation_id})
+            if finished and index >= len(self.events):
+                if self.error is not None:
+                    raise self.error
+                return
+
+    def cancel(self):
+        if not self.task.done():
+            self.task.cancel()
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Callable, Iterable, Optional, Sequence
+
+from google.adk.agents import BaseAgent, InvocationContext
+from google.adk.events import Event
+
+from utils import tracer
+
+logger = logging.getLogger(__name__)
+
+# 子任务结束标记
+_STEP_DONE = object()
+
+
+@dataclass(frozen=True)
+class Step:
+    """
+    步骤图中的一个节点：运行一个子智能体
+
+    Attributes:
+        name: 步骤名称，在同一张图中唯一，例如 "research"
+        agent: 执行该步骤的子智能体
+        depends_on: 前置步骤名称；全部完成后本步骤才会启动
+        description: 日志中展示的步骤说明
+        skip_if: 前置步骤完成后调用，返回 True 时本步骤直接视为完成 (例如产出仍然有效)
+    """
+    name: str
+    agent: BaseAgent = field(repr=False)
+    depends_on: tuple[str, ...] = ()
+    description: str = ""
+    skip_if: Optional[Callable[[InvocationContext], bool]] = field(default=None, repr=False)
+
+
+class StepGraph:
+    """
+    声明式步骤图 (DAG)，由编排器自行调度执行
+
+    - 依赖全部完成的步骤立即启动，彼此独立的步骤并发运行
+    - 所有步骤的事件合并为一条有序事件流：
+      同一步骤内的事件保持原有顺序，且某个步骤的事件一定排在其所有前置步骤的事件之后
+    - 每个事件都要等上游 (Runner) 消费后子任务才会继续，
+      保证 output_key 写入的 state 在下游步骤启动前已经落盘
+    """
+
+    def __init__(self, steps: Sequence[Step]):
+        self.steps = list(steps)
+        self._validate()
+
+    def _validate(self):
+        """校验步骤名唯一、依赖存在且无环"""
+        names = [step.name for step in self.steps]
+        duplicated = {name for name in names if names.count(name) > 1}
+        if duplicated:
+            raise ValueError(f"步骤名称重复: {sorted(duplicated)}")
+
+        known = set(names)
+        for step in self.steps:
+            missing = [dep for dep in step.depends_on if dep not in known]
+            if missing:
+                raise ValueError(f"步骤 {step.name} 依赖了不存在的步骤: {missing}")
+
+        # Kahn 拓扑排序检测环
+        resolved: set[str] = set()
+        pending = list(self.steps)
+        while pending:
+            ready = [step for step in pending if set(step.depends_on) <= resolved]
+            if not ready:
+                raise ValueError(f"步骤图存在循环依赖: {[step.name for step in pending]}")
+            resolved.update(step.name for step in ready)
+            pending = [step for step in pending if step.name not in resolved]
+
+    async def run(
+        self,
+        ctx: InvocationContext,
+        completed: Iterable[str] = (),
+        on_step_done: Optional[Callable[[Step], Optional[Event]]] = None,
+    ) -> AsyncGenerator[Event, None]:
+        """
+        按依赖关系调度全部步骤，产出合并后的事件流
+
+        Args:
+            ctx: 编排器的调用上下文
+            completed: 已完成 (例如从检查点恢复) 的步骤，直接视为完成不再运行
+            on_step_done: 步骤的全部事件被消费后回调，此时其 output_key 已写入 state；
+                回调返回的事件 (例如携带 state_delta 的记录事件) 会并入事件流
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        completed = set(completed)
+        done: set[str] = {step.name for step in self.steps if step.name in completed}
+        tasks: dict[str, asyncio.Task] = {}
+
+        async def pump(step: Step):
+            try:
+                # 子任务复制了创建时的上下文，步骤跨度自动挂在当前阶段跨度下
+                events = tracer.trace_events(step.agent.run_async(ctx), step.agent.name, "agent", step=step.name)
+                async for event in events:
+                    resume_signal = asyncio.Event()
+                    await queue.put((step, event, resume_signal))
+                    # 等待上游消费该事件后再继续产出
+                    await resume_signal.wait()
+            finally:
+                await queue.put((step, _STEP_DONE, None))
+
+        def launch_ready_steps():
+            # 跳过的步骤立即完成，可能使更多步骤就绪，直到没有新的变化
+            launched = True
+            while launched:
+                launched = False
+                for step in self.steps:
+                    if step.name in tasks or step.name in done or not set(step.depends_on) <= done:
+                        continue
+                    if step.skip_if is not None and step.skip_if(ctx):
+                        logger.info(f"[StepGraph] 跳过步骤 {step.name}: 产出仍然有效")
+                        with tracer.span(step.agent.name, "agent", step=step.name, skipped=True):
+                            pass
+                        done.add(step.name)
+                        launched = True
+                        continue
+                    logger.info(f"[StepGraph] 启动步骤 {step.name}: {step.description or step.agent.name}")
+                    tasks[step.name] = asyncio.create_task(pump(step), name=f"step:{step.name}")
+
+        try:
+            launch_ready_steps()
+            while len(done) < len(self.steps):
+                step, event, resume_signal = await queue.get()
+                if event is _STEP_DONE:
+                    # 子任务异常直接向上抛出
+                    await tasks[step.name]
+                    done.add(step.name)
+                    logger.info(f"[StepGraph] 步骤 {step.name} 完成")
+                    if on_step_done:
+                        step_event = on_step_done(step)
+                        if step_event is not None:
+                            yield step_event
+                    launch_ready_steps()
+                    continue
+                yield event
+                resume_signal.set()
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
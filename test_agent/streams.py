@@ -0,0 +1,28 @@
+"""测试共用的异步流替身"""
+import asyncio
+
+
+class Upstream:
+    """可控的上游流：记录启动次数与是否被关闭"""
+
+    def __init__(self, items, delay=0.01, fail_after=None):
+        self.items = items
+        self.delay = delay
+        self.fail_after = fail_after
+        self.started = 0
+        self.closed = 0
+
+    async def stream(self):
+        self.started += 1
+        try:
+            for index, item in enumerate(self.items):
+                await asyncio.sleep(self.delay)
+                if index == self.fail_after:
+                    raise RuntimeError("upstream failed")
+                yield item
+        finally:
+            self.closed += 1
+
+
+async def drain(stream):
+    return [item async for item in stream]
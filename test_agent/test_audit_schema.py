@@ -0,0 +1,35 @@
+import pytest
+from pydantic import ValidationError
+
+from agents.senior_pm_agent import AuditReport
+
+
+def closed_objects(schema: dict):
+    yield schema
+    for definition in schema.get("$defs", {}).values():
+        yield definition
+
+
+def test_audit_report_schema_is_strict():
+    schema = AuditReport.model_json_schema()
+    for obj in closed_objects(schema):
+        # 严格模式要求对象封闭且所有字段必填
+        assert obj["additionalProperties"] is False
+        assert sorted(obj["required"]) == sorted(obj["properties"])
+    # $ref 不带同级关键字
+    assert schema["properties"]["audit_metadata"] == {"$ref": "#/$defs/AuditMetadata"}
+
+
+def test_audit_report_validates_metadata_fields():
+    report = {
+        "verdict": "PASS",
+        "score": 8,
+        "human_message": "审计通过",
+        "system_instructions": "",
+        "audit_metadata": {"current_stage": "Auditor", "target": "Discovery_Expert"},
+    }
+    assert AuditReport.model_validate(report).audit_metadata.target == "Discovery_Expert"
+    with pytest.raises(ValidationError):
+        AuditReport.model_validate({**report, "audit_metadata": {"current_stage": "Auditor", "target": "x", "extra": 1}})
+    with pytest.raises(ValidationError):
+        AuditReport.model_validate({**report, "audit_metadata": {"current_stage": "benchmark", "target": "x"}})
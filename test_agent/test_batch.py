@@ -0,0 +1,94 @@
+import asyncio
+import json
+from typing import AsyncGenerator, ClassVar
+
+import pytest
+from google.adk.agents import BaseAgent, InvocationContext
+from google.adk.events import Event, EventActions
+
+from multi_agents_app.batch import PRD_FILE, STATE_FILE, SUMMARY_FILE, ApprovalPolicy, BatchRunner, IdeaRecord, load_ideas
+from utils import AgentInfo
+
+
+class FakeOrchestrator(BaseAgent):
+    """按审批标记推进的编排器替身：未审批的确认点处停下，否则直接产出 PRD"""
+    runs: ClassVar[list[str]] = []
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        self.runs.append(ctx.session.id)
+        if "失败" in ctx.user_content.parts[0].text:
+            raise RuntimeError("boom")
+        if not ctx.session.state.get("discovery_approved"):
+            delta = {"workflow_step": "discovery_check"}
+        else:
+            delta = {"workflow_step": "completed", AgentInfo.WRITER_AGENT["output_key"]: f"# PRD {ctx.session.id}"}
+        yield Event(author=self.name, actions=EventActions(state_delta=delta))
+
+
+def run_batch(tmp_path, records, **kwargs):
+    FakeOrchestrator.runs.clear()
+    runner = BatchRunner(FakeOrchestrator(name="pm"), str(tmp_path), concurrency=2, **kwargs)
+    return asyncio.run(runner.run(records))
+
+
+def summary(tmp_path) -> list[dict]:
+    return [json.loads(line) for line in (tmp_path / SUMMARY_FILE).read_text(encoding="utf-8").splitlines()]
+
+
+RECORDS = [IdeaRecord("a/1", "咖啡店会员积分"), IdeaRecord("b", "健身房约课")]
+
+
+def test_approval_policy_parse_and_initial_state():
+    assert ApprovalPolicy.parse("auto").initial_state() == {"discovery_approved": True, "logic_approved": True}
+    assert ApprovalPolicy.parse("none").initial_state() == {}
+    assert ApprovalPolicy.parse(" Discovery ").initial_state() == {"discovery_approved": True}
+    with pytest.raises(ValueError, match="未知的确认点"):
+        ApprovalPolicy.parse("discovery,deploy")
+
+
+def test_auto_approved_sessions_complete_and_write_outputs(tmp_path):
+    results = run_batch(tmp_path, RECORDS)
+    assert [(result.id, result.status) for result in results] == [("a/1", "completed"), ("b", "completed")]
+    # id 中的特殊字符不会逃出输出目录
+    record_dir = tmp_path / "a_1"
+    assert (record_dir / PRD_FILE).read_text(encoding="utf-8") == "# PRD batch-a_1"
+    assert json.loads((record_dir / STATE_FILE).read_text(encoding="utf-8"))["workflow_step"] == "completed"
+    assert sorted(line["status"] for line in summary(tmp_path)) == ["completed", "completed"]
+
+
+def test_resume_skips_finished_records_and_reruns_the_rest(tmp_path):
+    run_batch(tmp_path, RECORDS[:1])
+    results = run_batch(tmp_path, RECORDS)
+    assert [result.status for result in results] == ["skipped", "completed"]
+    assert FakeOrchestrator.runs == ["batch-b"]
+
+    # 关闭续跑时全部重新运行，同一会话 ID 可以重新创建
+    results = run_batch(tmp_path, RECORDS, resume=False)
+    assert [result.status for result in results] == ["completed", "completed"]
+    assert sorted(FakeOrchestrator.runs) == ["batch-a_1", "batch-b"]
+    assert [line["status"] for line in summary(tmp_path)].count("skipped") == 1
+
+
+def test_unapproved_gate_and_failures_are_reported(tmp_path):
+    results = run_batch(tmp_path, [IdeaRecord("a", "咖啡店"), IdeaRecord("f", "会失败的想法")], policy=ApprovalPolicy.parse("none"))
+    assert [(result.status, result.workflow_step) for result in results] == [
+        ("awaiting_approval", "discovery_check"),
+        ("failed", None),
+    ]
+    assert results[1].error == "RuntimeError: boom"
+    assert not (tmp_path / "a" / PRD_FILE).exists()
+    # 停在确认点的想法续跑时不会被跳过
+    run_batch(tmp_path, [IdeaRecord("a", "咖啡店")])
+    assert FakeOrchestrator.runs == ["batch-a"]
+
+
+def test_load_ideas(tmp_path):
+    path = tmp_path / "ideas.jsonl"
+    path.write_text(
+        '{"request_id": "r1", "title": "标题", "body": "正文"}\n\n{"idea": "想法"}\n',
+        encoding="utf-8",
+    )
+    assert load_ideas(str(path)) == [IdeaRecord("r1", "标题\n\n正文"), IdeaRecord("idea-0003", "想法")]
+    path.write_text('{"id": "x", "idea": "a"}\n{"id": "x", "idea": "b"}\n', encoding="utf-8")
+    with pytest.raises(ValueError, match="重复"):
+        load_ideas(str(path))
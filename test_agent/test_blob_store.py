@@ -0,0 +1,67 @@
+import pytest
+
+from utils import metrics
+from utils.blob_store import JSON_PREFIX, TEXT_PREFIX, BlobStore, is_reference
+
+
+@pytest.fixture
+def store(tmp_path) -> BlobStore:
+    metrics.reset()
+    return BlobStore(root=str(tmp_path / "blobs"), threshold=64, compress=True, cache_bytes=1024)
+
+
+def test_offload_delta_replaces_large_values_only(store):
+    big_text, big_list = "蓝图" * 100, [{"id": index} for index in range(20)]
+    delta = {
+        "architect_output": big_text,
+        "findings": big_list,
+        "workflow_step": "logic_check",
+        "score": 9.5,
+        "temp:draft": big_text,
+    }
+    assert store.offload_delta(delta) == 2
+    assert delta["architect_output"].startswith(TEXT_PREFIX)
+    assert delta["findings"].startswith(JSON_PREFIX)
+    # 低于阈值的值、非文本值与 temp: 临时键保持原样
+    assert (delta["workflow_step"], delta["score"], delta["temp:draft"]) == ("logic_check", 9.5, big_text)
+    # 已经是引用的值不会再次转存
+    assert store.offload_delta(delta) == 0
+
+
+def test_resolve_and_expand_round_trip(store):
+    text, data = "需求说明 " * 50, {"modules": ["会员", "积分"] * 20}
+    text_ref, json_ref = store.offload(text), store.offload(data)
+    assert is_reference(text_ref) and is_reference(json_ref)
+    assert store.resolve(text_ref) == text and store.resolve(json_ref) == data
+    assert store.resolve_mapping({"a": text_ref, "b": "短"}) == {"a": text, "b": "短"}
+    # 注入提示词后的引用在文本中被展开，JSON 引用展开为 JSON 文本
+    expanded = store.expand(f"蓝图：{text_ref}\n模块：{json_ref}")
+    assert text in expanded and '"modules": ["会员", "积分"' in expanded and "blob" not in expanded
+
+
+def test_identical_content_is_stored_once(store, tmp_path):
+    text = "同样的蓝图 " * 40
+    assert store.offload(text) == store.offload(text)
+    files = [path for path in (tmp_path / "blobs").rglob("*") if path.is_file()]
+    assert len(files) == 1 and files[0].suffix == ".z"  # 可压缩的内容压缩存储
+    assert metrics.get("blob.written") == 1 and metrics.get("blob.dedup") == 1
+
+    # 另一个实例 (缓存为空) 也从磁盘读到同一份内容
+    other = BlobStore(root=str(tmp_path / "blobs"), threshold=64, cache_bytes=1024)
+    assert other.resolve(store.offload(text)) == text
+    with pytest.raises(KeyError):
+        other.get("0" * 64)
+
+
+def test_cache_evicts_least_recently_used_by_bytes(store):
+    a, b, c = (store.put(bytes([value]) * 400) for value in (1, 2, 3))
+    # a 被淘汰：400 * 3 超过 1024 字节
+    assert list(store._cache) == [b, c] and store._cached_bytes == 800
+    assert store.get(b) == bytes([2]) * 400  # 命中后移到末尾
+    store.get(a)  # 从磁盘读回，淘汰最久未用的 c
+    assert list(store._cache) == [b, a] and store._cached_bytes == 800
+    assert metrics.get("blob.read") == 1
+
+    # 超过缓存上限的内容不进入缓存
+    store.put(b"x" * 2000)
+    assert list(store._cache) == [b, a] and store._cached_bytes == 800
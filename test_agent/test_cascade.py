@@ -0,0 +1,136 @@
+import asyncio
+import json
+from typing import ClassVar
+
+import pytest
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from agents.senior_pm_agent import CascadeLlm
+from utils import DeadlineExceeded, metrics
+
+
+class StubLlm(BaseLlm):
+    """按固定文本逐块流式输出的模型替身；fail_at 指定在第几块之前抛出 error"""
+    text: str = ""
+    chunk_size: int = 8
+    fail_at: int = -1
+    error: BaseException = RuntimeError("fast failed")
+    error_code: str = ""
+    # 所有替身共用的调用记录，按发生顺序排列
+    log: ClassVar[list[str]] = []
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False):
+        self.log.append(f"{self.model}:start")
+        try:
+            if self.error_code:
+                yield LlmResponse(error_code=self.error_code, error_message="upstream error")
+                return
+            if stream:
+                for index in range(0, len(self.text), self.chunk_size):
+                    if index // self.chunk_size == self.fail_at:
+                        raise self.error
+                    await asyncio.sleep(0)
+                    self.log.append(f"{self.model}:chunk")
+                    yield text_response(self.text[index:index + self.chunk_size], partial=True)
+            yield text_response(self.text)
+            self.log.append(f"{self.model}:done")
+        finally:
+            self.log.append(f"{self.model}:closed")
+
+
+def text_response(text: str, partial: bool = False) -> LlmResponse:
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]), partial=partial)
+
+
+def report(verdict: str, score: float) -> str:
+    return json.dumps({"verdict": verdict, "score": score, "human_message": "x" * 40, "system_instructions": "y" * 40})
+
+
+STRONG = report("PASS", 9.5)
+
+
+def run_cascade(fast_text: str = "", stream: bool = True, **fast_options):
+    metrics.reset()
+    log = StubLlm.log
+    log.clear()
+    fast = StubLlm(model="fast", text=fast_text, **fast_options)
+    strong = StubLlm(model="strong", text=STRONG)
+    cascade = CascadeLlm(fast, strong)
+
+    async def run():
+        responses = []
+        async for response in cascade.generate_content_async(LlmRequest(), stream):
+            log.append("consumer")
+            responses.append(response)
+        return responses
+
+    return asyncio.run(run()), log
+
+
+def streamed_text(responses) -> str:
+    return "".join(response.content.parts[0].text for response in responses if response.partial)
+
+
+def test_clear_verdict_is_accepted_and_streamed_through():
+    fast_text = report("PASS", 9)
+    responses, log = run_cascade(fast_text)
+    assert streamed_text(responses) == fast_text
+    assert responses[-1].content.parts[0].text == fast_text and not responses[-1].partial
+    assert "strong:start" not in log
+    assert metrics.get("senior_pm.cascade", outcome="fast") == 1
+    # 判定之后快速模型的分块直接转发：消费者在快速模型生成结束前就拿到了输出
+    assert log.index("consumer") < log.index("fast:done")
+
+
+@pytest.mark.parametrize("fast_text, reason", [
+    (report("PASS", 6.2), "borderline"),
+    (report("MAYBE", 9), "parse_failure"),
+])
+def test_escalates_as_soon_as_the_verdict_is_known(fast_text, reason):
+    responses, log = run_cascade(fast_text)
+    assert streamed_text(responses) == STRONG
+    assert metrics.get("senior_pm.cascade", outcome="escalated", reason=reason) == 1
+    # 快速模型在输出结束前被取消，快速模型的分块不会转发
+    assert "fast:done" not in log
+    assert log.index("fast:closed") < log.index("strong:start") < log.index("consumer")
+
+
+def test_unparseable_output_escalates_at_end_of_stream():
+    responses, log = run_cascade("这不是 JSON " * 5)
+    assert streamed_text(responses) == STRONG
+    assert metrics.get("senior_pm.cascade", outcome="escalated", reason="parse_failure") == 1
+
+
+def test_non_streaming_call_uses_the_final_response():
+    responses, _ = run_cascade(report("REJECT", 2), stream=False)
+    assert [response.content.parts[0].text for response in responses] == [report("REJECT", 2)]
+    assert metrics.get("senior_pm.cascade", outcome="fast") == 1
+
+
+@pytest.mark.parametrize("fast_options", [{"fail_at": 1}, {"error_code": "500"}])
+def test_fast_errors_before_the_decision_escalate(fast_options):
+    responses, log = run_cascade(report("PASS", 9), **fast_options)
+    assert streamed_text(responses) == STRONG
+    assert metrics.get("senior_pm.cascade", outcome="escalated", reason="fast_error") == 1
+
+
+def test_fast_error_after_accepting_is_raised():
+    with pytest.raises(RuntimeError, match="fast failed"):
+        run_cascade(report("PASS", 9), fail_at=8)
+
+
+@pytest.mark.parametrize("error", [DeadlineExceeded("deadline"), asyncio.CancelledError()])
+def test_deadline_and_cancellation_are_not_escalated(error):
+    StubLlm.log.clear()
+    fast = StubLlm(model="fast", text=report("PASS", 9), fail_at=1, error=error)
+    cascade = CascadeLlm(fast, StubLlm(model="strong", text=STRONG))
+
+    async def run():
+        return [response async for response in cascade.generate_content_async(LlmRequest(), True)]
+
+    with pytest.raises(type(error)):
+        asyncio.run(run())
+    assert "strong:start" not in StubLlm.log
@@ -0,0 +1,59 @@
+import threading
+
+from utils import CheckpointStore
+
+
+def test_checkpoints_are_versioned_per_session(tmp_path):
+    store = CheckpointStore(tmp_path / "nested" / "checkpoints.sqlite3")
+    assert store.record("s1", "logic", "draft", "Architect", "architect_output", "v1") == 1
+    assert store.record("s1", "logic", "review", "Reviewer", "reviewer_output", "ok") == 2
+    assert store.record("s2", "logic", "draft", "Architect", "architect_output", "other") == 1
+    # 覆盖同一步骤时版本号继续递增
+    assert store.record("s1", "logic", "draft", "Architect", "architect_output", "v2") == 3
+
+    completed = store.completed("s1", "logic")
+    assert sorted(completed) == ["draft", "review"]
+    assert (completed["draft"].output, completed["draft"].state_version) == ("v2", 3)
+    assert store.completed("s1", "documentation") == {}
+    store.close()
+
+
+def test_checkpoints_survive_reopen_and_clear_only_one_session(tmp_path):
+    path = tmp_path / "checkpoints.sqlite3"
+    store = CheckpointStore(path)
+    store.record("s1", "logic", "draft", "Architect", None, None)
+    store.record("s2", "logic", "draft", "Architect", None, None)
+    store.close()
+
+    reopened = CheckpointStore(path)
+    assert reopened.completed("s1", "logic")["draft"].output is None
+    assert reopened.clear("s1") == 1
+    assert reopened.completed("s1", "logic") == {}
+    assert list(reopened.completed("s2", "logic")) == ["draft"]
+    reopened.close()
+
+
+def test_concurrent_writers_get_distinct_versions(tmp_path):
+    store = CheckpointStore(tmp_path / "checkpoints.sqlite3")
+    versions = []
+
+    def write(step: str):
+        versions.append(store.record("s", "logic", step, "agent", None, step))
+
+    threads = [threading.Thread(target=write, args=(f"step{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(versions) == list(range(1, 9))
+    store.close()
+
+
+def test_checkpoint_store_from_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("PM_CHECKPOINT_DB", "off")
+    assert CheckpointStore.from_env() is None
+    monkeypatch.setenv("PM_CHECKPOINT_DB", str(tmp_path / "c.sqlite3"))
+    store = CheckpointStore.from_env()
+    assert store.path == tmp_path / "c.sqlite3"
+    # 连接在首次使用时才建立
+    assert not store.path.exists()
@@ -0,0 +1,112 @@
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+import utils.context_compactor as compactor_module
+from utils.context_compactor import SUMMARY_HEADER, ContextCompactor, count_tokens, summarize_turn
+
+
+def turn(role: str, text: str) -> types.Content:
+    return types.Content(role=role, parts=[types.Part(text=text)])
+
+
+def conversation(turns: int) -> list[types.Content]:
+    return [
+        turn("user" if index % 2 == 0 else "model", f"# 第 {index} 轮\n" + f"第 {index} 轮的讨论内容。" * 20)
+        for index in range(turns)
+    ]
+
+
+def request(contents: list[types.Content], instruction: str = "你是产品经理。") -> LlmRequest:
+    llm_request = LlmRequest(contents=list(contents))
+    llm_request.config.system_instruction = instruction
+    return llm_request
+
+
+def request_tokens(llm_request: LlmRequest) -> int:
+    texts = [part.text for content in llm_request.contents for part in content.parts]
+    return count_tokens(llm_request.config.system_instruction) + sum(count_tokens(text) for text in texts)
+
+
+def test_requests_within_budget_are_untouched():
+    contents = conversation(6)
+    llm_request = request(contents)
+    assert not ContextCompactor(token_budget=100_000).compact(llm_request)
+    assert llm_request.contents == contents
+    # 轮次不多于 keep_recent_turns 时不压缩
+    assert not ContextCompactor(token_budget=1, keep_recent_turns=6).compact(request(contents))
+
+
+def test_compaction_stays_under_budget_and_keeps_recent_turns_verbatim():
+    contents = conversation(12)
+    budget = request_tokens(request(contents)) // 3
+    llm_request = request(contents)
+    assert ContextCompactor(token_budget=budget, keep_recent_turns=2).compact(llm_request)
+
+    summary, *recent = llm_request.contents
+    assert summary.role == "user" and summary.parts[0].text.startswith(SUMMARY_HEADER)
+    assert len(recent) >= 2
+    # 保留的轮次是原对话的结尾，逐字不变
+    assert recent == contents[-len(recent):]
+    assert request_tokens(llm_request) <= budget
+    # 摘要超出预算时优先丢弃最早的摘要行，紧挨着原文的轮次保留
+    assert summarize_turn(contents[-len(recent) - 1]) in summary.parts[0].text
+    assert summarize_turn(contents[0]) not in summary.parts[0].text
+
+
+def test_recent_turns_are_kept_even_when_they_exceed_the_budget():
+    contents = conversation(8)
+    llm_request = request(contents)
+    assert ContextCompactor(token_budget=10, keep_recent_turns=3).compact(llm_request)
+    assert llm_request.contents[1:] == contents[-3:]
+
+
+def test_summary_reuses_the_cached_prefix(monkeypatch):
+    summarized = []
+
+    def spy(content, max_chars=160):
+        summarized.append(content.parts[0].text.splitlines()[0])
+        return summarize_turn(content, max_chars)
+
+    monkeypatch.setattr(compactor_module, "summarize_turn", spy)
+    compactor = ContextCompactor(token_budget=1, keep_recent_turns=2)
+    contents = conversation(10)
+    compactor.compact(request(contents[:6]))
+    assert summarized == [f"# 第 {index} 轮" for index in range(4)]
+
+    # 新轮次滚出窗口时只摘要新增的部分
+    summarized.clear()
+    compactor.compact(request(contents[:8]))
+    assert summarized == ["# 第 4 轮", "# 第 5 轮"]
+
+    # 历史被改写时缓存的前缀不再匹配，重新摘要
+    summarized.clear()
+    edited = [*contents[:2], turn("user", "# 改写\n新的需求"), *contents[3:8]]
+    compactor.compact(request(edited))
+    assert summarized == ["# 第 0 轮", "# 第 1 轮", "# 改写", "# 第 3 轮", "# 第 4 轮", "# 第 5 轮"]
+
+
+def test_token_counts_are_cached_by_text_hash(monkeypatch):
+    calls = []
+
+    def fake_count(text, model):
+        calls.append(text)
+        return len(text)
+
+    monkeypatch.setattr(compactor_module, "_count_tokens", fake_count)
+    monkeypatch.setattr(compactor_module, "_token_cache", compactor_module.OrderedDict())
+    text = "很长的提示词" * 1000
+    assert count_tokens(text, "m") == count_tokens(text, "m") == len(text)
+    assert count_tokens(text, "other") == len(text)
+    assert len(calls) == 2
+    # 缓存键是摘要而不是原文
+    assert all(len(digest) == 64 and text not in digest for digest, _ in compactor_module._token_cache)
+    assert count_tokens("", "m") == 0
+
+
+def test_token_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(compactor_module, "_count_tokens", lambda text, model: 1)
+    monkeypatch.setattr(compactor_module, "_token_cache", compactor_module.OrderedDict())
+    monkeypatch.setattr(compactor_module, "_TOKEN_CACHE_SIZE", 3)
+    for index in range(5):
+        count_tokens(f"text {index}", "m")
+    assert len(compactor_module._token_cache) == 3
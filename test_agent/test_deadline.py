@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from utils import DeadlineExceeded, deadline
+from utils.deadline import bounded, call_timeout, parse_deadlines, phase_deadline, remaining
+
+from .streams import Upstream, drain
+
+
+def test_parse_deadlines_and_phase_lookup(monkeypatch):
+    assert parse_deadlines(" discovery=1.5, *=10 ,") == {"discovery": 1.5, "*": 10.0}
+    with pytest.raises(ValueError):
+        parse_deadlines("60")
+    monkeypatch.setenv("PM_PHASE_DEADLINES", "discovery=5,*=30")
+    assert phase_deadline("discovery") == 5 and phase_deadline("documentation") == 30
+
+
+def test_nested_deadline_keeps_the_earlier_one(monkeypatch):
+    monkeypatch.delenv("LLM_CALL_TIMEOUT", raising=False)
+    assert remaining() is None and call_timeout() is None
+    with deadline(10):
+        with deadline(100):
+            assert remaining() < 10
+        with deadline(None):
+            assert 9 < remaining() <= 10
+        monkeypatch.setenv("LLM_CALL_TIMEOUT", "2")
+        assert call_timeout() == 2
+    assert remaining() is None
+
+
+def test_deadline_is_inherited_by_child_tasks():
+    async def child():
+        return remaining()
+
+    async def run():
+        with deadline(5):
+            task = asyncio.create_task(child())
+        return await task
+
+    assert 4 < asyncio.run(run()) <= 5
+
+
+def test_bounded_passes_items_through_within_timeout():
+    upstream = Upstream([1, 2, 3], delay=0.001)
+    assert asyncio.run(drain(bounded(upstream.stream(), 1.0))) == [1, 2, 3]
+    assert asyncio.run(drain(bounded(Upstream([1]).stream(), None))) == [1]
+
+
+def test_bounded_raises_and_closes_upstream_on_timeout():
+    upstream = Upstream([1, 2, 3], delay=0.2)
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(drain(bounded(upstream.stream(), 0.05)))
+    assert upstream.closed == 1
+    assert issubclass(DeadlineExceeded, TimeoutError)
@@ -0,0 +1,81 @@
+import asyncio
+import types
+
+import pytest
+from google.adk.events import Event
+
+import agents.discovery_agent.agent as discovery
+from utils import AgentInfo
+
+OUTPUT_KEY = AgentInfo.DISCOVERY_AGENT["output_key"]
+
+
+def make_agent(optimistic: bool, log: list):
+    agent = discovery.DiscoveryPhaseAgent()
+    object.__setattr__(agent, "optimistic", optimistic)
+
+    async def actor(ctx, **attributes):
+        log.append("actor")
+        await asyncio.sleep(0.02)
+        yield Event(author="actor", content={"parts": [{"text": "turn"}]})
+
+    object.__setattr__(agent, "_run_actor", actor)
+    return agent
+
+
+def make_context(**state):
+    return types.SimpleNamespace(
+        session=types.SimpleNamespace(id="s", state=dict(state)),
+        actions=types.SimpleNamespace(escalate=False),
+    )
+
+
+def run_turn(monkeypatch, optimistic: bool, report: dict, **state):
+    async def stream_audit(senior_pm, ctx, fields):
+        await asyncio.sleep(0.01)
+        return types.SimpleNamespace(report=report)
+
+    monkeypatch.setattr(discovery, "stream_audit", stream_audit)
+    log = []
+    agent = make_agent(optimistic, log)
+    ctx = make_context(**state)
+
+    async def run():
+        texts = [event.content.parts[0].text async for event in agent._run_async_impl(ctx)]
+        await asyncio.sleep(0.05)
+        leftover = [task for task in asyncio.all_tasks() if task.get_name().startswith(agent.name)]
+        return texts, leftover
+
+    texts, leftover = asyncio.run(run())
+    assert leftover == []
+    return texts, log, ctx.actions.escalate
+
+
+@pytest.mark.parametrize("report", [
+    {"verdict": "REJECT", "system_instructions": "COMMAND: 补充竞品分析"},
+    {"verdict": "PASS", "score": 5},
+    {"verdict": "PASS", "score": 9},
+])
+def test_quality_audit_events_match_in_both_modes(monkeypatch, report):
+    state = {OUTPUT_KEY: discovery.FINISHED_MARKER, "is_sanity_passed": True}
+    sequential = run_turn(monkeypatch, False, report, **state)
+    optimistic = run_turn(monkeypatch, True, report, **state)
+    assert sequential == optimistic
+    texts, log, escalate = optimistic
+    # 质量审计只返回审计结论，不运行执行者
+    assert len(texts) == 1 and log == []
+    assert escalate == (report.get("score", 0) >= discovery.PASS_SCORE)
+
+
+@pytest.mark.parametrize("verdict, expected", [
+    ("PASS", (["turn"], ["actor"])),
+    ("REJECT", (["请描述您的产品想法"], [])),
+])
+def test_sanity_check_events_match_in_both_modes(monkeypatch, verdict, expected):
+    report = {"verdict": verdict, "human_message": "请描述您的产品想法"}
+    sequential = run_turn(monkeypatch, False, report)
+    texts, log, _ = run_turn(monkeypatch, True, report)
+    assert texts == sequential[0] == expected[0]
+    assert sequential[1] == expected[1]
+    # 乐观模式下执行者与准入验证并发启动，REJECT 时被取消，事件不会放出
+    assert log == ["actor"]
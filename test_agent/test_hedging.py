@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+import pytest
+
+from utils import HedgePolicy, metrics
+
+from .streams import Upstream, drain
+
+
+def test_hedge_delay_needs_enough_samples():
+    policy = HedgePolicy(enabled=True, percentile=90, min_samples=10, min_delay=0.05)
+    for seconds in range(1, 10):
+        policy.record("m", seconds / 10)
+    assert policy.delay("m") is None
+    policy.record("m", 1.0)
+    assert policy.delay("m") == pytest.approx(0.9)
+    assert HedgePolicy(enabled=False, min_samples=0).delay("m") is None
+    # 阈值不低于 min_delay
+    fast = HedgePolicy(enabled=True, min_samples=1, min_delay=0.2)
+    fast.record("m", 0.01)
+    assert fast.delay("m") == 0.2
+
+
+def test_hedge_policy_reads_env(monkeypatch):
+    monkeypatch.setenv("LLM_HEDGE", "on")
+    monkeypatch.setenv("LLM_HEDGE_FALLBACK_MODEL", "backup")
+    policy = HedgePolicy()
+    assert policy.enabled and policy.hedge_model("m") == "backup"
+
+
+def hedging_policy(min_delay: float) -> HedgePolicy:
+    policy = HedgePolicy(enabled=True, min_samples=1, min_delay=min_delay)
+    policy.record("m", 0.001)
+    return policy
+
+
+def run_race(policy, primary, hedge):
+    async def run():
+        result = await drain(policy.race("m", primary.stream, hedge.stream))
+        return result, [task for task in asyncio.all_tasks() if task.get_name().startswith("llm")]
+
+    return asyncio.run(run())
+
+
+def test_race_without_hedge_when_primary_is_fast():
+    metrics.reset()
+    policy = hedging_policy(0.05)
+    primary, hedge = Upstream(["p1", "p2"], delay=0.001), Upstream(["h1"])
+    result, leftover = run_race(policy, primary, hedge)
+    assert result == ["p1", "p2"]
+    assert hedge.started == 0 and leftover == []
+    assert metrics.get("llm.hedged", model="m") == 0
+
+
+def test_race_hedge_wins_and_primary_is_closed():
+    metrics.reset()
+    policy = hedging_policy(0.02)
+    primary, hedge = Upstream(["p1", "p2"], delay=0.5), Upstream(["h1", "h2"], delay=0.001)
+    started = time.monotonic()
+    result, leftover = run_race(policy, primary, hedge)
+    assert result == ["h1", "h2"]
+    assert time.monotonic() - started < 0.4
+    assert primary.closed == 1 and leftover == []
+    assert metrics.get("llm.hedge_won", model="m", winner="hedge") == 1
+
+
+def test_race_falls_back_when_one_side_fails():
+    policy = hedging_policy(0.02)
+    primary, hedge = Upstream(["p1"], delay=0.05, fail_after=0), Upstream(["h1"], delay=0.1)
+    result, leftover = run_race(policy, primary, hedge)
+    assert result == ["h1"] and leftover == []
+
+
+def test_race_raises_when_both_sides_fail():
+    policy = hedging_policy(0.01)
+    primary, hedge = Upstream(["p1"], delay=0.05, fail_after=0), Upstream(["h1"], delay=0.05, fail_after=0)
+    with pytest.raises(RuntimeError, match="upstream failed"):
+        run_race(policy, primary, hedge)
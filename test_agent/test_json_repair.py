@@ -0,0 +1,21 @@
+import pytest
+
+from utils import repair_json
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"verdict": "PASS", "score": 8}', {"verdict": "PASS", "score": 8}),
+    ('好的：\n```json\n{"verdict": "PASS",}\n```\n以上', {"verdict": "PASS"}),
+    ('{"verdict": "REJECT", "items": [1, 2,],}', {"verdict": "REJECT", "items": [1, 2]}),
+    ('{"verdict": "REJECT", "human_message": "请补充', {"verdict": "REJECT", "human_message": "请补充"}),
+    ('{"verdict": "PASS", "score": 7, "human_message"', {"verdict": "PASS", "score": 7}),
+    ('{"verdict": "PASS", "meta": {"stage": "x", ', {"verdict": "PASS", "meta": {"stage": "x"}}),
+])
+def test_repair_json(text, expected):
+    assert repair_json(text) == expected
+
+
+@pytest.mark.parametrize("text", ["没有 JSON", '{"verdict": PASS}', "[1, 2]"])
+def test_repair_json_failures(text):
+    with pytest.raises(ValueError):
+        repair_json(text)
@@ -0,0 +1,51 @@
+from utils import KnowledgeIndex
+from utils.knowledge_index import split_passages, tokenize
+
+
+COFFEE = "竞品：主流收银系统均内置会员积分与储值模块。\n\n避坑：储值涉及预付卡监管，需要资金存管。"
+GYM = "健身房私教课程预约，教练排班与课时包核销。\n\n会员卡冻结与转让规则。"
+
+
+def test_tokenize_and_split_passages():
+    assert list(tokenize("会员积分 App v2")) == ["会员", "员积", "积分", "app", "v2"]
+    passages = split_passages("a" * 10 + "\n\n" + "b" * 10 + "\n\n\n" + "c" * 30, max_chars=25)
+    assert passages == ["a" * 10 + "\n\n" + "b" * 10, "c" * 30]
+
+
+def test_search_ranks_relevant_sessions_and_excludes_own(tmp_path):
+    index = KnowledgeIndex(tmp_path / "knowledge.sqlite3", top_k=3, min_score=0.1)
+    assert index.search("咖啡店会员积分") == []
+    assert index.index_session("coffee", {"researcher_output": COFFEE, "writer_output": ""}) == 1
+    index.index_session("gym", {"researcher_output": GYM})
+
+    hits = index.search("咖啡店会员积分与储值")
+    assert hits and hits[0].session_id == "coffee"
+    assert all(0 < hit.score <= 1 for hit in hits)
+    assert "储值" in hits[0].text
+    assert all(hit.session_id != "coffee" for hit in index.search("会员积分与储值", exclude_session="coffee"))
+    # 与历史产出无关的查询不返回结果
+    assert index.search("汽车保险理赔小程序") == []
+    index.close()
+
+
+def test_reindexing_a_session_replaces_its_passages(tmp_path):
+    index = KnowledgeIndex(tmp_path / "knowledge.sqlite3", min_score=0.1)
+    index.index_session("s", {"researcher_output": COFFEE})
+    index.index_session("s", {"researcher_output": GYM})
+    assert index.search("预付卡监管资金存管") == []
+    assert index.search("私教课程预约")[0].session_id == "s"
+    index.close()
+
+
+def test_render_respects_max_chars(tmp_path):
+    index = KnowledgeIndex(tmp_path / "knowledge.sqlite3", min_score=0.0, max_chars=80)
+    index.index_session("coffee", {"researcher_output": COFFEE})
+    rendered = index.render(index.search("会员积分储值预付卡"), labels={"researcher_output": "调研情报"})
+    assert rendered.startswith("### [1] 调研情报 (历史会话 coffee")
+    assert len(rendered) <= 80 + 2
+    index.close()
+
+
+def test_knowledge_index_from_env(monkeypatch):
+    monkeypatch.setenv("PM_KNOWLEDGE_INDEX", "off")
+    assert KnowledgeIndex.from_env() is None
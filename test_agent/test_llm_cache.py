@@ -0,0 +1,178 @@
+import asyncio
+import os
+import time
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from utils import CacheMode, LlmResponseCache
+from utils.llm_cache import LlmCacheMiss, request_cache_key
+
+
+def chunk(text: str, partial: bool = True) -> LlmResponse:
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]), partial=partial)
+
+
+class Upstream:
+    """记录调用次数的上游流"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = 0
+
+    async def generate(self):
+        self.calls += 1
+        for response in self.responses:
+            await asyncio.sleep(0)
+            yield response
+
+
+def texts(responses):
+    return [response.content.parts[0].text for response in responses]
+
+
+def collect(cache: LlmResponseCache, key: str, upstream: Upstream, limit=None):
+    async def run():
+        stream = cache.wrap(key, "m", upstream.generate)
+        result = []
+        async for response in stream:
+            result.append(response)
+            if limit is not None and len(result) == limit:
+                await stream.aclose()
+                break
+        return result
+
+    return asyncio.run(run())
+
+
+STREAM = [chunk("你"), chunk("好"), chunk("你好", partial=False)]
+
+
+@pytest.fixture
+def fixed_clock(monkeypatch):
+    """固定写入时间，使每个条目的字节数相同"""
+    monkeypatch.setattr(time, "time", lambda: 1_700_000_000.5)
+
+
+def test_record_then_replay_chunk_by_chunk(tmp_path):
+    cache = LlmResponseCache(tmp_path, mode=CacheMode.RECORD)
+    upstream = Upstream(STREAM)
+    assert texts(collect(cache, "ab" * 32, upstream)) == ["你", "好", "你好"]
+    replayed = collect(cache, "ab" * 32, upstream)
+    assert upstream.calls == 1
+    assert texts(replayed) == ["你", "好", "你好"]
+    assert [response.partial for response in replayed] == [True, True, False]
+    assert cache.stats()[0] == 1
+
+
+def test_replay_mode_raises_on_miss_and_serves_recorded_entries(tmp_path):
+    LlmResponseCache(tmp_path).put("cd" * 32, "m", STREAM)
+    cache = LlmResponseCache(tmp_path, mode=CacheMode.REPLAY)
+    upstream = Upstream(STREAM)
+    assert texts(collect(cache, "cd" * 32, upstream)) == ["你", "好", "你好"]
+    with pytest.raises(LlmCacheMiss):
+        collect(cache, "ef" * 32, upstream)
+    assert upstream.calls == 0
+
+
+def test_bypass_mode_from_env(monkeypatch, tmp_path):
+    monkeypatch.delenv("LLM_CACHE_MODE", raising=False)
+    assert LlmResponseCache.from_env() is None
+    monkeypatch.setenv("LLM_CACHE_MODE", "bypass")
+    assert LlmResponseCache.from_env() is None
+    monkeypatch.setenv("LLM_CACHE_MODE", "replay")
+    monkeypatch.setenv("LLM_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("LLM_CACHE_TTL", "0")
+    cache = LlmResponseCache.from_env()
+    assert (cache.mode, cache.directory, cache.ttl_seconds) == (CacheMode.REPLAY, tmp_path, None)
+
+
+def test_expired_entries_are_deleted_on_read(monkeypatch, tmp_path):
+    cache = LlmResponseCache(tmp_path, ttl_seconds=60)
+    cache.put("aa" * 32, "m", STREAM)
+    assert cache.get("aa" * 32) is not None
+    future = time.time() + 120
+    monkeypatch.setattr(time, "time", lambda: future)
+    assert cache.get("aa" * 32) is None
+    assert cache.stats() == (0, 0)
+    assert not list(tmp_path.glob("*/*.jsonl"))
+
+
+def test_eviction_drops_least_recently_used_entries(tmp_path, fixed_clock):
+    probe = LlmResponseCache(tmp_path / "probe")
+    probe.put("00" * 32, "m", STREAM)
+    entry_size = probe.stats()[1]
+
+    cache = LlmResponseCache(tmp_path / "cache", max_bytes=entry_size * 2)
+    cache.put("11" * 32, "m", STREAM)
+    cache.put("22" * 32, "m", STREAM)
+    # 命中刷新访问时间，最久未访问的是第二个条目
+    assert cache.get("11" * 32) is not None
+    cache.put("33" * 32, "m", STREAM)
+    assert cache.get("22" * 32) is None
+    assert cache.get("11" * 32) is not None and cache.get("33" * 32) is not None
+    assert cache.stats() == (2, entry_size * 2)
+    # 覆盖同一条目不重复计入容量
+    cache.put("33" * 32, "m", STREAM)
+    assert cache.stats() == (2, entry_size * 2)
+
+
+def test_index_is_rebuilt_from_disk_in_access_order(tmp_path, fixed_clock):
+    first = LlmResponseCache(tmp_path)
+    first.put("11" * 32, "m", STREAM)
+    first.put("22" * 32, "m", STREAM)
+    entry_size = first.stats()[1] // 2
+    os.utime(first._path("22" * 32), (1000, 1000))
+
+    reopened = LlmResponseCache(tmp_path, max_bytes=entry_size * 2)
+    assert reopened.stats() == (2, entry_size * 2)
+    reopened.put("33" * 32, "m", STREAM)
+    assert reopened.get("22" * 32) is None
+    assert reopened.get("11" * 32) is not None
+
+
+def test_streams_closed_early_or_with_errors_are_not_cached(tmp_path):
+    cache = LlmResponseCache(tmp_path)
+    upstream = Upstream(STREAM)
+    assert texts(collect(cache, "44" * 32, upstream, limit=1)) == ["你"]
+    assert cache.get("44" * 32) is None
+
+    failed = Upstream([chunk("你"), LlmResponse(error_code="500", error_message="boom")])
+    collect(cache, "55" * 32, failed)
+    assert cache.get("55" * 32) is None
+    assert cache.stats() == (0, 0)
+
+
+def test_cancelled_stream_is_not_cached(tmp_path):
+    cache = LlmResponseCache(tmp_path)
+
+    async def slow():
+        yield chunk("你")
+        await asyncio.sleep(10)
+        yield chunk("好")
+
+    async def run():
+        async def consume():
+            return [response async for response in cache.wrap("66" * 32, "m", slow)]
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert cache.get("66" * 32) is None
+
+
+def test_request_cache_key_depends_on_model_stream_and_contents():
+    def request(text: str) -> LlmRequest:
+        return LlmRequest(contents=[types.Content(role="user", parts=[types.Part(text=text)])])
+
+    key = request_cache_key(request("hi"), "m", False)
+    assert key == request_cache_key(request("hi"), "m", False)
+    assert key != request_cache_key(request("hi"), "m", True)
+    assert key != request_cache_key(request("hi"), "other", False)
+    assert key != request_cache_key(request("hello"), "m", False)
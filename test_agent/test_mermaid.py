@@ -0,0 +1,114 @@
+import pytest
+
+from agents.reviewer_agent import review_is_redundant
+from agents.reviewer_agent.mermaid import analyze_blueprint, analyze_flowchart, extract_flowcharts, parse_flowchart
+from utils import AgentInfo
+
+
+CLEAN = """graph TD
+    A([开始]) --> B[填写订单]
+    B --> C{库存充足?}
+    C -->|是| D[调用支付]
+    C -->|否| E([结束])
+    D -->|成功| E
+    D -->|失败| F[提示重试]
+    F --> B
+"""
+
+
+def kinds(findings):
+    return sorted((finding.kind, finding.node) for finding in findings)
+
+
+def test_parse_nodes_edges_and_labels():
+    graph = parse_flowchart(CLEAN)
+    assert graph.nodes["C"].shape == "decision"
+    assert graph.nodes["A"].label == "开始"
+    assert {(edge.source, edge.target, edge.label) for edge in graph.successors("D")} == {("D", "E", "成功"), ("D", "F", "失败")}
+
+
+def test_parse_chains_groups_and_ignored_statements():
+    graph = parse_flowchart("flowchart LR\n  A & B --> C --> D; style A fill:#f9f\n  %% 注释\n  subgraph X\n  end")
+    assert {(edge.source, edge.target) for edge in graph.edges} == {("A", "C"), ("B", "C"), ("C", "D")}
+
+
+def test_parse_rejects_other_diagram_types():
+    with pytest.raises(ValueError):
+        parse_flowchart("sequenceDiagram\n  A->>B: hi")
+
+
+def test_extract_skips_non_flowchart_blocks():
+    text = f"```mermaid\nsequenceDiagram\n  A->>B: hi\n```\n\n```mermaid\n{CLEAN}```"
+    assert len(extract_flowcharts(text)) == 1
+
+
+def test_clean_flowchart_has_no_findings():
+    assert analyze_flowchart(parse_flowchart(CLEAN)) == []
+
+
+def test_structural_findings():
+    graph = parse_flowchart("""graph TD
+    A([开始]) --> B{库存充足?}
+    B --> C[调用支付]
+    C --> D[展示结果]
+    X[孤立节点] --> Y([结束])
+    L1[轮询] --> L2[等待]
+    L2 --> L1
+""")
+    assert kinds(analyze_flowchart(graph)) == [
+        ("dead_end", "D"),
+        ("dead_loop", "L1"),
+        ("missing_error_path", "C"),
+        ("single_branch_decision", "B"),
+        ("unreachable", "L1"),
+        ("unreachable", "L2"),
+        ("unreachable", "X"),
+        ("unreachable", "Y"),
+    ]
+
+
+def test_cycle_without_start_or_terminal():
+    findings = analyze_flowchart(parse_flowchart("graph TD\n  A --> B\n  B --> A"))
+    assert {finding.kind for finding in findings} == {"no_start", "no_terminal", "dead_loop"}
+
+
+def test_analyze_blueprint_without_diagram():
+    report = analyze_blueprint("# 蓝图\n没有流程图")
+    assert not report.clean
+    assert [finding.kind for finding in report.findings] == ["missing_diagram"]
+    assert report.fingerprint is None
+
+
+def test_blueprint_fingerprint_ignores_order_and_whitespace():
+    reordered = "graph TD\n" + "\n".join(reversed(CLEAN.strip().splitlines()[1:])) + "\n"
+    first = analyze_blueprint(f"```mermaid\n{CLEAN}```")
+    second = analyze_blueprint(f"前言\n```mermaid\n{reordered}```")
+    assert first.clean and first.fingerprint == second.fingerprint
+    changed = analyze_blueprint(f"```mermaid\n{CLEAN.replace('提示重试', '提示稍后重试')}```")
+    assert changed.fingerprint != first.fingerprint
+
+
+def test_semicolons_inside_labels_do_not_split_statements():
+    graph = parse_flowchart('graph TD\n  A([开始]) --> F["a; b"] --> G(c;d)\n  G -->|成功; 返回| E([结束]); F --> E')
+    assert sorted(graph.nodes) == ["A", "E", "F", "G"]
+    assert graph.nodes["F"].label == "a; b"
+    assert {(edge.source, edge.target, edge.label) for edge in graph.edges} == {
+        ("A", "F", ""), ("F", "G", ""), ("G", "E", "成功; 返回"), ("F", "E", ""),
+    }
+    assert analyze_flowchart(graph) == []
+
+
+def test_review_is_redundant_only_for_an_already_reviewed_clean_diagram():
+    config = AgentInfo.FLOW_ANALYZER_AGENT
+    reviewed = {
+        config['fingerprint_key']: "abc",
+        config['reviewed_key']: "abc",
+        AgentInfo.REVIEWER_AGENT['output_key']: "审计意见",
+    }
+    assert review_is_redundant(reviewed)
+    # 预检干净但还没有针对该流程图的审计意见时，照常调用 Reviewer
+    assert not review_is_redundant({**reviewed, config['reviewed_key']: None})
+    assert not review_is_redundant({**reviewed, config['reviewed_key']: "old"})
+    assert not review_is_redundant({**reviewed, AgentInfo.REVIEWER_AGENT['output_key']: None})
+    # 预检发现问题时不写入指纹
+    assert not review_is_redundant({**reviewed, config['fingerprint_key']: None, config['reviewed_key']: None})
@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from utils import PromptRegistry, PromptTemplate
+from utils.prompt_registry import VARIABLES_HEADER
+
+TEMPLATE = """# 角色
+你是 {role}，负责审计 {target}。
+
+## 输出
+严格输出 JSON：{"verdict": "PASS"}
+参考资料：{context?}
+"""
+
+
+def write(path, text: str, mtime: float):
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def test_compile_collects_placeholders_and_ignores_json_braces():
+    template = PromptTemplate.compile("p.md", TEMPLATE, 0)
+    assert template.placeholders == ("role", "target", "context")
+    assert template.optional == frozenset({"context"})
+    assert "{role}" not in template.static_text and "【role】" in template.static_text
+    assert '{"verdict": "PASS"}' in template.static_text
+
+
+def test_render_rejects_unknown_and_missing_placeholders():
+    template = PromptTemplate.compile("p.md", TEMPLATE, 0)
+    with pytest.raises(ValueError, match="不存在占位符"):
+        template.render(role="PM", target="Architect", extra="x")
+    with pytest.raises(ValueError, match="缺少取值"):
+        template.render(role="PM")
+    # 运行时占位符与可选占位符不需要构建期取值
+    assert template.render(runtime_keys=["target"], role="PM").endswith("### target\n{target}\n\n### context\n{context?}\n")
+
+
+def test_renders_share_a_byte_identical_static_prefix():
+    template = PromptTemplate.compile("p.md", TEMPLATE, 0)
+    first = template.render(role="产品经理", target="Architect_Expert")
+    second = template.render(role="CPO", target="Discovery_Expert", context="历史会话")
+    prefix = template.static_text.rstrip() + "\n\n---\n\n" + VARIABLES_HEADER
+    assert first.startswith(prefix) and second.startswith(prefix)
+    # 变量取值只出现在前缀之后
+    assert "产品经理" not in prefix and "CPO" not in prefix
+    assert first[len(prefix):].index("产品经理") < first[len(prefix):].index("Architect_Expert")
+
+
+def test_templates_without_placeholders_render_verbatim():
+    assert PromptTemplate.compile("p.md", "固定指令", 0).render() == "固定指令"
+
+
+def test_registry_compiles_each_file_once(tmp_path):
+    write(tmp_path / "p.md", "v1 {name}", 1000)
+    registry = PromptRegistry(root=tmp_path, hot_reload=False)
+    template = registry.get("p.md")
+    write(tmp_path / "p.md", "v2 {name}", 2000)
+    assert registry.get("p.md") is template
+    with pytest.raises(FileNotFoundError):
+        registry.get("missing.md")
+
+
+def test_hot_reload_recompiles_when_mtime_changes(tmp_path):
+    write(tmp_path / "p.md", "v1 {name}", 1000)
+    registry = PromptRegistry(root=tmp_path, hot_reload=True)
+    template = registry.get("p.md")
+    assert registry.get("p.md") is template
+
+    write(tmp_path / "p.md", "v2 {name}", 2000)
+    reloaded = registry.get("p.md")
+    assert reloaded.text == "v2 {name}" and reloaded.mtime == 2000
+    assert registry.render("p.md", name="x").startswith("v2 【name】")
+
+
+def test_hot_reload_instruction_is_a_provider(tmp_path):
+    write(tmp_path / "p.md", "v1 {name}", 1000)
+    assert callable(PromptRegistry(root=tmp_path, hot_reload=True).instruction("p.md", name="x"))
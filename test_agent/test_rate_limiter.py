@@ -0,0 +1,139 @@
+import asyncio
+
+import httpx
+import pytest
+from google.adk.models.lite_llm import LiteLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from litellm import RateLimitError
+
+import utils.rate_limiter as rate_limiter_module
+import utils.safe_lite_llm as safe_lite_llm_module
+from utils import AdaptiveRateLimiter, SafeLiteLlm, TokenBucket
+from utils.rate_limiter import RateLimiterRegistry, parse_rate_limits
+
+
+class Clock:
+    """可手动推进的 time.monotonic"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter_module.time, "monotonic", clock)
+    return clock
+
+
+def test_token_bucket_refills_at_rate_up_to_capacity(clock):
+    bucket = TokenBucket(rate=2.0, capacity=2)
+    assert bucket.reserve() == 0 and bucket.reserve() == 0
+    # 令牌用尽后按到达顺序排队：欠 1 个等 0.5s，欠 2 个等 1s
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+    clock.now += 100
+    # 补充不超过容量
+    assert bucket.reserve() == 0 and bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.5)
+
+
+def test_aimd_halves_on_429_and_recovers_on_success(clock):
+    limiter = AdaptiveRateLimiter("m", rpm=60, min_rpm=10, recovery_rpm=5)
+    assert limiter.on_rate_limited(1, retry_after=3) == 3
+    assert limiter.current_rpm == 30
+    # 冷却期内所有调用方都要等待
+    assert limiter.reserve() == pytest.approx(3)
+    limiter.on_rate_limited(2, retry_after=0)
+    limiter.on_rate_limited(3, retry_after=0)
+    assert limiter.current_rpm == 10  # 不低于 min_rpm
+
+    for _ in range(4):
+        limiter.on_success()
+    assert limiter.current_rpm == 30
+    for _ in range(10):
+        limiter.on_success()
+    assert limiter.current_rpm == 60  # 不超过配置的上限
+
+
+def test_backoff_is_exponential_with_jitter_and_capped(clock):
+    limiter = AdaptiveRateLimiter("m", base_delay=1.0, max_delay=5.0)
+    assert 0.5 <= limiter.on_rate_limited(1) <= 1.0
+    assert 2.0 <= limiter.on_rate_limited(3) <= 4.0
+    assert 2.5 <= limiter.on_rate_limited(10) <= 5.0
+    # 未配置 rpm 时只冷却不限速
+    assert limiter.current_rpm is None
+
+
+def test_parse_rate_limits_and_registry(monkeypatch):
+    assert parse_rate_limits(" openai/gpt-4o=60, *=120 ,") == {"openai/gpt-4o": 60.0, "*": 120.0}
+    with pytest.raises(ValueError):
+        parse_rate_limits("60")
+
+    monkeypatch.setenv("LLM_RATE_LIMITS", "a=30,*=120")
+    monkeypatch.setenv("LLM_MAX_RETRIES", "2")
+    registry = RateLimiterRegistry()
+    assert registry.get("a") is registry.get("a")
+    assert (registry.get("a").rpm, registry.get("b").rpm, registry.get("a").max_retries) == (30, 120, 2)
+    # 只改重试次数时保留已读取的限速
+    registry.configure(max_retries=5)
+    assert (registry.get("a").rpm, registry.get("a").max_retries) == (30, 5)
+
+
+def rate_limit_error() -> RateLimitError:
+    response = httpx.Response(429, headers={"retry-after": "0"}, request=httpx.Request("POST", "http://llm"))
+    return RateLimitError("429", llm_provider="openai", model="m", response=response)
+
+
+def chunk(text: str) -> LlmResponse:
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]), partial=True)
+
+
+def run_with_upstream(monkeypatch, script: list[list], max_retries: int = 2, calls: list = None):
+    """script 的每一项是一次上游调用：依次产出其中的响应，遇到异常则抛出"""
+    calls = [] if calls is None else calls
+
+    async def upstream(self, llm_request, stream=False):
+        attempt = script[len(calls)]
+        calls.append(attempt)
+        for item in attempt:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    monkeypatch.setattr(LiteLlm, "generate_content_async", upstream)
+    monkeypatch.setattr(safe_lite_llm_module, "rate_limiters", RateLimiterRegistry({}, max_retries=max_retries))
+    model = SafeLiteLlm(model="openai/m")
+
+    async def run():
+        texts = []
+        async for response in model._rate_limited(LlmRequest(), True, "openai/m"):
+            texts.append(response.content.parts[0].text)
+        return texts
+
+    return asyncio.run(run()), len(calls)
+
+
+def test_429_before_first_chunk_is_retried(monkeypatch):
+    texts, calls = run_with_upstream(monkeypatch, [[rate_limit_error()], [rate_limit_error()], [chunk("a"), chunk("b")]])
+    assert (texts, calls) == (["a", "b"], 3)
+
+
+def test_retries_are_bounded_by_max_retries(monkeypatch):
+    calls = []
+    with pytest.raises(RateLimitError):
+        run_with_upstream(monkeypatch, [[rate_limit_error()]] * 3, max_retries=1, calls=calls)
+    assert len(calls) == 2
+
+
+def test_429_after_first_chunk_is_not_retried(monkeypatch):
+    calls = []
+    with pytest.raises(RateLimitError):
+        run_with_upstream(monkeypatch, [[chunk("a"), rate_limit_error()], [chunk("a"), chunk("b")]], calls=calls)
+    # 已经产出的分块不会被重复产出
+    assert len(calls) == 1
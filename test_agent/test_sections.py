@@ -0,0 +1,72 @@
+from agents.architect_agent.sections import BlueprintDocument, SectionPatch, looks_like_rewrite, parse_patches
+
+
+DRAFT = """[Architect_Expert] 以下是蓝图
+
+# 1. 业务流程
+```mermaid
+graph TD
+# 不是标题
+A --> B
+```
+
+## 1.1 异常
+暂无
+
+# 2. 数据模型
+用户、订单
+"""
+
+
+def test_parse_round_trip_and_ids():
+    document = BlueprintDocument.parse(DRAFT)
+    assert document.render() == DRAFT
+    assert [(section.id, section.title, section.level) for section in document.sections] == [
+        ("S0", "(开场白)", 0), ("S1", "1. 业务流程", 1), ("S2", "1.1 异常", 2), ("S3", "2. 数据模型", 1),
+    ]
+
+
+def test_from_state_falls_back_to_text_when_sections_are_stale():
+    document = BlueprintDocument.parse(DRAFT)
+    assert BlueprintDocument.from_state(document.to_state(), DRAFT).render() == DRAFT
+    assert BlueprintDocument.from_state(document.to_state(), "# 新标题\n").render() == "# 新标题\n"
+
+
+def test_apply_patches():
+    draft = BlueprintDocument.parse(DRAFT)
+    revised, applied, rejected = draft.apply([
+        SectionPatch("REPLACE", "S2", "支付失败时回滚库存"),
+        SectionPatch("APPEND", "S3", "- 新增：退款单"),
+        SectionPatch("INSERT_AFTER", "S3", "# 3. 权限\n管理员与店员"),
+        SectionPatch("APPEND", "S4", "- 审计日志"),
+        SectionPatch("REPLACE", "S9", "不存在"),
+        SectionPatch("DELETE", "S1", ""),
+    ])
+    assert [patch.section_id for patch in applied] == ["S2", "S3", "S3", "S4"]
+    assert [(patch.op, patch.section_id) for patch in rejected] == [("REPLACE", "S9"), ("DELETE", "S1")]
+    # 只给出正文的 REPLACE 保留原标题
+    assert revised.get("S2").text == "## 1.1 异常\n支付失败时回滚库存\n"
+    assert revised.get("S3").text.endswith("用户、订单\n\n- 新增：退款单\n")
+    assert (revised.get("S4").title, revised.get("S4").level) == ("3. 权限", 1)
+    assert revised.get("S4").text.endswith("- 审计日志\n")
+    # 原蓝图不变，修订结果可以重新切分为同样的章节
+    assert draft.render() == DRAFT
+    assert [section.title for section in BlueprintDocument.parse(revised.render()).sections] == [
+        section.title for section in revised.sections
+    ]
+
+
+def test_parse_patches_ignores_text_outside_markers():
+    text = "好的，修订如下\n=== REPLACE S1 ===\n# 1. 新流程\n\n=== APPEND S2 ===\n补充\n=== END ===\n以上"
+    assert parse_patches(text) == [
+        SectionPatch("REPLACE", "S1", "# 1. 新流程"),
+        SectionPatch("APPEND", "S2", "补充"),
+    ]
+
+
+def test_looks_like_rewrite():
+    draft = BlueprintDocument.parse(DRAFT)
+    assert looks_like_rewrite(DRAFT.replace("用户", "会员"), draft)
+    assert looks_like_rewrite("```mermaid\n" + "A --> B\n" * 20 + "```", draft)
+    assert not looks_like_rewrite("好的，已根据审计意见完成修改。" * 10, draft)
+    assert not looks_like_rewrite("# 1. 业务流程\n略", draft)
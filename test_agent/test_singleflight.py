@@ -0,0 +1,65 @@
+import asyncio
+
+from utils import SingleFlight
+
+from .streams import Upstream, drain
+
+
+def test_singleflight_shares_one_upstream_and_replays_from_start():
+    async def run():
+        upstream = Upstream([{"n": 1}, {"n": 2}, {"n": 3}])
+        flights = SingleFlight(copy=dict)
+        first, shared_first = flights.join("k", upstream.stream)
+        first_items = [await anext(first)]
+        # 后到的订阅者从第一个分块开始回放
+        second, shared_second = flights.join("k", upstream.stream)
+        first_items += await drain(first)
+        second_items = await drain(second)
+        return upstream, flights, shared_first, shared_second, first_items, second_items
+
+    upstream, flights, shared_first, shared_second, first_items, second_items = asyncio.run(run())
+    assert upstream.started == 1
+    assert (shared_first, shared_second) == (False, True)
+    assert first_items == second_items == [{"n": 1}, {"n": 2}, {"n": 3}]
+    # 合并的订阅者拿到副本
+    assert first_items[0] is not second_items[0]
+    assert flights.in_flight() == 0
+
+
+def test_singleflight_propagates_errors_to_every_subscriber():
+    async def run():
+        upstream = Upstream([1, 2, 3], fail_after=1)
+        flights = SingleFlight()
+        streams = [flights.join("k", upstream.stream)[0] for _ in range(2)]
+        results = await asyncio.gather(*(drain(stream) for stream in streams), return_exceptions=True)
+        # 失败后立即移除，相同请求重新发起
+        _, shared = flights.join("k", Upstream([1]).stream)
+        return results, shared
+
+    results, shared = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert shared is False
+
+
+def test_singleflight_cancels_upstream_when_last_subscriber_leaves():
+    async def run():
+        upstream = Upstream(list(range(100)), delay=0.01)
+        flights = SingleFlight()
+        first, _ = flights.join("k", upstream.stream)
+        second, _ = flights.join("k", upstream.stream)
+        await anext(first)
+        await first.aclose()
+        await anext(second)
+        assert upstream.closed == 0  # 仍有订阅者
+        await second.aclose()
+        await asyncio.sleep(0.05)
+        return upstream, flights
+
+    upstream, flights = asyncio.run(run())
+    assert upstream.closed == 1
+    assert flights.in_flight() == 0
+
+
+def test_singleflight_disabled_from_env(monkeypatch):
+    monkeypatch.setenv("LLM_SINGLEFLIGHT", "off")
+    assert SingleFlight.from_env().enabled is False
@@ -0,0 +1,254 @@
+import asyncio
+
+import pytest
+from google.adk.agents import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.runners import InMemoryRunner
+from google.adk.sessions import InMemorySessionService, Session
+from google.genai import types
+
+from multi_agents_app.agent import PMAgentCenter
+from multi_agents_app.speculation import Speculation
+
+
+def text_event(author: str, text: str, partial: bool = False, **state_delta) -> Event:
+    return Event(
+        author=author,
+        content=types.Content(role="model", parts=[types.Part(text=text)]),
+        partial=partial,
+        actions=EventActions(state_delta=state_delta),
+    )
+
+
+def make_context(agent, **state) -> InvocationContext:
+    session = Session(id="s", app_name="app", user_id="u", state=dict(state), events=[text_event("user", "想法")])
+    return InvocationContext(session_service=InMemorySessionService(), invocation_id="inv", agent=agent, session=session)
+
+
+def phase(*events: Event, delay: float = 0.0, error: Exception = None):
+    async def run(ctx: InvocationContext):
+        for event in events:
+            await asyncio.sleep(delay)
+            yield event
+        if error is not None:
+            raise error
+
+    return run
+
+
+@pytest.fixture
+def orchestrator(monkeypatch) -> PMAgentCenter:
+    monkeypatch.setenv("PM_CHECKPOINT_DB", "off")
+    monkeypatch.setenv("PM_KNOWLEDGE_INDEX", "off")
+    monkeypatch.setenv("PM_SPECULATIVE", "1")
+    return PMAgentCenter()
+
+
+def test_fork_isolates_the_real_session(orchestrator):
+    async def run():
+        ctx = make_context(orchestrator, workflow_step="discovery_check")
+        hitl = text_event(orchestrator.name, "[HITL]")
+        speculation = Speculation(
+            "logic_feasibility", ctx,
+            phase(text_event("Architect", "蓝图", architect_output="蓝图", **{"temp:scratch": 1})),
+            pending_events=[hitl],
+        )
+        await speculation.task
+        return ctx, speculation
+
+    ctx, speculation = asyncio.run(run())
+    assert speculation.done and speculation.error is None
+    assert "architect_output" not in ctx.session.state and len(ctx.session.events) == 1
+    fork = speculation._ctx.session
+    assert fork.state["architect_output"] == "蓝图" and "temp:scratch" not in fork.state
+    assert [event.content.parts[0].text for event in fork.events] == ["想法", "[HITL]", "蓝图"]
+    assert speculation._ctx.invocation_id != ctx.invocation_id
+
+
+def test_is_valid_for_checks_history_authors_and_state(orchestrator):
+    allowed, ignored = {"user", orchestrator.name}, {"workflow_step"}
+
+    async def run():
+        ctx = make_context(orchestrator, workflow_step="discovery_check", discovery_output="需求")
+        speculation = Speculation("logic_feasibility", ctx, phase(text_event("Architect", "蓝图")))
+        await speculation.task
+        return ctx.session, speculation
+
+    session, speculation = asyncio.run(run())
+    assert speculation.is_valid_for(session, allowed, ignored)
+
+    def changed(update) -> bool:
+        copy = session.model_copy(deep=True)
+        update(copy)
+        return speculation.is_valid_for(copy, allowed, ignored)
+
+    # 用户确认、编排器进度事件与忽略的 state 不影响有效性
+    assert changed(lambda s: s.events.append(text_event("user", "继续")))
+    assert changed(lambda s: s.events.append(text_event(orchestrator.name, "进度")))
+    assert changed(lambda s: s.state.update(workflow_step="logic_feasibility"))
+    # 其他智能体的事件、被改写的历史、变化的 state 都使预跑失效
+    assert not changed(lambda s: s.events.append(text_event("Discovery_Expert", "新需求")))
+    assert not changed(lambda s: s.events.pop(0))
+    assert not changed(lambda s: s.state.update(discovery_output="改过的需求"))
+    assert not changed(lambda s: s.state.update(new_key="x"))
+
+
+def test_failed_speculation_is_invalid_and_replay_raises(orchestrator):
+    async def run():
+        ctx = make_context(orchestrator)
+        speculation = Speculation("logic_feasibility", ctx, phase(text_event("A", "1"), error=RuntimeError("boom")))
+        replayed = []
+        with pytest.raises(RuntimeError, match="boom"):
+            async for event in speculation.replay("inv2"):
+                replayed.append(event.content.parts[0].text)
+        return ctx.session, speculation, replayed
+
+    session, speculation, replayed = asyncio.run(run())
+    assert replayed == ["1"]
+    assert not speculation.is_valid_for(session, {"user"}, set())
+
+
+def test_replay_streams_while_running_and_rewrites_invocation_id(orchestrator):
+    async def run():
+        ctx = make_context(orchestrator)
+        events = [text_event("A", "1"), text_event("A", "partial", partial=True), text_event("A", "2")]
+        speculation = Speculation("logic_feasibility", ctx, phase(*events, delay=0.02))
+        replayed = []
+        async for event in speculation.replay("inv2"):
+            replayed.append((event.content.parts[0].text, event.invocation_id, speculation.done))
+        return replayed
+
+    replayed = asyncio.run(run())
+    # partial 事件不回放；第一条事件在预跑结束前就已放出
+    assert [(text, invocation_id) for text, invocation_id, _ in replayed] == [("1", "inv2"), ("2", "inv2")]
+    assert replayed[0][2] is False
+
+
+def test_speculations_are_capped(orchestrator, monkeypatch):
+    monkeypatch.setattr(PMAgentCenter, "MAX_SPECULATIONS", 2)
+
+    async def stalled(self, ctx, record_checkpoints=True):
+        await asyncio.sleep(10)
+        yield text_event("A", "never")
+
+    monkeypatch.setattr(PMAgentCenter, "_run_logic_team", stalled)
+
+    async def run():
+        tasks = []
+        for session_id in ("s1", "s2", "s3"):
+            ctx = make_context(orchestrator)
+            ctx.session.id = session_id
+            orchestrator._speculate(ctx, "discovery_check", text_event(orchestrator.name, "[HITL]"))
+            tasks.append(orchestrator._speculations[session_id].task)
+        await asyncio.sleep(0.01)
+        remaining = list(orchestrator._speculations)
+        for session_id in remaining:
+            orchestrator._discard_speculation(session_id)
+        await asyncio.wait(tasks)
+        return remaining, tasks
+
+    remaining, tasks = asyncio.run(run())
+    # 超出上限时丢弃最早的预跑
+    assert remaining == ["s2", "s3"]
+    assert tasks[0].cancelled()
+
+
+class Conversation:
+    """通过 Runner 驱动编排器，阶段 2 用替身代替：记录是预跑还是顺序运行"""
+
+    def __init__(self, orchestrator: PMAgentCenter, monkeypatch):
+        self.runs: list[str] = []
+
+        async def logic_team(agent, ctx, record_checkpoints=True):
+            label = "sequential" if record_checkpoints else "speculative"
+            self.runs.append(label)
+            await asyncio.sleep(0.01)
+            yield Event(
+                author="Architect_Expert",
+                invocation_id=ctx.invocation_id,
+                content=types.Content(role="model", parts=[types.Part(text=label)]),
+                actions=EventActions(state_delta={"architect_output": label}),
+            )
+
+        async def documentation(agent, ctx, write_file=True):
+            yield Event(author="PRD_Writer", invocation_id=ctx.invocation_id)
+
+        monkeypatch.setattr(PMAgentCenter, "_run_logic_team", logic_team)
+        # 到达阶段 2 确认点后会预跑阶段 3
+        monkeypatch.setattr(PMAgentCenter, "_run_documentation", documentation)
+        self.orchestrator = orchestrator
+        self.runner = InMemoryRunner(agent=orchestrator, app_name="app")
+
+    async def start(self):
+        await self.runner.session_service.create_session(
+            app_name="app", user_id="u", session_id="s", state={"workflow_step": "discovery_check"}
+        )
+
+    async def send(self, text: str) -> list[Event]:
+        message = types.Content(role="user", parts=[types.Part(text=text)])
+        return [event async for event in self.runner.run_async(user_id="u", session_id="s", new_message=message)]
+
+    async def session(self) -> Session:
+        return await self.runner.session_service.get_session(app_name="app", user_id="u", session_id="s")
+
+
+def test_valid_speculation_is_committed_as_is(orchestrator, monkeypatch):
+    conversation = Conversation(orchestrator, monkeypatch)
+
+    async def run():
+        await conversation.start()
+        await conversation.send("看一下")
+        speculation = orchestrator._speculations["s"]
+        await speculation.task
+        events = await conversation.send("继续")
+        return speculation, events, await conversation.session()
+
+    speculation, events, session = asyncio.run(run())
+    assert conversation.runs == ["speculative"]
+    # 提交的是预跑产出的同一批事件，只改写了 invocation_id
+    committed = [event for event in events if event.author == "Architect_Expert"]
+    assert [event.id for event in committed] == [event.id for event in speculation.events]
+    assert session.state["architect_output"] == "speculative"
+    assert session.state["workflow_step"] == "logic_check"
+
+
+def test_user_edit_cancels_the_speculation(orchestrator, monkeypatch):
+    conversation = Conversation(orchestrator, monkeypatch)
+
+    async def run():
+        await conversation.start()
+        await conversation.send("看一下")
+        first = orchestrator._speculations["s"]
+        # 让预跑开始运行，修改需求时它正在进行中
+        await asyncio.sleep(0)
+        await conversation.send("目标用户改成连锁店")
+        second = orchestrator._speculations["s"]
+        await asyncio.wait([first.task, second.task])
+        return first, second
+
+    first, second = asyncio.run(run())
+    # 修改需求后原预跑被取消，重新到达确认点时另起一次预跑
+    assert first.task.cancelled()
+    assert first is not second and conversation.runs == ["speculative", "speculative"]
+
+
+def test_stale_speculation_is_discarded(orchestrator, monkeypatch):
+    conversation = Conversation(orchestrator, monkeypatch)
+
+    async def run():
+        await conversation.start()
+        await conversation.send("看一下")
+        speculation = orchestrator._speculations["s"]
+        await speculation.task
+        # 确认之前会话被其他智能体改动
+        session = await conversation.session()
+        await conversation.runner.session_service.append_event(
+            session, text_event("Discovery_Expert", "新需求", discovery_output="新需求")
+        )
+        await conversation.send("继续")
+        return await conversation.session()
+
+    session = asyncio.run(run())
+    assert conversation.runs == ["speculative", "sequential"]
+    assert session.state["architect_output"] == "sequential"
+    assert "s" in orchestrator._speculations  # 到达下一个确认点后的新预跑
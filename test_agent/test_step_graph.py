@@ -0,0 +1,122 @@
+import asyncio
+from typing import AsyncGenerator, ClassVar
+
+import pytest
+from google.adk.agents import BaseAgent, InvocationContext
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService, Session
+from google.genai import types
+
+from multi_agents_app.step_graph import Step, StepGraph
+
+
+class ScriptedAgent(BaseAgent):
+    """按给定延迟产出若干条文本事件；fail=True 时在产出后抛出异常"""
+    count: int = 2
+    delay: float = 0.0
+    fail: bool = False
+    log: ClassVar[list[str]] = []
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        try:
+            for index in range(self.count):
+                await asyncio.sleep(self.delay)
+                yield Event(author=self.name, content=types.Content(role="model", parts=[types.Part(text=f"{self.name}:{index}")]))
+            if self.fail:
+                raise RuntimeError(f"{self.name} failed")
+        except asyncio.CancelledError:
+            self.log.append(f"{self.name}:cancelled")
+            raise
+
+
+def make_context(*agents: BaseAgent) -> InvocationContext:
+    root = ScriptedAgent(name="root", sub_agents=list(agents))
+    return InvocationContext(
+        session_service=InMemorySessionService(),
+        invocation_id="inv",
+        agent=root,
+        session=Session(id="s", app_name="app", user_id="u"),
+    )
+
+
+async def collect(graph: StepGraph, ctx: InvocationContext, **kwargs) -> list[str]:
+    return [event.content.parts[0].text async for event in graph.run(ctx, **kwargs)]
+
+
+def test_validation():
+    agent = ScriptedAgent(name="a")
+    with pytest.raises(ValueError, match="重复"):
+        StepGraph([Step("a", agent), Step("a", agent)])
+    with pytest.raises(ValueError, match="不存在"):
+        StepGraph([Step("a", agent, depends_on=("b",))])
+    with pytest.raises(ValueError, match="循环"):
+        StepGraph([Step("a", agent, depends_on=("b",)), Step("b", agent, depends_on=("a",))])
+
+
+def test_events_follow_dependencies_and_independent_steps_interleave():
+    research = ScriptedAgent(name="research", count=3, delay=0.01)
+    draft = ScriptedAgent(name="draft", count=3, delay=0.015)
+    review = ScriptedAgent(name="review", count=1)
+    graph = StepGraph([
+        Step("research", research),
+        Step("draft", draft),
+        Step("review", review, depends_on=("research", "draft")),
+    ])
+    texts = asyncio.run(collect(graph, make_context(research, draft, review)))
+
+    assert [text for text in texts if text.startswith("research")] == ["research:0", "research:1", "research:2"]
+    assert [text for text in texts if text.startswith("draft")] == ["draft:0", "draft:1", "draft:2"]
+    assert texts[-1] == "review:0"
+    # 两个独立步骤并发运行，事件交错出现
+    assert texts.index("draft:0") < texts.index("research:2")
+
+
+def test_completed_and_skipped_steps_do_not_run_and_callbacks_fire():
+    first = ScriptedAgent(name="first", count=1)
+    second = ScriptedAgent(name="second", count=1)
+    third = ScriptedAgent(name="third", count=1)
+    graph = StepGraph([
+        Step("first", first),
+        Step("second", second, depends_on=("first",), skip_if=lambda ctx: True),
+        Step("third", third, depends_on=("second",)),
+    ])
+    done = []
+
+    def on_step_done(step: Step):
+        done.append(step.name)
+        return Event(author="graph", content=types.Content(role="model", parts=[types.Part(text=f"done:{step.name}")]))
+
+    texts = asyncio.run(collect(graph, make_context(first, second, third), completed=["first"], on_step_done=on_step_done))
+    assert texts == ["third:0", "done:third"]
+    assert done == ["third"]
+
+
+def test_failure_cancels_running_steps():
+    ScriptedAgent.log.clear()
+    broken = ScriptedAgent(name="broken", count=1, fail=True)
+    slow = ScriptedAgent(name="slow", count=5, delay=0.05)
+    graph = StepGraph([Step("broken", broken), Step("slow", slow)])
+
+    async def run():
+        with pytest.raises(RuntimeError, match="broken failed"):
+            await collect(graph, make_context(broken, slow))
+        return [task for task in asyncio.all_tasks() if task.get_name().startswith("step:")]
+
+    assert asyncio.run(run()) == []
+    assert "slow:cancelled" in ScriptedAgent.log
+
+
+def test_consumer_exit_cancels_running_steps():
+    ScriptedAgent.log.clear()
+    fast = ScriptedAgent(name="fast", count=1)
+    slow = ScriptedAgent(name="slow", count=5, delay=0.05)
+    graph = StepGraph([Step("fast", fast), Step("slow", slow)])
+
+    async def run():
+        events = graph.run(make_context(fast, slow))
+        await anext(events)
+        await events.aclose()
+        return [task for task in asyncio.all_tasks() if task.get_name().startswith("step:")]
+
+    assert asyncio.run(run()) == []
+    assert "slow:cancelled" in ScriptedAgent.log
@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from agents.writer_agent import StreamingDocument
+
+
+def test_document_is_written_in_order_and_committed_atomically(tmp_path):
+    path = str(tmp_path / "out" / "prd.md")
+    document = StreamingDocument(path, 3, header="# PRD\n")
+    document.write(1, "B1")
+    document.write(0, "A1")
+    document.write(2, "C1")
+    # 排在最前的模块直接写入临时文件，其余模块先缓冲
+    assert open(f"{path}.tmp", encoding="utf-8").read() == "# PRD\nA1"
+    assert not os.path.exists(path)
+
+    assert document.finish(1) == []
+    document.write(1, "B2")
+    assert document.finish(0) == [0, 1]
+    document.write(2, "C2")
+    with pytest.raises(RuntimeError):
+        document.commit()
+    assert document.finish(2) == [2]
+
+    assert document.commit() == path
+    assert open(path, encoding="utf-8").read() == "# PRD\nA1B1B2C1C2"
+    assert not os.path.exists(f"{path}.tmp")
+
+
+def test_document_abort_removes_the_temporary_file(tmp_path):
+    path = str(tmp_path / "prd.md")
+    document = StreamingDocument(path, 2)
+    document.write(0, "partial")
+    document.abort()
+    document.abort()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,40 @@
+import json
+
+from utils.streaming_json import IncrementalJsonParser
+
+
+REPORT = {"verdict": "REJECT", "score": 4.5, "human_message": "请补充\"目标用户\"\n你好", "ok": True, "extra": None}
+
+
+def test_parser_extracts_fields_chunk_by_chunk():
+    text = "```json\n" + json.dumps(REPORT, ensure_ascii=True) + "\n```"
+    parser = IncrementalJsonParser()
+    seen = []
+    for char in text:
+        parser.feed(char)
+        seen.append(set(parser.fields))
+    assert parser.fields == REPORT
+    assert parser.closed
+    # verdict 在对象闭合之前就已可用
+    assert any("verdict" in fields and "ok" not in fields for fields in seen)
+
+
+def test_parser_reports_scalar_only_after_it_ends():
+    parser = IncrementalJsonParser()
+    parser.feed('{"score": 7')
+    assert "score" not in parser.fields
+    parser.feed(", ")
+    assert parser.fields["score"] == 7
+
+
+def test_parser_skips_nested_values_and_surrogate_pairs():
+    parser = IncrementalJsonParser()
+    parser.feed('{"meta": {"verdict": "PASS", "list": [1, 2]}, "items": ["a"], "emoji": "\\ud83d\\ude00", "verdict": "PASS"}')
+    assert parser.fields == {"emoji": "\U0001F600", "verdict": "PASS"}
+
+
+def test_parser_ignores_text_after_top_level_object():
+    parser = IncrementalJsonParser()
+    parser.feed('说明文字 {"verdict": "PASS"} {"verdict": "REJECT"}')
+    assert parser.fields == {"verdict": "PASS"}
+    assert parser.closed
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import os
+import random
+
+import pytest
+
+from utils import InMemoryExporter, JsonlExporter, Tracer
+
+
+def by_name(exporter: InMemoryExporter) -> dict:
+    return {span.name: span for span in exporter.spans}
+
+
+def test_nested_spans_share_trace_and_link_parents():
+    exporter = InMemoryExporter()
+    tracer = Tracer(exporter)
+    with tracer.span("session", "session") as root:
+        with tracer.span("logic", "phase"):
+            with tracer.span("Architect", "agent") as agent:
+                assert tracer.current() is agent
+                assert agent.nearest("session") is root
+            assert tracer.current().name == "logic"
+    assert tracer.current() is None
+
+    spans = by_name(exporter)
+    # 子跨度先结束，先导出
+    assert [span.name for span in exporter.spans] == ["Architect", "logic", "session"]
+    assert spans["session"].parent_id is None
+    assert spans["logic"].parent_id == spans["session"].span_id
+    assert spans["Architect"].parent_id == spans["logic"].span_id
+    assert len({span.trace_id for span in exporter.spans}) == 1
+    assert all(span.duration is not None and span.status == "ok" for span in exporter.spans)
+
+
+def test_child_tasks_inherit_the_current_span():
+    exporter = InMemoryExporter()
+    tracer = Tracer(exporter)
+
+    async def step(name: str):
+        await asyncio.sleep(0.01)
+        with tracer.span(name, "agent"):
+            await asyncio.sleep(0.01)
+
+    async def run():
+        with tracer.span("logic", "phase"):
+            await asyncio.gather(step("draft"), step("research"))
+        # 另起的根跨度属于新的追踪
+        with tracer.span("other", "phase"):
+            pass
+
+    asyncio.run(run())
+    spans = by_name(exporter)
+    assert spans["draft"].parent_id == spans["research"].parent_id == spans["logic"].span_id
+    assert spans["draft"].trace_id == spans["logic"].trace_id
+    assert spans["other"].trace_id != spans["logic"].trace_id
+
+
+def test_error_and_cancelled_status():
+    exporter = InMemoryExporter()
+    tracer = Tracer(exporter)
+    with pytest.raises(ValueError):
+        with tracer.span("broken", "agent"):
+            raise ValueError("boom")
+
+    async def slow():
+        with tracer.span("slow", "llm"):
+            await asyncio.sleep(10)
+
+    async def run():
+        task = asyncio.create_task(slow())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    spans = by_name(exporter)
+    assert (spans["broken"].status, spans["broken"].error) == ("error", "ValueError: boom")
+    assert spans["slow"].status == "cancelled"
+
+
+def test_trace_events_counts_events_and_marks_early_close():
+    exporter = InMemoryExporter()
+    tracer = Tracer(exporter)
+
+    async def events():
+        for index in range(5):
+            yield index
+
+    async def run():
+        assert [event async for event in tracer.trace_events(events(), "full", "agent")] == list(range(5))
+        stream = tracer.trace_events(events(), "partial", "agent")
+        await anext(stream)
+        await stream.aclose()
+
+    asyncio.run(run())
+    spans = by_name(exporter)
+    assert spans["full"].attributes["events"] == 5 and "ttfe" in spans["full"].attributes
+    assert (spans["partial"].status, spans["partial"].attributes["events"]) == ("cancelled", 1)
+
+
+def test_sampling_is_decided_by_the_root_span(monkeypatch):
+    exporter = InMemoryExporter()
+    tracer = Tracer(exporter, sample_rate=0.5)
+    draws = iter([0.9, 0.1])
+    monkeypatch.setattr(random, "random", lambda: next(draws))
+    for name in ("dropped", "kept"):
+        with tracer.span(name, "session"):
+            with tracer.span(f"{name}.child", "agent") as child:
+                # 子跨度继承根跨度的采样结论，不再抽样
+                assert child.sampled == (name == "kept")
+    assert [span.name for span in exporter.spans] == ["kept.child", "kept"]
+
+    # 没有导出器时跨度照常创建，只是不导出
+    with Tracer(None).span("local", "agent") as span:
+        assert span.sampled
+
+
+def test_jsonl_exporter_rotates(tmp_path):
+    path = str(tmp_path / "traces" / "traces.jsonl")
+    exporter = JsonlExporter(path, max_bytes=600, backup_count=2)
+    tracer = Tracer(exporter)
+    for index in range(30):
+        with tracer.span(f"span-{index}", "agent", payload="x" * 100):
+            pass
+    exporter.close()
+
+    files = sorted(os.listdir(tmp_path / "traces"))
+    assert files == ["traces.jsonl", "traces.jsonl.1", "traces.jsonl.2"]
+    for name in files:
+        assert os.path.getsize(tmp_path / "traces" / name) <= 600
+    lines = open(path, encoding="utf-8").read().splitlines()
+    last = json.loads(lines[-1])
+    assert last["name"] == "span-29" and last["attributes"] == {"payload": "x" * 100}
+
+
+def test_tracer_from_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("TRACE_EXPORTER", "memory")
+    monkeypatch.setenv("TRACE_SAMPLE_RATE", "0.25")
+    tracer = Tracer.from_env()
+    assert isinstance(tracer.exporter, InMemoryExporter) and tracer.sample_rate == 0.25
+    monkeypatch.setenv("TRACE_EXPORTER", "jsonl")
+    monkeypatch.setenv("TRACE_FILE", str(tmp_path / "t.jsonl"))
+    tracer = Tracer.from_env()
+    assert isinstance(tracer.exporter, JsonlExporter)
+    tracer.exporter.close()
+    monkeypatch.setenv("TRACE_EXPORTER", "off")
+    assert Tracer.from_env().exporter is None
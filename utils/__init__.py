@@ -1,7 +1,27 @@
 from .safe_lite_llm import SafeLiteLlm
-from .model import MODEL
+from .model import get_model_name, get_default_model, get_agent_model_name, get_fast_model_name, create_model, supports_structured_output
 from .logger import logger
 from .agent_info import AgentInfo
 from .load_prompt import load_prompt
+from .prompt_registry import PromptRegistry, PromptTemplate, prompt_registry
+from .llm_cache import LlmResponseCache, CacheMode
+from .checkpoint_store import Checkpoint, CheckpointStore
+from .json_repair import repair_json
+from .metrics import metrics
+from .rate_limiter import AdaptiveRateLimiter, TokenBucket, rate_limiters
+from .http_pool import HttpClientPool, http_pool
+from .singleflight import SingleFlight
+from .tracing import Span, Tracer, InMemoryExporter, JsonlExporter, tracer
+from .blob_store import BlobStore, blob_store
+from .knowledge_index import KnowledgeHit, KnowledgeIndex
+from .deadline import DeadlineExceeded, deadline, phase_deadline
+from .hedging import HedgePolicy, hedge_policy
 
-__all__ = ['SafeLiteLlm', 'MODEL', 'logger', 'AgentInfo', 'load_prompt']
+__all__ = ['SafeLiteLlm', 'get_model_name', 'get_default_model', 'get_agent_model_name', 'get_fast_model_name', 'create_model', 'supports_structured_output', 'logger', 'AgentInfo', 'load_prompt', 'PromptRegistry', 'PromptTemplate', 'prompt_registry', 'LlmResponseCache', 'CacheMode', 'Checkpoint', 'CheckpointStore', 'repair_json', 'metrics', 'AdaptiveRateLimiter', 'TokenBucket', 'rate_limiters', 'HttpClientPool', 'http_pool', 'SingleFlight', 'Span', 'Tracer', 'InMemoryExporter', 'JsonlExporter', 'tracer', 'BlobStore', 'blob_store', 'KnowledgeHit', 'KnowledgeIndex', 'DeadlineExceeded', 'deadline', 'phase_deadline', 'HedgePolicy', 'hedge_policy']
+
+
+def __getattr__(name):
+    # MODEL 在首次访问时才创建 (见 utils.model)
+    if name == "MODEL":
+        return get_default_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -6,6 +6,9 @@ class AgentInfo:
     """
     产品经理智能体应用 - 智能体注册表配置
     定义了每个智能体在 Google ADK 中的核心参数
+    token_budget: 该智能体单次 LLM 请求的上下文 token 预算 (见 utils.context_compactor)
+    model: 该智能体使用的 LiteLLM 模型名，None 表示使用 .env 中的 MODEL_NAME
+           (可被环境变量 AGENT_MODELS="智能体名=模型名,..." 覆盖，见 utils.model)
     """
 
     # 1. 需求分析专家 (Discovery Agent)
@@ -13,7 +16,9 @@ class AgentInfo:
         "name": "Discovery_Expert",
         "description": "负责产品启动阶段的需求挖掘与细化。当用户想法模糊、缺乏受众定义或痛点描述时调用。它通过引导式对话补全信息。",
         "instruction_path": "agents/discovery_agent/discovery.md",
-        "output_key": "discovery_output"
+        "output_key": "discovery_output",
+        "token_budget": 8000,
+        "model": None
     }
 
     # 2. 逻辑架构师 (Architect Agent) - 你的核心 Agent
@@ -21,7 +26,11 @@ class AgentInfo:
         "name": "Architect_Expert",
         "description": "核心逻辑转换器。负责将抽象想法转化为结构化业务逻辑、Mermaid流程图和功能清单。负责定义业务闭环路径。",
         "instruction_path": "agents/architect_agent/architect.md",
-        "output_key": "architect_output"
+        "output_key": "architect_output",
+        # 蓝图按 Markdown 标题切分后的章节列表，终稿按章节编号修订
+        "sections_key": "architect_sections",
+        "token_budget": 12000,
+        "model": None
     }
 
     # 3. 逻辑审计员 (Reviewer Agent)
@@ -29,7 +38,9 @@ class AgentInfo:
         "name": "Logic_Reviewer",
         "description": "质量把控专家。专门负责逻辑审查、漏洞发现和异常流程补充。用于对架构师产出的流程图进行边界案例（Edge Cases）压力测试。",
         "instruction_path": "agents/reviewer_agent/reviewer.md",
-        "output_key": "reviewer_output"
+        "output_key": "reviewer_output",
+        "token_budget": 10000,
+        "model": None
     }
 
     # 4. 深度访谈式调研专家 (Researcher Agent)
@@ -37,7 +48,11 @@ class AgentInfo:
         "name": "Market_Researcher",
         "description": "充当“专业信息挖掘者”，通过向用户提问引导其提供行业内幕、竞品情报或业务文档，从而为 Architect 提供决策支撑。",
         "instruction_path": "agents/researcher_agent/researcher.md",
-        "output_key": "researcher_output"
+        "output_key": "researcher_output",
+        # 阶段 2 开始时从历史会话检索到的相关情报，提示词通过 {prior_research?} 读取
+        "prior_key": "prior_research",
+        "token_budget": 8000,
+        "model": None
     }
 
     # 5. 文档专家 (Writer Agent)
@@ -45,12 +60,47 @@ class AgentInfo:
         "name": "PRD_Writer",
         "description": "交付物封装器。负责将各智能体协作产生的碎片化逻辑整理为专业、格式规范的 Markdown PRD 文档。",
         "instruction_path": "agents/writer_agent/writer.md",
-        "output_key": "writer_output"
+        "output_key": "writer_output",
+        # PRD 文件名及记录其路径的 state key (见 agents.writer_agent.SectionedPrdWriter)
+        "file_name": "Product_Requirement_Document.md",
+        "path_key": "prd_path",
+        # 置为真时只生成不写文件 (预跑阶段的会话副本)，由编排器在提交预跑结果时调用 save 写出
+        "defer_key": "temp:prd_deferred",
+        "token_budget": 16000,
+        "model": None
     }
     # 6. 首席产品专家 (Senior PM Agent)
     SENIOR_PM_AGENT = {
         "name": "Senior_PM_Auditor",
         "description": "质量决策专家与裁判。负责对各阶段产出进行深度逻辑审计与量化评分（JSON格式）。具备拦截机制，对不合格（<6分）的设计给出强制修改建议并触发迭代，确保产品方案具备商业深度与技术鲁棒性。",
         "instruction_path": "agents/senior_pm_agent/senior_pm.md",
-        "output_key": "senior_pm_output"
-    }
\ No newline at end of file
+        "output_key": "senior_pm_output",
+        "token_budget": 6000,
+        "model": None,
+        # 级联审计：先用快速模型判定，结论处于及格线附近或解析失败时再交给主模型
+        # None 表示使用环境变量 FAST_MODEL_NAME，两者都未配置时不启用级联
+        "fast_model": None,
+        "cascade_margin": 1.0
+    }
+
+    # 7. 蓝图修订 (Architect Reviser) - Step 2.4 终稿，输出章节级补丁而非整份重写
+    ARCHITECT_REVISER_AGENT = {
+        "name": "Architect_Reviser",
+        "description": "根据逻辑审计意见与调研情报，对架构师蓝图的相关章节输出修订补丁，并在本地合并成终稿。",
+        "instruction_path": "agents/architect_agent/architect_revise.md",
+        "output_key": "architect_output",
+        "sections_key": "architect_sections",
+        "token_budget": 12000,
+        "model": None
+    }
+
+    # 8. 流程图预检 (Flow Analyzer) - 本地解析 Mermaid 并做结构检查，不调用模型
+    FLOW_ANALYZER_AGENT = {
+        "name": "Flow_Analyzer",
+        "description": "在 Reviewer 之前确定性地检查架构蓝图中的 Mermaid 流程图：不可达节点、死路、单出口判断、缺少异常分支与死循环。",
+        "output_key": "mermaid_findings",
+        "report_key": "mermaid_report",
+        # 预检通过时的流程图指纹，以及上次 Reviewer 审计时的指纹
+        "fingerprint_key": "mermaid_fingerprint",
+        "reviewed_key": "mermaid_reviewed_fingerprint"
+    }
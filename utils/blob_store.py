@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+from .metrics import metrics
+
+# state 中的引用形式：文本与 JSON (列表 / 字典) 分别使用不同前缀
+TEXT_PREFIX = "blob://sha256/"
+JSON_PREFIX = "blob+json://sha256/"
+_REFERENCE = re.compile(r"blob(\+json)?://sha256/([0-9a-f]{64})")
+
+
+class BlobStore:
+    """
+    内容寻址的本地 blob 存储：大段智能体产出只存一份，session.state 中只保留引用
+
+    - 以内容的 sha256 为文件名，相同内容 (例如两轮 Architect 产出中未变化的部分、重复的会话) 只写一次
+    - 可选 zlib 压缩，压缩无收益时保存原文
+    - 读取时经过按字节数限定的 LRU 缓存，并发会话共享
+    - 引用在提示词渲染 (PromptRegistry.instruction) 或代码读取 (resolve) 时才展开
+    - 只转存 state_delta 中的值；事件 content 中的原文不做处理，会话事件历史仍保存完整文本
+
+    配置在首次使用时从环境变量读取：
+    - PM_BLOB_STORE: 存储目录，默认项目根目录下的 .pm_state/blobs；设为 off 时不再转存 (已有引用仍可读取)
+    - PM_BLOB_THRESHOLD: 转存阈值 (UTF-8 字节数)，默认 2048
+    - PM_BLOB_COMPRESS: 是否压缩，默认开启
+    - PM_BLOB_CACHE_MB: 解码缓存上限，默认 64
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        threshold: Optional[int] = None,
+        compress: Optional[bool] = None,
+        cache_bytes: Optional[int] = None,
+    ):
+        self._root = root
+        self._threshold = threshold
+        self._compress = compress
+        self._cache_bytes = cache_bytes
+        self._configured = False
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+    def _configure(self):
+        if self._configured:
+            return
+        with self._lock:
+            if self._root is None:
+                default = str(Path(__file__).parent.parent / ".pm_state" / "blobs")
+                self._root = os.getenv("PM_BLOB_STORE", default)
+            if self._threshold is None:
+                self._threshold = int(os.getenv("PM_BLOB_THRESHOLD", "2048"))
+            if self._compress is None:
+                self._compress = os.getenv("PM_BLOB_COMPRESS", "on").lower() not in ("0", "off", "false")
+            if self._cache_bytes is None:
+                self._cache_bytes = int(float(os.getenv("PM_BLOB_CACHE_MB", "64")) * 1024 * 1024)
+            self._configured = True
+
+    def configure(self, root: Optional[str] = None, threshold: Optional[int] = None, compress: Optional[bool] = None):
+        """运行期替换配置 (例如基准测试把存储目录指向临时目录)"""
+        with self._lock:
+            self._root, self._threshold, self._compress = root, threshold, compress
+            self._configured = False
+            self._cache.clear()
+            self._cached_bytes = 0
+
+    @property
+    def enabled(self) -> bool:
+        self._configure()
+        return self._root.lower() != "off"
+
+    # --------------------------------------------------------------
+    # 读写
+    # --------------------------------------------------------------
+
+    def _path(self, digest: str, compressed: bool) -> Path:
+        return Path(self._root) / digest[:2] / (digest + (".z" if compressed else ""))
+
+    def put(self, data: bytes) -> str:
+        """写入内容，返回其 sha256；已存在时不重复写入"""
+        self._configure()
+        digest = hashlib.sha256(data).hexdigest()
+        if self._path(digest, True).exists() or self._path(digest, False).exists():
+            metrics.increment("blob.dedup")
+            return digest
+        payload, compressed = data, False
+        if self._compress:
+            packed = zlib.compress(data, 6)
+            if len(packed) < len(data):
+                payload, compressed = packed, True
+        path = self._path(digest, compressed)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再改名，并发写入同一内容时互不干扰
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(payload)
+        os.replace(tmp_path, path)
+        metrics.increment("blob.written")
+        metrics.increment("blob.bytes_written", len(payload))
+        self._remember(digest, data)
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        """
+        Raises:
+            KeyError: blob 不存在
+        """
+        self._configure()
+        with self._lock:
+            data = self._cache.get(digest)
+            if data is not None:
+                self._cache.move_to_end(digest)
+                return data
+        for compressed in (True, False):
+            path = self._path(digest, compressed)
+            if path.exists():
+                data = path.read_bytes()
+                data = zlib.decompress(data) if compressed else data
+                metrics.increment("blob.read")
+                self._remember(digest, data)
+                return data
+        raise KeyError(f"blob 不存在: {digest}")
+
+    def _remember(self, digest: str, data: bytes):
+        with self._lock:
+            if digest in self._cache or len(data) > self._cache_bytes:
+                return
+            self._cache[digest] = data
+            self._cached_bytes += len(data)
+            while self._cached_bytes > self._cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= len(evicted)
+
+    # --------------------------------------------------------------
+    # state 值与引用的转换
+    # --------------------------------------------------------------
+
+    def offload(self, value: Any) -> Any:
+        """超过阈值的字符串 / 列表 / 字典转存为引用，其他值原样返回"""
+        if not self.enabled or is_reference(value):
+            return value
+        if isinstance(value, str):
+            data, prefix = value.encode("utf-8"), TEXT_PREFIX
+        elif isinstance(value, (list, dict)):
+            try:
+                data, prefix = json.dumps(value, ensure_ascii=False).encode("utf-8"), JSON_PREFIX
+            except (TypeError, ValueError):
+                return value
+        else:
+            return value
+        if len(data) < self._threshold:
+            return value
+        return prefix + self.put(data)
+
+    def offload_delta(self, state_delta: dict) -> int:
+        """就地把 state_delta 中的大值替换为引用 (temp: 前缀的临时键除外)，返回转存的键数"""
+        count = 0
+        for key, value in state_delta.items():
+            if key.startswith("temp:"):
+                continue
+            offloaded = self.offload(value)
+            if offloaded is not value:
+                state_delta[key] = offloaded
+                count += 1
+        return count
+
+    def resolve(self, value: Any) -> Any:
+        """引用展开为原值，非引用原样返回"""
+        if not is_reference(value):
+            return value
+        digest = value.rsplit("/", 1)[1]
+        text = self.get(digest).decode("utf-8")
+        return json.loads(text) if value.startswith(JSON_PREFIX) else text
+
+    def resolve_mapping(self, mapping) -> dict:
+        return {key: self.resolve(value) for key, value in dict(mapping).items()}
+
+    def expand(self, text: str) -> str:
+        """展开文本中出现的全部引用 (例如 ADK 把 state 注入提示词之后)"""
+        if "blob" not in text:
+            return text
+
+        def replace(match: re.Match) -> str:
+            value = self.resolve(match.group(0))
+            return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+        return _REFERENCE.sub(replace, text)
+
+
+def is_reference(value: Any) -> bool:
+    return isinstance(value, str) and _REFERENCE.fullmatch(value) is not None
+
+
+# 全局 blob 存储
+blob_store = BlobStore()
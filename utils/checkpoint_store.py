@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    """
+    一个已完成子步骤的检查点
+
+    Attributes:
+        phase: 所属阶段，对应 workflow_step，例如 "logic_feasibility"
+        step: 步骤名称，例如 "draft"
+        agent_name: 产出该步骤的子智能体
+        output_key: 子智能体的 output_key
+        output: 子智能体写入 state 的产出
+        state_version: 该步骤完成后会话 state 的版本号 (单会话内单调递增)
+    """
+    phase: str
+    step: str
+    agent_name: str
+    output_key: Optional[str]
+    output: Optional[str]
+    state_version: int
+
+
+class CheckpointStore:
+    """
+    基于本地 SQLite (WAL 模式) 的子步骤检查点存储
+
+    每完成一个子智能体就写入一行；会话中断后再次运行时，
+    编排器据此跳过已完成的步骤并恢复其产出，不再重复 LLM 调用。
+    连接在首次使用时才建立，导入本模块不会触碰磁盘。
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS checkpoints (
+            session_id    TEXT    NOT NULL,
+            phase         TEXT    NOT NULL,
+            step          TEXT    NOT NULL,
+            agent_name    TEXT    NOT NULL,
+            output_key    TEXT,
+            output        TEXT,
+            state_version INTEGER NOT NULL,
+            created_at    REAL    NOT NULL,
+            PRIMARY KEY (session_id, phase, step)
+        )
+    """
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = Path(path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["CheckpointStore"]:
+        """
+        根据环境变量 PM_CHECKPOINT_DB 构造存储
+        默认写入项目根目录下的 .pm_state/checkpoints.sqlite3，设为 off 时关闭检查点
+        """
+        path = os.getenv("PM_CHECKPOINT_DB", str(Path(__file__).parent.parent / ".pm_state" / "checkpoints.sqlite3"))
+        if path.lower() in ("", "off", "none"):
+            return None
+        return cls(path)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(self._SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def record(
+        self,
+        session_id: str,
+        phase: str,
+        step: str,
+        agent_name: str,
+        output_key: Optional[str],
+        output: Optional[str],
+    ) -> int:
+        """写入 (或覆盖) 一个步骤的检查点，返回分配的 state_version"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                (latest,) = conn.execute(
+                    "SELECT COALESCE(MAX(state_version), 0) FROM checkpoints WHERE session_id = ?",
+                    (session_id,),
+                ).fetchone()
+                version = latest + 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (session_id, phase, step, agent_name, output_key, output, version, time.time()),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return version
+
+    def completed(self, session_id: str, phase: str) -> dict[str, Checkpoint]:
+        """返回某会话某阶段已完成的步骤，按 state_version 升序"""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT phase, step, agent_name, output_key, output, state_version FROM checkpoints "
+                "WHERE session_id = ? AND phase = ? ORDER BY state_version",
+                (session_id, phase),
+            ).fetchall()
+        return {row[1]: Checkpoint(*row) for row in rows}
+
+    def clear(self, session_id: str) -> int:
+        """删除某会话的全部检查点 (例如复用同一会话 ID 重新开始)，返回删除的行数"""
+        with self._lock:
+            cursor = self._connection().execute("DELETE FROM checkpoints WHERE session_id = ?", (session_id,))
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,172 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+from google.adk.models.llm_request import LlmRequest
+from google.genai import types
+
+from .logger import logger
+
+SUMMARY_HEADER = "【历史对话摘要】以下为较早轮次的压缩摘要，仅保留要点："
+
+
+# token 计数缓存：键为文本的 sha256 (而非文本本身)，缓存不会持有大段提示词
+_TOKEN_CACHE_SIZE = 8192
+_token_cache: OrderedDict[tuple[str, str], int] = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+
+def _count_tokens(text: str, model: str) -> int:
+    try:
+        import litellm
+        return litellm.token_counter(model=model, text=text)
+    except Exception:
+        cjk = len(re.findall(r"[\u3000-\u9fff\uff00-\uffef]", text))
+        return cjk + (len(text) - cjk) // 4 + 1
+
+
+def count_tokens(text: str, model: str = "") -> int:
+    """
+    本地计算 token 数
+    优先使用 litellm 内置分词器 (离线可用)，失败时退化为按字符估算：
+    CJK 字符约 1 token/字，其余约 4 字符/token
+    """
+    if not text:
+        return 0
+    key = (hashlib.sha256(text.encode("utf-8")).hexdigest(), model)
+    with _token_cache_lock:
+        count = _token_cache.get(key)
+        if count is not None:
+            _token_cache.move_to_end(key)
+            return count
+    count = _count_tokens(text, model)
+    with _token_cache_lock:
+        _token_cache[key] = count
+        while len(_token_cache) > _TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return count
+
+
+def _content_text(content: types.Content) -> str:
+    texts = []
+    for part in content.parts or []:
+        if part.text:
+            texts.append(part.text)
+        elif part.function_call or part.function_response:
+            texts.append("[工具调用]")
+    return "\n".join(texts)
+
+
+def _content_digest(content: types.Content) -> str:
+    return hashlib.sha256(f"{content.role}\x00{_content_text(content)}".encode("utf-8")).hexdigest()
+
+
+def summarize_turn(content: types.Content, max_chars: int = 160) -> str:
+    """
+    本地抽取式摘要：保留 Markdown 标题与首段要点，截断到 max_chars
+    不额外调用 LLM，保证压缩阶段本身没有网络开销
+    """
+    text = _content_text(content).strip()
+    if not text:
+        return ""
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    headings = [line.lstrip("#").strip() for line in lines if line.startswith("#")]
+    body = next((line for line in lines if not line.startswith(("#", "```", "|"))), "")
+    summary = " / ".join(headings[:4])
+    if body:
+        summary = f"{summary}：{body}" if summary else body
+    if len(summary) > max_chars:
+        summary = summary[:max_chars] + "…"
+    role = "用户" if content.role == "user" else "智能体"
+    return f"- {role}: {summary}"
+
+
+class ContextCompactor:
+    """
+    按 token 预算压缩请求上下文
+
+    - 最近的轮次原样保留 (至少 keep_recent_turns 条)
+    - 超出预算的较早轮次折叠为一段“运行摘要”，作为首条 user 消息注入
+    - 摘要按历史前缀缓存：新轮次滚出窗口时只对新增部分做增量摘要
+    """
+
+    def __init__(
+        self,
+        token_budget: int,
+        keep_recent_turns: int = 4,
+        summary_ratio: float = 0.2,
+        max_cached_summaries: int = 256,
+    ):
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.summary_ratio = summary_ratio
+        self.max_cached_summaries = max_cached_summaries
+        # 历史前缀摘要 (按轮次哈希链) -> 摘要行
+        self._summaries: OrderedDict[str, list[str]] = OrderedDict()
+
+    def _running_summary(self, contents: list[types.Content]) -> list[str]:
+        """返回 contents 的摘要行，复用最长的已缓存前缀"""
+        chain = []
+        digest = ""
+        for content in contents:
+            digest = hashlib.sha256(f"{digest}{_content_digest(content)}".encode("utf-8")).hexdigest()
+            chain.append(digest)
+
+        start, lines = 0, []
+        for index in range(len(chain) - 1, -1, -1):
+            if chain[index] in self._summaries:
+                start, lines = index + 1, list(self._summaries[chain[index]])
+                self._summaries.move_to_end(chain[index])
+                break
+
+        for index in range(start, len(contents)):
+            line = summarize_turn(contents[index])
+            if line:
+                lines.append(line)
+        if chain:
+            self._summaries[chain[-1]] = lines
+            while len(self._summaries) > self.max_cached_summaries:
+                self._summaries.popitem(last=False)
+        return lines
+
+    def compact(self, llm_request: LlmRequest, model: str = "") -> bool:
+        """原地压缩 llm_request.contents，发生压缩时返回 True"""
+        contents = llm_request.contents
+        if not contents or len(contents) <= self.keep_recent_turns:
+            return False
+
+        instruction = llm_request.config.system_instruction
+        instruction_tokens = count_tokens(instruction, model) if isinstance(instruction, str) else 0
+        turn_tokens = [count_tokens(_content_text(content), model) for content in contents]
+        if instruction_tokens + sum(turn_tokens) <= self.token_budget:
+            return False
+
+        # 从最新的轮次向前保留，直到用完“原文”预算
+        verbatim_budget = max(self.token_budget - instruction_tokens, 0) * (1 - self.summary_ratio)
+        keep_from = len(contents)
+        used = 0
+        while keep_from > 0:
+            cost = turn_tokens[keep_from - 1]
+            kept = len(contents) - keep_from
+            if kept >= self.keep_recent_turns and used + cost > verbatim_budget:
+                break
+            used += cost
+            keep_from -= 1
+        if keep_from == 0:
+            return False
+
+        # 摘要超出预算时丢弃最早的摘要行
+        summary_budget = max(self.token_budget - instruction_tokens - used, 0)
+        lines = self._running_summary(contents[:keep_from])
+        while len(lines) > 1 and count_tokens("\n".join(lines), model) > summary_budget:
+            lines = lines[1:]
+
+        summary = types.Content(role="user", parts=[types.Part(text="\n".join([SUMMARY_HEADER, *lines]))])
+        llm_request.contents = [summary, *contents[keep_from:]]
+        logger.debug(
+            f"上下文压缩: {len(contents)} 条 -> {len(llm_request.contents)} 条 "
+            f"(预算 {self.token_budget}，原文 {used} tokens，折叠 {keep_from} 条)"
+        )
+        return True
+
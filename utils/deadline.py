@@ -0,0 +1,92 @@
+import asyncio
+import os
+import time
+from contextlib import aclosing, contextmanager
+from contextvars import ContextVar
+from typing import AsyncGenerator, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+# 当前上下文的截止时间 (time.monotonic() 时刻)；create_task 会复制上下文，子任务自动继承
+_deadline: ContextVar[Optional[float]] = ContextVar("pm_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """阶段或单次调用超过截止时间"""
+
+
+def parse_deadlines(spec: str) -> dict[str, float]:
+    """解析 "discovery=120,logic_feasibility=600,*=300" 形式的阶段截止时间 (秒) 配置"""
+    deadlines = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        phase, _, seconds = item.rpartition("=")
+        if not phase:
+            raise ValueError(f"无效的截止时间配置: {item!r}，应为 阶段=秒数")
+        deadlines[phase.strip()] = float(seconds)
+    return deadlines
+
+
+def phase_deadline(phase: str) -> Optional[float]:
+    """环境变量 PM_PHASE_DEADLINES 中该阶段的时限 (秒)，"*" 为默认值；未配置返回 None"""
+    deadlines = parse_deadlines(os.getenv("PM_PHASE_DEADLINES", ""))
+    return deadlines.get(phase, deadlines.get("*"))
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[Optional[float]]:
+    """
+    在当前上下文中设置截止时间，与外层截止时间取较早者；seconds 为 None 时沿用外层
+
+    Yields:
+        生效的截止时间 (time.monotonic() 时刻)，没有截止时间时为 None
+    """
+    current = _deadline.get()
+    if seconds is not None:
+        candidate = time.monotonic() + seconds
+        current = candidate if current is None else min(current, candidate)
+    token = _deadline.set(current)
+    try:
+        yield current
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """距当前截止时间的剩余秒数，没有截止时间时返回 None"""
+    current = _deadline.get()
+    return None if current is None else current - time.monotonic()
+
+
+def call_timeout() -> Optional[float]:
+    """单次模型调用的时限：环境变量 LLM_CALL_TIMEOUT (秒) 与剩余截止时间中较小者"""
+    left = remaining()
+    timeouts = [] if left is None else [left]
+    configured = os.getenv("LLM_CALL_TIMEOUT")
+    if configured:
+        timeouts.append(float(configured))
+    return min(timeouts) if timeouts else None
+
+
+async def bounded(stream: AsyncGenerator[T, None], timeout: Optional[float]) -> AsyncGenerator[T, None]:
+    """
+    在 timeout 秒内消费完 stream，超时取消正在等待的分块、关闭 stream 并抛出 DeadlineExceeded
+
+    只限制等待上游的时间，不包括调用方处理每个分块的时间；timeout 为 None 时原样转发
+    """
+    async with aclosing(stream):
+        if timeout is None:
+            async for item in stream:
+                yield item
+            return
+        expires = time.monotonic() + timeout
+        while True:
+            left = expires - time.monotonic()
+            if left <= 0:
+                raise DeadlineExceeded(f"超过截止时间 ({timeout:.1f}s)")
+            try:
+                item = await asyncio.wait_for(anext(stream), left)
+            except StopAsyncIteration:
+                return
+            except TimeoutError:
+                raise DeadlineExceeded(f"超过截止时间 ({timeout:.1f}s)") from None
+            yield item
@@ -0,0 +1,189 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import aclosing
+from typing import AsyncGenerator, Callable, Optional, TypeVar
+
+from .metrics import metrics
+from .tracing import tracer
+
+T = TypeVar("T")
+
+
+class _Pump:
+    """在独立任务中驱动一个流，分块放入队列；取消任务即可在该任务内完整关闭上游生成器"""
+    _DONE = object()
+
+    def __init__(self, stream: AsyncGenerator[T, None], name: str):
+        self.error: Optional[BaseException] = None
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._produce(stream), name=name)
+
+    async def _produce(self, stream: AsyncGenerator[T, None]):
+        try:
+            async with aclosing(stream):
+                async for item in stream:
+                    self.queue.put_nowait(item)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.queue.put_nowait(self._DONE)
+
+    async def cancel(self):
+        if not self.task.done():
+            self.task.cancel()
+        await asyncio.wait([self.task])
+
+
+class HedgePolicy:
+    """
+    对冲请求 (hedged requests)：首个分块迟迟未到时再发一份相同请求，取先响应的一路，取消另一路
+
+    等待阈值取该模型近期首分块耗时的百分位数，样本不足时不对冲。
+    配置在首次使用时从环境变量读取：
+    - LLM_HEDGE: 是否开启，默认关闭
+    - LLM_HEDGE_PERCENTILE: 阈值百分位，默认 95
+    - LLM_HEDGE_MIN_SAMPLES: 开始对冲所需的最少样本数，默认 20
+    - LLM_HEDGE_MIN_DELAY: 阈值下限 (秒)，默认 0.2，避免延迟普遍很低时频繁对冲
+    - LLM_HEDGE_FALLBACK_MODEL: 对冲请求改发的模型，默认与原请求相同
+    """
+
+    WINDOW = 200
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        percentile: Optional[float] = None,
+        min_samples: Optional[int] = None,
+        min_delay: Optional[float] = None,
+        fallback_model: Optional[str] = None,
+    ):
+        self._enabled = enabled
+        self._percentile = percentile
+        self._min_samples = min_samples
+        self._min_delay = min_delay
+        self._fallback_model = fallback_model
+        self._configured = False
+        self._samples: dict[str, deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def _configure(self):
+        if self._configured:
+            return
+        with self._lock:
+            if self._enabled is None:
+                self._enabled = os.getenv("LLM_HEDGE", "off").lower() in ("1", "true", "on")
+            if self._percentile is None:
+                self._percentile = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+            if self._min_samples is None:
+                self._min_samples = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+            if self._min_delay is None:
+                self._min_delay = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.2"))
+            if self._fallback_model is None:
+                self._fallback_model = os.getenv("LLM_HEDGE_FALLBACK_MODEL") or None
+            self._configured = True
+
+    def configure(self, enabled: Optional[bool] = None, **settings):
+        """运行期替换配置，未传入的项重新从环境变量读取"""
+        with self._lock:
+            self._enabled = enabled
+            self._percentile = settings.get("percentile")
+            self._min_samples = settings.get("min_samples")
+            self._min_delay = settings.get("min_delay")
+            self._fallback_model = settings.get("fallback_model")
+            self._configured = False
+
+    @property
+    def enabled(self) -> bool:
+        self._configure()
+        return self._enabled
+
+    def hedge_model(self, model: str) -> str:
+        self._configure()
+        return self._fallback_model or model
+
+    def record(self, model: str, seconds: float):
+        """记录一次上游调用的首分块耗时"""
+        with self._lock:
+            self._samples.setdefault(model, deque(maxlen=self.WINDOW)).append(seconds)
+
+    def delay(self, model: str) -> Optional[float]:
+        """发出对冲请求前的等待时间；未开启或样本不足时返回 None"""
+        self._configure()
+        if not self._enabled:
+            return None
+        with self._lock:
+            samples = sorted(self._samples.get(model, ()))
+        if not samples or len(samples) < self._min_samples:
+            return None
+        # 最近秩百分位：第 ceil(p% * n) 个样本
+        index = min(len(samples) - 1, max(0, math.ceil(self._percentile / 100 * len(samples)) - 1))
+        return max(self._min_delay, samples[index])
+
+    async def race(
+        self,
+        model: str,
+        primary: Callable[[], AsyncGenerator[T, None]],
+        hedge: Callable[[], AsyncGenerator[T, None]],
+    ) -> AsyncGenerator[T, None]:
+        """
+        先发出 primary；delay(model) 秒内没有首个分块时再发出 hedge，转发先产出首个分块 (或先正常结束) 的一路，
+        取消并关闭另一路。先结束的一路失败而另一路仍在进行时继续等待另一路。
+        每路都在独立任务中运行，取消与清理发生在各自任务内。
+        """
+        delay = self.delay(model)
+        started = time.monotonic()
+        pumps = [_Pump(primary(), name=f"llm:{model}")]
+        gets = {asyncio.ensure_future(pumps[0].queue.get()): pumps[0]}
+        winner: Optional[_Pump] = None
+        try:
+            done, _ = await asyncio.wait(gets, timeout=delay)
+            if not done:
+                metrics.increment("llm.hedged", model=model)
+                pumps.append(_Pump(hedge(), name=f"llm-hedge:{model}"))
+                gets[asyncio.ensure_future(pumps[1].queue.get())] = pumps[1]
+            first = None
+            while winner is None:
+                done, _ = await asyncio.wait(gets, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    pump = gets.pop(future)
+                    item = future.result()
+                    if item is _Pump._DONE and pump.error is not None and gets:
+                        continue  # 这一路失败了，另一路仍可能成功
+                    winner, first = pump, item
+                    break
+            for future in gets:
+                future.cancel()
+            await asyncio.gather(*gets, return_exceptions=True)
+
+            # 主请求胜出时记录其首分块耗时；对冲胜出时记录已等待的时间 (主请求耗时的下限)；失败不计入
+            if winner.error is None:
+                self.record(model, time.monotonic() - started)
+            if len(pumps) > 1:
+                outcome = "primary" if winner is pumps[0] else "hedge"
+                metrics.increment("llm.hedge_won", model=model, winner=outcome)
+                span = tracer.current()
+                if span is not None:
+                    span.set(hedged=True, hedge_winner=outcome, hedge_delay=round(delay, 3))
+            for pump in pumps:
+                if pump is not winner:
+                    await pump.cancel()
+
+            item = first
+            while item is not _Pump._DONE:
+                yield item
+                item = await winner.queue.get()
+            if winner.error is not None:
+                raise winner.error
+        finally:
+            for future in gets:
+                future.cancel()
+            for pump in pumps:
+                await pump.cancel()
+
+
+# 全局对冲策略
+hedge_policy = HedgePolicy()
@@ -0,0 +1,149 @@
+import asyncio
+import os
+import threading
+import weakref
+from collections import Counter
+from typing import Optional
+
+import httpx
+
+from .logger import logger
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """响应体读完或关闭时归还主机并发名额 (流式响应在整个 SSE 期间占用连接)"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class PerHostLimitTransport(httpx.AsyncBaseTransport):
+    """
+    在 httpx 连接池之上按主机限制并发请求数
+
+    httpx.Limits 只能限制整个连接池；多个供应商共用一个池时，
+    单个主机的突发流量可能占满连接，这里为每个主机单独设置上限。
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, per_host: int):
+        self._transport = transport
+        self._per_host = per_host
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self.requests: Counter[str] = Counter()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self._per_host))
+        await semaphore.acquire()
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                semaphore.release()
+
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            release()
+            raise
+        self.requests[host] += 1
+        response.stream = _ReleasingStream(response.stream, release)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class HttpClientPool:
+    """
+    模型层共享的 httpx.AsyncClient：长连接复用 + 连接池上限 + 单主机并发上限
+
+    httpx 客户端绑定创建它的事件循环，这里按事件循环各保留一个实例。
+    配置在首次创建时从环境变量读取：
+    - LLM_HTTP_MAX_CONNECTIONS: 连接池总连接数，默认 100
+    - LLM_HTTP_MAX_KEEPALIVE: 空闲长连接数，默认 20
+    - LLM_HTTP_KEEPALIVE_EXPIRY: 空闲长连接保留秒数，默认 120
+    - LLM_HTTP_PER_HOST: 单主机并发请求数，默认 32
+    - LLM_HTTP_TIMEOUT / LLM_HTTP_CONNECT_TIMEOUT: 读超时与建连超时，默认 600 / 10 秒
+    """
+
+    def __init__(self):
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _build() -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "120")),
+        )
+        timeout = httpx.Timeout(
+            float(os.getenv("LLM_HTTP_TIMEOUT", "600")),
+            connect=float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "10")),
+        )
+        transport = PerHostLimitTransport(
+            httpx.AsyncHTTPTransport(limits=limits), per_host=int(os.getenv("LLM_HTTP_PER_HOST", "32"))
+        )
+        return httpx.AsyncClient(transport=transport, timeout=timeout, follow_redirects=True)
+
+    def client(self) -> httpx.AsyncClient:
+        """当前事件循环的共享客户端，不存在时创建"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            with self._lock:
+                client = self._clients.get(loop)
+                if client is None or client.is_closed:
+                    client = self._build()
+                    self._clients[loop] = client
+                    logger.debug(f"创建共享 HTTP 连接池 (event loop {id(loop)})")
+        return client
+
+    def install(self) -> httpx.AsyncClient:
+        """
+        把当前事件循环的客户端交给 LiteLLM (litellm.aclient_session)
+        OpenAI 兼容的供应商在创建 SDK 客户端时会复用它，LiteLLM 自身的客户端缓存过期重建时连接也不会丢失
+        """
+        import litellm
+        client = self.client()
+        if litellm.aclient_session is not client:
+            litellm.aclient_session = client
+        return client
+
+    def stats(self) -> dict[str, int]:
+        """当前事件循环的客户端按主机累计的请求数"""
+        try:
+            client = self._clients.get(asyncio.get_running_loop())
+        except RuntimeError:
+            return {}
+        transport = getattr(client, "_transport", None) if client else None
+        return dict(transport.requests) if isinstance(transport, PerHostLimitTransport) else {}
+
+    async def aclose(self):
+        """关闭当前事件循环的客户端"""
+        client: Optional[httpx.AsyncClient] = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            import litellm
+            if litellm.aclient_session is client:
+                litellm.aclient_session = None
+            await client.aclose()
+
+
+# 全局连接池
+http_pool = HttpClientPool()
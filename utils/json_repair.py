@@ -0,0 +1,77 @@
+import json
+import re
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_DANGLING_KEY = re.compile(r'([{,])\s*"(?:[^"\\]|\\.)*"\s*:?$')
+
+
+def _strip_fence(text: str) -> str:
+    match = _FENCE.search(text)
+    return match.group(1) if match else text
+
+
+def _close_truncated(text: str) -> str:
+    """为截断的 JSON 补全未闭合的字符串与括号，并丢弃悬空的键与逗号"""
+    stack = []
+    in_string = False
+    escape = False
+    for char in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+
+    repaired = (text + '"' if in_string else text).rstrip()
+    if stack and stack[-1] == "}":
+        # 对象中悬空的键 (`"key"` 或 `"key":`) 无法补出合法值，直接丢弃
+        repaired = _DANGLING_KEY.sub(r"\1", repaired)
+    repaired = repaired.rstrip().rstrip(",")
+    return repaired + "".join(reversed(stack))
+
+
+def repair_json(text: str) -> dict:
+    """
+    宽容解析 LLM 产出的 JSON 对象
+
+    依次尝试：直接解析 -> 去掉 Markdown 代码围栏与前后说明文字 -> 去掉尾随逗号 -> 补全截断
+    全部失败时抛出 ValueError
+    """
+    candidates = []
+    body = _strip_fence(text.strip())
+    start = body.find("{")
+    if start == -1:
+        raise ValueError("文本中没有 JSON 对象")
+    body = body[start:]
+    end = body.rfind("}")
+    if end != -1:
+        candidates.append(body[: end + 1])
+    candidates.append(body)
+
+    for candidate in candidates:
+        for attempt in (candidate, _TRAILING_COMMA.sub(r"\1", candidate)):
+            try:
+                value = json.loads(attempt)
+            except ValueError:
+                continue
+            if isinstance(value, dict):
+                return value
+
+    # 截断：补全后再去一次尾随逗号
+    closed = _TRAILING_COMMA.sub(r"\1", _close_truncated(_TRAILING_COMMA.sub(r"\1", body)))
+    try:
+        value = json.loads(closed)
+    except ValueError as e:
+        raise ValueError(f"JSON 修复失败: {e}") from e
+    if not isinstance(value, dict):
+        raise ValueError("JSON 顶层不是对象")
+    return value
@@ -0,0 +1,252 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+# 英文 / 数字按词切分，中文连续片段按字符二元组切分 (无需分词词典)
+_TOKEN = re.compile(r"[a-z0-9]+|[\u4e00-\u9fff]+")
+
+
+def tokenize(text: str) -> Iterator[str]:
+    for run in _TOKEN.findall(text.lower()):
+        if run.isascii():
+            if len(run) > 1:
+                yield run
+        elif len(run) == 1:
+            yield run
+        else:
+            for i in range(len(run) - 1):
+                yield run[i:i + 2]
+
+
+def split_passages(text: str, max_chars: int = 600) -> list[str]:
+    """按空行把文档切成不超过 max_chars 的段落组 (单个超长段落保持完整)，检索以段落组为单位"""
+    passages, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            passages.append(current)
+            current = paragraph
+        else:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        passages.append(current)
+    return passages
+
+
+@dataclass(frozen=True)
+class KnowledgeHit:
+    """
+    一条检索结果
+
+    Attributes:
+        session_id: 来源会话
+        kind: 来源产出的 state key，例如 "researcher_output"
+        text: 段落原文
+        score: 归一化的 BM25 相关度 (0-1)
+    """
+    session_id: str
+    kind: str
+    text: str
+    score: float
+
+
+class KnowledgeIndex:
+    """
+    基于本地 SQLite 倒排表的历史产出索引 (BM25 排序)
+
+    每个会话结束时把调研情报、逻辑蓝图与 PRD 切成段落写入索引 (同一会话重复写入时覆盖)，
+    新会话进入阶段 2 时用需求定义检索相关段落，供 Researcher 复用已有情报、少问重复问题。
+    词频统计在查询时由倒排表现算，写入只涉及本会话的行，索引随会话增量更新。
+    连接在首次使用时才建立，导入本模块不会触碰磁盘。
+    """
+
+    _SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS passages (
+            id         INTEGER PRIMARY KEY,
+            session_id TEXT    NOT NULL,
+            kind       TEXT    NOT NULL,
+            text       TEXT    NOT NULL,
+            length     INTEGER NOT NULL,
+            created_at REAL    NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS passages_session ON passages (session_id)",
+        """
+        CREATE TABLE IF NOT EXISTS postings (
+            term       TEXT    NOT NULL,
+            passage_id INTEGER NOT NULL,
+            tf         INTEGER NOT NULL,
+            PRIMARY KEY (term, passage_id)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS postings_passage ON postings (passage_id)",
+    )
+
+    # BM25 参数
+    K1: float = 1.2
+    B: float = 0.75
+    # 单次查询最多使用的查询词数 (按查询内词频取前若干个)
+    MAX_QUERY_TERMS: int = 256
+
+    def __init__(self, path: str | os.PathLike, top_k: int = 4, min_score: float = 0.15, max_chars: int = 4000):
+        self.path = Path(path)
+        self.top_k = top_k
+        self.min_score = min_score
+        self.max_chars = max_chars
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["KnowledgeIndex"]:
+        """
+        根据环境变量构造索引，PM_KNOWLEDGE_INDEX 设为 off 时关闭
+        - PM_KNOWLEDGE_INDEX: 索引文件，默认项目根目录下的 .pm_state/knowledge.sqlite3
+        - PM_KNOWLEDGE_TOP_K: 每次最多返回的段落数，默认 4
+        - PM_KNOWLEDGE_MIN_SCORE: 归一化相关度下限，默认 0.15
+        - PM_KNOWLEDGE_MAX_CHARS: 注入提示词的总字数上限，默认 4000
+        """
+        path = os.getenv("PM_KNOWLEDGE_INDEX", str(Path(__file__).parent.parent / ".pm_state" / "knowledge.sqlite3"))
+        if path.lower() in ("", "off", "none"):
+            return None
+        return cls(
+            path,
+            top_k=int(os.getenv("PM_KNOWLEDGE_TOP_K", "4")),
+            min_score=float(os.getenv("PM_KNOWLEDGE_MIN_SCORE", "0.15")),
+            max_chars=int(os.getenv("PM_KNOWLEDGE_MAX_CHARS", "4000")),
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in self._SCHEMA:
+                conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    def index_session(self, session_id: str, documents: dict[str, str]) -> int:
+        """
+        写入 (或覆盖) 一个会话的产出
+
+        Args:
+            documents: state key -> 文本，空文本会被跳过
+
+        Returns:
+            写入的段落数
+        """
+        rows = []
+        for kind, text in documents.items():
+            for passage in split_passages(text or ""):
+                terms = Counter(tokenize(passage))
+                if terms:
+                    rows.append((kind, passage, terms))
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "DELETE FROM postings WHERE passage_id IN (SELECT id FROM passages WHERE session_id = ?)",
+                    (session_id,),
+                )
+                conn.execute("DELETE FROM passages WHERE session_id = ?", (session_id,))
+                now = time.time()
+                for kind, passage, terms in rows:
+                    cursor = conn.execute(
+                        "INSERT INTO passages (session_id, kind, text, length, created_at) VALUES (?, ?, ?, ?, ?)",
+                        (session_id, kind, passage, sum(terms.values()), now),
+                    )
+                    conn.executemany(
+                        "INSERT INTO postings VALUES (?, ?, ?)",
+                        [(term, cursor.lastrowid, tf) for term, tf in terms.items()],
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def search(self, query: str, exclude_session: Optional[str] = None) -> list[KnowledgeHit]:
+        """
+        检索与 query 相关的段落，排除 exclude_session 自身的产出
+
+        相关度为 BM25 得分除以全部查询词饱和命中时的得分上限 (按 IDF 加权的覆盖率)，
+        与查询长度无关；只命中个别通用词的段落得分很低，低于 min_score 的结果不返回
+        """
+        counts = Counter(tokenize(query))
+        terms = [term for term, _ in counts.most_common(self.MAX_QUERY_TERMS)]
+        if not terms:
+            return []
+        placeholders = ",".join("?" * len(terms))
+        with self._lock:
+            conn = self._connection()
+            total, average = conn.execute("SELECT COUNT(*), AVG(length) FROM passages").fetchone()
+            if not total:
+                return []
+            document_frequency = dict(conn.execute(
+                f"SELECT term, COUNT(*) FROM postings WHERE term IN ({placeholders}) GROUP BY term", terms
+            ).fetchall())
+            postings = conn.execute(
+                f"SELECT p.term, p.passage_id, p.tf, s.length FROM postings p JOIN passages s ON s.id = p.passage_id "
+                f"WHERE p.term IN ({placeholders}) AND s.session_id != ?",
+                (*terms, exclude_session or ""),
+            ).fetchall()
+
+        idf = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+        if not idf:
+            return []
+        # 段落把全部查询词饱和命中时的得分；索引中未出现的查询词按已出现词的平均 IDF 计入
+        ceiling = (sum(idf.values()) / len(idf)) * len(terms) * (self.K1 + 1)
+        scores: dict[int, float] = {}
+        for term, passage_id, tf, length in postings:
+            norm = self.K1 * (1 - self.B + self.B * length / average)
+            scores[passage_id] = scores.get(passage_id, 0.0) + idf[term] * tf * (self.K1 + 1) / (tf + norm)
+
+        ranked = sorted(
+            ((score / ceiling, passage_id) for passage_id, score in scores.items()), reverse=True
+        )
+        ranked = [(score, passage_id) for score, passage_id in ranked[:self.top_k] if score >= self.min_score]
+        if not ranked:
+            return []
+        ids = [passage_id for _, passage_id in ranked]
+        with self._lock:
+            rows = {
+                row[0]: row[1:]
+                for row in self._connection().execute(
+                    f"SELECT id, session_id, kind, text FROM passages WHERE id IN ({','.join('?' * len(ids))})", ids
+                )
+            }
+        return [KnowledgeHit(*rows[passage_id], score=score) for score, passage_id in ranked if passage_id in rows]
+
+    def render(self, hits: list[KnowledgeHit], labels: Optional[dict[str, str]] = None) -> str:
+        """把检索结果渲染为提示词片段，总长度不超过 max_chars"""
+        labels = labels or {}
+        blocks, used = [], 0
+        for index, hit in enumerate(hits, 1):
+            header = f"### [{index}] {labels.get(hit.kind, hit.kind)} (历史会话 {hit.session_id}，相关度 {hit.score:.2f})"
+            text = hit.text[:max(0, self.max_chars - used - len(header))]
+            if not text:
+                break
+            blocks.append(f"{header}\n{text}")
+            used += len(header) + len(text)
+        return "\n\n".join(blocks)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,222 @@
+import base64
+import enum
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, AsyncGenerator, Callable, Optional
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from .logger import logger
+
+
+class CacheMode(str, enum.Enum):
+    """
+    缓存工作模式
+    - RECORD: 读穿透。命中直接回放，未命中请求供应商并落盘
+    - REPLAY: 只读回放。未命中抛出 LlmCacheMiss，用于离线跑全流程测试
+    - BYPASS: 完全绕过缓存
+    """
+    RECORD = "record"
+    REPLAY = "replay"
+    BYPASS = "bypass"
+
+
+class LlmCacheMiss(LookupError):
+    """REPLAY 模式下未找到缓存条目"""
+
+
+def _stable_default(obj: Any):
+    """json.dumps 的兜底序列化，保证同一请求得到同一字节串"""
+    if isinstance(obj, bytes):
+        return base64.b64encode(obj).decode("ascii")
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if isinstance(obj, type):
+        if hasattr(obj, "model_json_schema"):
+            return obj.model_json_schema()
+        return f"{obj.__module__}.{obj.__qualname__}"
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json", exclude_none=True)
+    return repr(obj)
+
+
+def request_cache_key(llm_request: LlmRequest, model: str, stream: bool) -> str:
+    """
+    计算规范化 LlmRequest 的稳定哈希
+
+    参与哈希的只有决定模型输出的部分：模型名、合并后的 contents、
+    生成配置 (system_instruction / 采样参数 / response_schema / tools) 以及是否流式
+    """
+    config = llm_request.config.model_dump(exclude_none=True, exclude={"http_options", "labels"})
+    payload = {
+        "model": model,
+        "stream": stream,
+        "contents": [content.model_dump(exclude_none=True) for content in llm_request.contents],
+        "config": config,
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=_stable_default)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LlmResponseCache:
+    """
+    内容寻址的磁盘 LLM 响应缓存
+
+    每个条目是 <dir>/<key[:2]>/<key>.jsonl：首行为元数据，其后每行一个 LlmResponse，
+    流式响应按原始分块顺序回放。
+    - TTL 以写入时间计算，过期条目在读取时删除
+    - 容量超限时按最近访问时间 (mtime，命中时刷新) 淘汰最旧条目
+
+    条目大小在内存中增量维护，只在首次访问时扫描一次目录，写入时无需遍历整个缓存。
+    多个进程共享同一目录时，其他进程写入的条目在本进程重启前不计入容量。
+    """
+
+    def __init__(
+        self,
+        directory: str | os.PathLike,
+        mode: CacheMode = CacheMode.RECORD,
+        ttl_seconds: Optional[float] = 7 * 24 * 3600,
+        max_bytes: Optional[int] = 512 * 1024 * 1024,
+    ):
+        self.directory = Path(directory)
+        self.mode = CacheMode(mode)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        # 路径 -> 字节数，按最近访问时间从旧到新排列；首次访问时从磁盘构建
+        self._entries: Optional[OrderedDict[Path, int]] = None
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["LlmResponseCache"]:
+        """
+        根据环境变量构造缓存，BYPASS 模式返回 None
+
+        - LLM_CACHE_MODE: record | replay | bypass，默认 bypass
+        - LLM_CACHE_DIR: 缓存目录，默认项目根目录下的 .llm_cache
+        - LLM_CACHE_TTL: 过期秒数，0 表示永不过期
+        - LLM_CACHE_MAX_BYTES: 容量上限，0 表示不限制
+        """
+        mode = CacheMode(os.getenv("LLM_CACHE_MODE", CacheMode.BYPASS.value).lower())
+        if mode is CacheMode.BYPASS:
+            return None
+        default_dir = Path(__file__).parent.parent / ".llm_cache"
+        ttl = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+        max_bytes = int(os.getenv("LLM_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+        return cls(
+            directory=os.getenv("LLM_CACHE_DIR", default_dir),
+            mode=mode,
+            ttl_seconds=ttl or None,
+            max_bytes=max_bytes or None,
+        )
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.jsonl"
+
+    def _index(self) -> OrderedDict[Path, int]:
+        """条目索引，调用方需持有 _lock"""
+        if self._entries is None:
+            entries = []
+            for path in self.directory.glob("*/*.jsonl"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+            self._entries = OrderedDict((path, size) for _, path, size in sorted(entries))
+            self._total_bytes = sum(self._entries.values())
+        return self._entries
+
+    def _discard(self, path: Path):
+        path.unlink(missing_ok=True)
+        with self._lock:
+            self._total_bytes -= self._index().pop(path, 0)
+
+    def stats(self) -> tuple[int, int]:
+        """返回 (条目数, 总字节数)"""
+        with self._lock:
+            return len(self._index()), self._total_bytes
+
+    def get(self, key: str) -> Optional[list[LlmResponse]]:
+        """读取缓存条目，不存在或已过期返回 None"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                header = json.loads(file.readline())
+                if self.ttl_seconds and time.time() - header["created_at"] > self.ttl_seconds:
+                    self._discard(path)
+                    return None
+                responses = [LlmResponse.model_validate_json(line) for line in file if line.strip()]
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError) as e:
+            # 损坏的条目直接丢弃
+            logger.warning(f"LLM 缓存条目损坏，已删除: {path} ({e})")
+            self._discard(path)
+            return None
+        # 刷新访问时间，作为 LRU 淘汰依据
+        os.utime(path)
+        with self._lock:
+            entries = self._index()
+            if path in entries:
+                entries.move_to_end(path)
+        return responses
+
+    def put(self, key: str, model: str, responses: list[LlmResponse]):
+        """原子写入缓存条目，随后按容量淘汰"""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(json.dumps({"key": key, "model": model, "created_at": time.time()}) + "\n")
+            for response in responses:
+                file.write(response.model_dump_json(exclude_none=True) + "\n")
+        size = tmp_path.stat().st_size
+        with self._lock:
+            entries = self._index()
+            os.replace(tmp_path, path)
+            self._total_bytes += size - entries.pop(path, 0)
+            entries[path] = size
+            self._evict(entries)
+
+    def _evict(self, entries: OrderedDict[Path, int]):
+        """从最久未访问的条目开始淘汰，直到总大小不超过上限；调用方需持有 _lock"""
+        if not self.max_bytes:
+            return
+        while self._total_bytes > self.max_bytes and entries:
+            path, size = entries.popitem(last=False)
+            path.unlink(missing_ok=True)
+            self._total_bytes -= size
+
+    async def wrap(
+        self,
+        key: str,
+        model: str,
+        generate: Callable[[], AsyncGenerator[LlmResponse, None]],
+    ) -> AsyncGenerator[LlmResponse, None]:
+        """
+        命中时逐块回放缓存；未命中时透传上游响应，完整且无错误的响应才会落盘
+        """
+        cached = self.get(key)
+        if cached is not None:
+            logger.debug(f"LLM 缓存命中: {key[:12]} ({model})")
+            for response in cached:
+                yield response
+            return
+
+        if self.mode is CacheMode.REPLAY:
+            raise LlmCacheMiss(f"LLM 缓存未命中 (replay 模式): {key} ({model})")
+
+        recorded = []
+        async for response in generate():
+            recorded.append(response)
+            yield response
+        # 生成器被中途关闭时不会执行到这里，避免缓存残缺响应
+        if recorded and not any(response.error_code for response in recorded):
+            self.put(key, model, recorded)
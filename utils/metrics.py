@@ -0,0 +1,40 @@
+import threading
+from collections import Counter
+
+
+class Metrics:
+    """
+    进程内计数器指标
+
+    以 "名称{标签=值,...}" 为键累计计数，供日志、基准测试与导出器读取快照
+    """
+
+    def __init__(self):
+        self._counters: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> str:
+        if not labels:
+            return name
+        return f"{name}{{{','.join(f'{k}={v}' for k, v in sorted(labels.items()))}}}"
+
+    def increment(self, name: str, value: int = 1, **labels):
+        with self._lock:
+            self._counters[self._key(name, labels)] += value
+
+    def get(self, name: str, **labels) -> int:
+        with self._lock:
+            return self._counters[self._key(name, labels)]
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._counters)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+
+# 全局指标实例
+metrics = Metrics()
@@ -1,7 +1,93 @@
-from . import SafeLiteLlm
-from dotenv import load_dotenv
 import os
-load_dotenv()
-MODEL_NAME = os.getenv("MODEL_NAME")
-# MODEL = "gemini-2.5-flash"
-MODEL = SafeLiteLlm(model=MODEL_NAME)
\ No newline at end of file
+from functools import lru_cache
+from typing import Optional
+from dotenv import load_dotenv
+from .safe_lite_llm import SafeLiteLlm
+
+
+@lru_cache(maxsize=None)
+def get_model_name() -> Optional[str]:
+    """首次调用时才加载 .env，读取默认模型名"""
+    load_dotenv()
+    return os.getenv("MODEL_NAME")
+
+
+@lru_cache(maxsize=None)
+def get_default_model() -> SafeLiteLlm:
+    """全局共享的默认模型客户端，首次使用时创建"""
+    # MODEL = "gemini-2.5-flash"
+    return SafeLiteLlm(model=get_model_name())
+
+
+def __getattr__(name):
+    # 兼容旧的模块级常量 MODEL / MODEL_NAME，导入本模块时不再加载 .env 或创建客户端
+    if name == "MODEL":
+        return get_default_model()
+    if name == "MODEL_NAME":
+        return get_model_name()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _agent_model_overrides() -> dict[str, str]:
+    """解析 AGENT_MODELS="Senior_PM_Auditor=openai/gpt-4o-mini,PRD_Writer=..." 形式的覆盖配置"""
+    overrides = {}
+    for item in filter(None, (part.strip() for part in os.getenv("AGENT_MODELS", "").split(","))):
+        name, _, model_name = item.partition("=")
+        if not model_name:
+            raise ValueError(f"无效的 AGENT_MODELS 配置: {item!r}，应为 智能体名=模型名")
+        overrides[name.strip()] = model_name.strip()
+    return overrides
+
+
+def get_agent_model_name(agent_config: dict) -> Optional[str]:
+    """
+    解析智能体使用的模型名
+    优先级：环境变量 AGENT_MODELS 中的覆盖 > AgentInfo 条目的 "model" > 全局 MODEL_NAME
+    """
+    default = get_model_name()  # 确保 .env 已加载
+    return _agent_model_overrides().get(agent_config["name"]) or agent_config.get("model") or default
+
+
+def get_fast_model_name(agent_config: dict) -> Optional[str]:
+    """
+    级联模式下先行判定的快速模型：AgentInfo 条目的 "fast_model"，否则为环境变量 FAST_MODEL_NAME
+    与主模型相同或都未配置时返回 None (不启用级联)
+    """
+    get_model_name()  # 确保 .env 已加载
+    fast_model = agent_config.get("fast_model") or os.getenv("FAST_MODEL_NAME")
+    if not fast_model or fast_model == get_agent_model_name(agent_config):
+        return None
+    return fast_model
+
+
+def create_model(agent_config: dict, model_name: Optional[str] = None) -> SafeLiteLlm:
+    """
+    为 AgentInfo 中的某个智能体创建模型客户端
+    每个智能体持有独立实例，以便按其 token_budget 压缩上下文；
+    model_name 为空时按 get_agent_model_name 解析
+    """
+    return SafeLiteLlm(
+        model=model_name or get_agent_model_name(agent_config),
+        token_budget=agent_config.get("token_budget"),
+    )
+
+
+def supports_structured_output(model_name: Optional[str] = None) -> bool:
+    """
+    判断模型是否支持结构化输出 (response_schema / json_schema)
+    环境变量 STRUCTURED_OUTPUT=on|off 可强制开关，默认 auto 按 litellm 的模型能力表判断
+    """
+    get_model_name()  # 确保 .env 已加载
+    mode = os.getenv("STRUCTURED_OUTPUT", "auto").lower()
+    if mode in ("on", "off"):
+        return mode == "on"
+    import litellm
+    # 未收录的模型会让 litellm 打印供应商列表提示，这里只需要布尔结果
+    suppress_debug_info = litellm.suppress_debug_info
+    litellm.suppress_debug_info = True
+    try:
+        return bool(litellm.supports_response_schema(model=model_name or get_model_name()))
+    except Exception:
+        return False
+    finally:
+        litellm.suppress_debug_info = suppress_debug_info
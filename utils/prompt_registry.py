@@ -0,0 +1,147 @@
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Union
+
+from .blob_store import blob_store
+
+# 形如 {name} 或 {name?} 的占位符；JSON 示例里的花括号不会匹配
+_PLACEHOLDER = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)(\?)?\}")
+
+VARIABLES_HEADER = "## 运行时变量 (Runtime Variables)\n正文中的【变量名】指代以下取值："
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    编译后的提示词模板
+
+    Attributes:
+        path: 相对于项目根目录的文件路径
+        text: 原始模板文本
+        placeholders: 模板中出现的占位符名称 (按首次出现顺序)
+        optional: 以 {name?} 形式出现、允许缺失的占位符
+        static_text: 占位符替换为【变量名】引用后的静态正文，对所有会话逐字节一致
+        mtime: 编译时文件的修改时间
+    """
+    path: str
+    text: str
+    placeholders: tuple[str, ...]
+    optional: frozenset[str]
+    static_text: str
+    mtime: float
+
+    @classmethod
+    def compile(cls, path: str, text: str, mtime: float) -> "PromptTemplate":
+        placeholders = tuple(dict.fromkeys(match.group(1) for match in _PLACEHOLDER.finditer(text)))
+        optional = frozenset(match.group(1) for match in _PLACEHOLDER.finditer(text) if match.group(2))
+        static_text = _PLACEHOLDER.sub(lambda match: f"【{match.group(1)}】", text)
+        return cls(path, text, placeholders, optional, static_text, mtime)
+
+    def render(self, runtime_keys: Iterable[str] = (), **variables: str) -> str:
+        """
+        渲染为“静态前缀 + 变量后缀”的布局
+
+        大段静态指令保持逐字节一致，放在最前面；本次渲染的变量取值统一追加在末尾，
+        使供应商侧的前缀缓存 (prompt caching) 能跨智能体、跨会话命中。
+
+        Args:
+            runtime_keys: 交给 ADK 在运行时从 session.state 注入的占位符，
+                在后缀中保留为 {key} 形式；{key?} 形式的占位符自动视为运行时占位符
+            **variables: 构建期即可确定的变量取值
+
+        Raises:
+            ValueError: 传入了模板中不存在的变量，或模板中的占位符没有取值
+        """
+        runtime_keys = set(runtime_keys) | self.optional
+        unknown = sorted(set(variables) - set(self.placeholders))
+        if unknown:
+            raise ValueError(f"提示词 {self.path} 中不存在占位符: {unknown}")
+        missing = [name for name in self.placeholders if name not in variables and name not in runtime_keys]
+        if missing:
+            raise ValueError(f"提示词 {self.path} 的占位符缺少取值: {missing}")
+        if not self.placeholders:
+            return self.text
+
+        sections = [self.static_text.rstrip(), "---", VARIABLES_HEADER]
+        for name in self.placeholders:
+            if name in variables:
+                value = variables[name]
+            else:
+                value = f"{{{name}?}}" if name in self.optional else f"{{{name}}}"
+            sections.append(f"### {name}\n{value}")
+        return "\n\n".join(sections) + "\n"
+
+
+class PromptRegistry:
+    """
+    提示词模板注册表：每个文件只读取、解析一次
+
+    开启 hot_reload (环境变量 PROMPT_HOT_RELOAD=1) 时，每次获取都会比较文件 mtime，
+    修改过的模板自动重新编译，便于开发时调整提示词无需重启。
+    """
+
+    def __init__(self, root: Optional[Path] = None, hot_reload: Optional[bool] = None):
+        # 默认以项目根目录（utils 目录的父目录）为基准
+        self.root = root or Path(__file__).parent.parent
+        if hot_reload is None:
+            hot_reload = os.getenv("PROMPT_HOT_RELOAD", "").lower() in ("1", "true", "on")
+        self.hot_reload = hot_reload
+        self._templates: dict[str, PromptTemplate] = {}
+        self._lock = threading.Lock()
+
+    def get(self, prompt_file: str) -> PromptTemplate:
+        """
+        获取编译后的模板
+
+        Raises:
+            FileNotFoundError: 如果文件不存在
+        """
+        template = self._templates.get(prompt_file)
+        if template is not None and not self.hot_reload:
+            return template
+
+        full_path = self.root / prompt_file
+        try:
+            mtime = full_path.stat().st_mtime
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Prompt file not found: {full_path}") from None
+        if template is not None and template.mtime == mtime:
+            return template
+
+        with self._lock:
+            with open(full_path, 'r', encoding='utf-8') as file:
+                template = PromptTemplate.compile(prompt_file, file.read(), mtime)
+            self._templates[prompt_file] = template
+        return template
+
+    def render(self, prompt_file: str, runtime_keys: Iterable[str] = (), **variables: str) -> str:
+        """读取并渲染模板，见 PromptTemplate.render"""
+        return self.get(prompt_file).render(runtime_keys, **variables)
+
+    def instruction(
+        self, prompt_file: str, runtime_keys: Iterable[str] = (), **variables: str
+    ) -> Union[str, Callable]:
+        """
+        生成可直接传给 Agent(instruction=...) 的指令
+
+        默认返回渲染好的字符串；开启 hot_reload 或 blob 存储时返回 InstructionProvider，
+        每次请求都重新渲染 (文件未修改时命中缓存) 并自行注入 session.state，
+        再把注入的 blob 引用展开为原文
+        """
+        runtime_keys = tuple(runtime_keys)
+        if not (self.hot_reload or blob_store.enabled):
+            return self.render(prompt_file, runtime_keys, **variables)
+
+        async def provider(readonly_context) -> str:
+            from google.adk.utils.instructions_utils import inject_session_state
+            text = await inject_session_state(self.render(prompt_file, runtime_keys, **variables), readonly_context)
+            return blob_store.expand(text)
+
+        return provider
+
+
+# 全局提示词注册表
+prompt_registry = PromptRegistry()
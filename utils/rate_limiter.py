@@ -0,0 +1,167 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+from .logger import logger
+
+
+class TokenBucket:
+    """
+    令牌桶：以 rate 个/秒的速度补充令牌，最多积累 capacity 个
+
+    acquire 采用预留方式：先扣减 (可以为负)，再在锁外等待欠下的时间，
+    同一时刻到达的请求按到达顺序依次放行。临界区内没有 await，用线程锁即可跨事件循环使用。
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """预留令牌，返回需要等待的秒数"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+
+
+class AdaptiveRateLimiter:
+    """
+    单个模型的限流器：令牌桶 + 429 自适应退避 (AIMD)
+
+    - 收到 429 时速率减半 (不低于 min_rpm)，并让该模型的所有调用方一起冷却一段时间
+    - 之后每次成功调用把速率加回 recovery_rpm，直到配置的上限
+    - 未配置 rpm 时不做主动限速，只在 429 后冷却与重试
+    """
+
+    def __init__(
+        self,
+        model: str,
+        rpm: Optional[float] = None,
+        max_retries: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        min_rpm: float = 1.0,
+        recovery_rpm: float = 1.0,
+    ):
+        self.model = model
+        self.rpm = rpm
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.min_rpm = min_rpm
+        self.recovery_rpm = recovery_rpm
+        self.current_rpm = rpm
+        self._bucket = TokenBucket(rpm / 60.0) if rpm else None
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """占用一次调用配额，返回需要等待的秒数 (冷却期 + 令牌桶)"""
+        with self._lock:
+            cooldown = max(0.0, self._cooldown_until - time.monotonic())
+        bucket_wait = self._bucket.reserve() if self._bucket else 0.0
+        return max(cooldown, bucket_wait)
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        if self._bucket is None or self.current_rpm >= self.rpm:
+            return
+        with self._lock:
+            self.current_rpm = min(self.rpm, self.current_rpm + self.recovery_rpm)
+            self._bucket.set_rate(self.current_rpm / 60.0)
+
+    def on_rate_limited(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        记录一次 429，返回本次重试前应等待的秒数
+        优先采用服务端的 Retry-After，否则指数退避并加入抖动
+        """
+        delay = retry_after if retry_after is not None else min(
+            self.max_delay, self.base_delay * 2 ** (attempt - 1)
+        ) * random.uniform(0.5, 1.0)
+        with self._lock:
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+            if self._bucket is not None:
+                self.current_rpm = max(self.min_rpm, self.current_rpm / 2)
+                self._bucket.set_rate(self.current_rpm / 60.0)
+        logger.warning(
+            f"模型 {self.model} 触发限流 (第 {attempt} 次)，等待 {delay:.1f}s"
+            + (f"，速率降至 {self.current_rpm:.0f} RPM" if self._bucket is not None else "")
+        )
+        return delay
+
+
+def parse_rate_limits(spec: str) -> dict[str, float]:
+    """解析 "openai/gpt-4o=60,gemini/gemini-2.5-flash=300,*=120" 形式的每分钟请求数配置"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, rpm = item.rpartition("=")
+        if not model:
+            raise ValueError(f"无效的限流配置: {item!r}，应为 模型=每分钟请求数")
+        limits[model.strip()] = float(rpm)
+    return limits
+
+
+class RateLimiterRegistry:
+    """
+    按模型名共享限流器，同一进程内所有会话、所有智能体对同一模型的调用共用一个令牌桶
+
+    配置在首次获取时从环境变量读取 (此时 .env 已加载)：
+    - LLM_RATE_LIMITS: 每个模型的每分钟请求数，"*" 为默认值；未配置则不主动限速
+    - LLM_MAX_RETRIES: 429 后的最大重试次数，默认 4
+    """
+
+    def __init__(self, limits: Optional[dict[str, float]] = None, max_retries: Optional[int] = None):
+        self._limits = limits
+        self._max_retries = max_retries
+        self._limiters: dict[str, AdaptiveRateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model: str) -> AdaptiveRateLimiter:
+        limiter = self._limiters.get(model)
+        if limiter is not None:
+            return limiter
+        with self._lock:
+            if self._limits is None:
+                self._limits = parse_rate_limits(os.getenv("LLM_RATE_LIMITS", ""))
+            if self._max_retries is None:
+                self._max_retries = int(os.getenv("LLM_MAX_RETRIES", "4"))
+            if model not in self._limiters:
+                rpm = self._limits.get(model, self._limits.get("*"))
+                self._limiters[model] = AdaptiveRateLimiter(model, rpm, max_retries=self._max_retries)
+            return self._limiters[model]
+
+    def configure(self, limits: Optional[dict[str, float]] = None, max_retries: Optional[int] = None):
+        """
+        运行期替换配置 (例如批处理入口的命令行参数)，已创建的限流器会被重建
+        未传入的项保持不变 (尚未读取时仍从环境变量读取)
+        """
+        with self._lock:
+            if limits is not None:
+                self._limits = dict(limits)
+            if max_retries is not None:
+                self._max_retries = max_retries
+            self._limiters.clear()
+
+
+# 全局限流器注册表
+rate_limiters = RateLimiterRegistry()
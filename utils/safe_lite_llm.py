@@ -1,18 +1,61 @@
-from typing import AsyncGenerator
+import asyncio
+from typing import AsyncGenerator, Optional
+
+from litellm import RateLimitError
 from google.adk.models.lite_llm import LiteLlm
 from google.adk.models.llm_request import LlmRequest
 from google.adk.models.llm_response import LlmResponse
+from pydantic import PrivateAttr
+from .context_compactor import ContextCompactor
+from .deadline import DeadlineExceeded, bounded, call_timeout
+from .hedging import hedge_policy
+from .http_pool import http_pool
+from .llm_cache import LlmResponseCache, request_cache_key
 from .logger import logger
+from .metrics import metrics
+from .rate_limiter import rate_limiters
+from .singleflight import SingleFlight
+from .tracing import Span, tracer
+
+# 进程内共享：不同智能体、不同会话发出的相同请求合并为一次上游调用
+request_coalescer: SingleFlight[LlmResponse] = SingleFlight.from_env(
+    copy=lambda response: response.model_copy(deep=True)
+)
+
 
 class SafeLiteLlm(LiteLlm):
     """
     LiteLlm 的安全封装，用于自动修复消息历史格式。
     它会在发送请求前合并连续的相同角色消息，以满足严格模型（如 Gemma/Llama）的 Chat Template 要求。
+    配置 token_budget 时，超出预算的较早轮次会被折叠为本地摘要 (ContextCompactor)。
+    合并后的请求可命中磁盘响应缓存 (LlmResponseCache)，默认由 LLM_CACHE_MODE 环境变量控制。
+    相同的进行中请求只发起一次上游调用 (singleflight)，按模型共享令牌桶限流，
+    429 时自适应降速并退避重试 (见 utils.rate_limiter)，HTTP 连接来自共享连接池 (见 utils.http_pool)。
+    调用受当前截止时间 (PMAgentCenter 下发的阶段时限) 与 LLM_CALL_TIMEOUT 约束 (见 utils.deadline)；
+    开启 LLM_HEDGE 时首分块过慢会再发一份请求，取先响应的一路 (见 utils.hedging)。
+    每次调用记录一个 llm 跨度 (token 数、首 token 时间、总耗时、缓存命中)，并按智能体累计 llm.* 指标。
     """
-    async def generate_content_async(
-        self, llm_request: LlmRequest, stream: bool = False
-    ) -> AsyncGenerator[LlmResponse, None]:
-        # 自动合并连续的相同角色消息
+    _cache: Optional[LlmResponseCache] = PrivateAttr(default=None)
+    _compactor: Optional[ContextCompactor] = PrivateAttr(default=None)
+    _coalescer: Optional[SingleFlight] = PrivateAttr(default=None)
+
+    def __init__(
+        self,
+        model: str,
+        cache: Optional[LlmResponseCache] = None,
+        token_budget: Optional[int] = None,
+        coalescer: Optional[SingleFlight] = None,
+        **kwargs,
+    ):
+        # cache / token_budget / coalescer 不能进入 LiteLlm 的 _additional_args，否则会被透传给 acompletion
+        super().__init__(model=model, **kwargs)
+        self._cache = cache if cache is not None else LlmResponseCache.from_env()
+        self._compactor = ContextCompactor(token_budget) if token_budget else None
+        self._coalescer = coalescer if coalescer is not None else request_coalescer
+
+    @staticmethod
+    def _merge_contents(llm_request: LlmRequest):
+        """自动合并连续的相同角色消息"""
         if llm_request.contents:
             merged_contents = []
             for content in llm_request.contents:
@@ -31,6 +74,139 @@ class SafeLiteLlm(LiteLlm):
                         merged_contents.append(content)
             llm_request.contents = merged_contents
 
-        # 调用父类方法执行实际请求
-        async for response in super().generate_content_async(llm_request, stream):
-            yield response
\ No newline at end of file
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self._merge_contents(llm_request)
+
+        # 按智能体的 token 预算压缩较早的轮次；摘要以 user 消息注入，需再合并一次
+        effective_model = llm_request.model or self.model
+        compacted = bool(self._compactor and self._compactor.compact(llm_request, effective_model))
+        if compacted:
+            self._merge_contents(llm_request)
+
+        with tracer.span(effective_model, "llm", stream=stream, compacted=compacted) as span:
+            agent_span = span.nearest("agent")
+            agent_name = agent_span.name if agent_span else "unknown"
+            span.set(agent=agent_name)
+            timeout = call_timeout()
+            if timeout is not None:
+                span.set(timeout=round(timeout, 3))
+                if timeout <= 0:
+                    metrics.increment("llm.deadline_exceeded", agent=agent_name)
+                    raise DeadlineExceeded("截止时间已过，不再发起模型调用")
+            upstream_called = coalesced = False
+            coalesce = self._coalescer is not None and self._coalescer.enabled
+            # 缓存与请求合并共用同一个请求指纹
+            key = request_cache_key(llm_request, effective_model, stream) if self._cache or coalesce else None
+
+            def generate() -> AsyncGenerator[LlmResponse, None]:
+                nonlocal upstream_called, coalesced
+                upstream_called = True
+                if not coalesce:
+                    return self._upstream(llm_request, stream, effective_model)
+                upstream, shared = self._coalescer.join(
+                    key, lambda: self._upstream(llm_request, stream, effective_model)
+                )
+                coalesced = shared
+                if shared:
+                    span.set(coalesced=True)
+                    metrics.increment("llm.coalesced", agent=agent_name)
+                return upstream
+
+            if self._cache is None:
+                responses = generate()
+            else:
+                responses = self._cache.wrap(key, effective_model, generate)
+
+            try:
+                async for response in bounded(responses, timeout):
+                    self._observe(span, response)
+                    yield response
+            except DeadlineExceeded:
+                metrics.increment("llm.deadline_exceeded", agent=agent_name)
+                raise
+            finally:
+                # 合并到进行中调用的等待者没有发起上游请求，单独标记，不计入 miss
+                if coalesced:
+                    cache = "coalesced"
+                elif self._cache is None:
+                    cache = "off"
+                else:
+                    cache = "miss" if upstream_called else "hit"
+                span.set(cache=cache, latency=span.elapsed())
+                metrics.increment("llm.calls", agent=agent_name)
+                if cache == "hit":
+                    metrics.increment("llm.cache_hits", agent=agent_name)
+                for name in ("prompt_tokens", "completion_tokens"):
+                    if span.attributes.get(name):
+                        metrics.increment(f"llm.{name}", span.attributes[name], agent=agent_name)
+
+    def _upstream(self, llm_request: LlmRequest, stream: bool, model: str) -> AsyncGenerator[LlmResponse, None]:
+        """上游调用；开启对冲时以请求副本 (可改发到备用模型) 作为对冲的另一路"""
+        if not hedge_policy.enabled:
+            return self._rate_limited(llm_request, stream, model)
+
+        def hedge() -> AsyncGenerator[LlmResponse, None]:
+            hedge_model = hedge_policy.hedge_model(model)
+            hedge_request = llm_request.model_copy(deep=True)
+            hedge_request.model = hedge_model
+            return self._rate_limited(hedge_request, stream, hedge_model)
+
+        # 两路并发时 LiteLlm 可能改写请求内容，主请求同样使用副本
+        return hedge_policy.race(
+            model, lambda: self._rate_limited(llm_request.model_copy(deep=True), stream, model), hedge
+        )
+
+    async def _rate_limited(
+        self, llm_request: LlmRequest, stream: bool, model: str
+    ) -> AsyncGenerator[LlmResponse, None]:
+        """
+        按模型限流后发起请求；429 且尚未产出任何响应时退避重试
+        已经开始流式输出的请求不重试，避免向上游重复产出内容
+        """
+        limiter = rate_limiters.get(model)
+        attempt = 0
+        while True:
+            await limiter.acquire()
+            http_pool.install()
+            started = False
+            try:
+                async for response in super().generate_content_async(llm_request, stream):
+                    started = True
+                    yield response
+                limiter.on_success()
+                return
+            except RateLimitError as e:
+                if started or attempt >= limiter.max_retries:
+                    raise
+                attempt += 1
+                metrics.increment("llm.rate_limited", model=model)
+                span = tracer.current()
+                if span is not None:
+                    span.set(rate_limited_retries=attempt)
+                await asyncio.sleep(limiter.on_rate_limited(attempt, _retry_after(e)))
+
+    @staticmethod
+    def _observe(span: Span, response: LlmResponse):
+        """记录首 token 时间、token 用量与错误码"""
+        if "ttft" not in span.attributes and response.content and response.content.parts:
+            span.set(ttft=span.elapsed())
+        usage = response.usage_metadata
+        if usage is not None:
+            if usage.prompt_token_count:
+                span.set(prompt_tokens=usage.prompt_token_count)
+            if usage.candidates_token_count:
+                span.set(completion_tokens=usage.candidates_token_count)
+        if response.error_code:
+            span.set(error_code=response.error_code)
+
+
+def _retry_after(error: RateLimitError) -> Optional[float]:
+    """读取 429 响应中的 Retry-After (秒)，没有或无法解析时返回 None"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,101 @@
+import asyncio
+import os
+from typing import AsyncGenerator, Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight(Generic[T]):
+    """一次进行中的上游调用：已产出的分块、完成状态与订阅者计数"""
+
+    def __init__(self):
+        self.items: list[T] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self.condition = asyncio.Condition()
+
+
+class SingleFlight(Generic[T]):
+    """
+    合并相同的进行中请求 (singleflight)
+
+    同一个 key 的第一个调用方启动上游生成器，之后到达的调用方直接订阅同一个流：
+    每个订阅者都从第一个分块开始回放，再跟随后续分块。上游由后台任务驱动，
+    不受任何单个订阅者提前退出的影响；最后一个订阅者退出时才取消上游。
+    上游完成 (或失败) 后立即移除，之后相同的请求重新发起。
+    """
+
+    def __init__(self, enabled: bool = True, copy: Optional[Callable[[T], T]] = None):
+        self.enabled = enabled
+        # 订阅者拿到的分块副本，避免多个消费者修改同一个对象
+        self._copy = copy
+        self._flights: dict[tuple[int, str], _Flight[T]] = {}
+
+    @classmethod
+    def from_env(cls, copy: Optional[Callable[[T], T]] = None) -> "SingleFlight[T]":
+        """LLM_SINGLEFLIGHT=off 关闭合并，默认开启"""
+        enabled = os.getenv("LLM_SINGLEFLIGHT", "on").lower() not in ("0", "off", "false")
+        return cls(enabled, copy)
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    def join(self, key: str, factory: Callable[[], AsyncGenerator[T, None]]) -> tuple[AsyncGenerator[T, None], bool]:
+        """
+        订阅 key 对应的上游流，不存在时用 factory 启动
+
+        Returns:
+            (分块流, 是否合并到了已有的调用)
+        """
+        # httpx 客户端与 asyncio 原语都绑定事件循环，不同事件循环之间不合并
+        flight_key = (id(asyncio.get_running_loop()), key)
+        flight = self._flights.get(flight_key)
+        shared = flight is not None
+        if flight is None:
+            flight = _Flight()
+            self._flights[flight_key] = flight
+            flight.task = asyncio.create_task(self._produce(flight_key, flight, factory), name=f"singleflight:{key[:12]}")
+        flight.subscribers += 1
+        return self._subscribe(flight_key, flight, copy=shared), shared
+
+    async def _produce(self, flight_key, flight: _Flight[T], factory: Callable[[], AsyncGenerator[T, None]]):
+        try:
+            async for item in factory():
+                async with flight.condition:
+                    flight.items.append(item)
+                    flight.condition.notify_all()
+        except BaseException as e:
+            flight.error = e
+            if not isinstance(e, (Exception, asyncio.CancelledError)):
+                raise
+        finally:
+            if self._flights.get(flight_key) is flight:
+                del self._flights[flight_key]
+            async with flight.condition:
+                flight.done = True
+                flight.condition.notify_all()
+
+    async def _subscribe(self, flight_key, flight: _Flight[T], copy: bool) -> AsyncGenerator[T, None]:
+        index = 0
+        try:
+            while True:
+                async with flight.condition:
+                    await flight.condition.wait_for(lambda: index < len(flight.items) or flight.done)
+                    items = flight.items[index:]
+                    finished = flight.done
+                index += len(items)
+                for item in items:
+                    yield self._copy(item) if copy and self._copy else item
+                if finished and index >= len(flight.items):
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # 所有订阅者都已离开 (例如审计结论已明确)，取消上游生成
+                if self._flights.get(flight_key) is flight:
+                    del self._flights[flight_key]
+                flight.task.cancel()
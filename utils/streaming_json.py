@@ -0,0 +1,126 @@
+import json
+from typing import Any
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_SCALAR_END = ",}] \t\r\n"
+
+
+class IncrementalJsonParser:
+    """
+    增量 JSON 解析器：边接收流式文本边提取顶层对象中已经完整的标量字段
+
+    - 自动跳过首个 '{' 之前的内容 (如 ```json 围栏、说明文字)
+    - 只提取顶层的字符串 / 数字 / 布尔 / null 字段；嵌套对象与数组会被跳过
+    - 每个字符只扫描一次，总开销与文本长度线性相关
+
+    用法：
+        parser = IncrementalJsonParser()
+        for chunk in stream:
+            parser.feed(chunk)
+            if "verdict" in parser.fields:
+                ...
+    """
+
+    def __init__(self):
+        self.fields: dict[str, Any] = {}
+        self.closed = False  # 顶层对象是否已闭合
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._depth = 0  # 嵌套容器深度 (顶层对象内部为 0)
+        self._in_string = False
+        self._escape = False
+        self._unicode = ""  # 正在读取的 \uXXXX
+        self._token: list[str] = []  # 当前字符串或标量的内容
+        self._token_kind = ""  # "key" | "string" | "scalar" | "nested" | ""
+        self._key = None  # 最近读到的顶层 key
+        self._expect_value = False
+
+    def feed(self, chunk: str) -> dict[str, Any]:
+        """追加一段文本，返回当前已解析出的字段"""
+        self._buffer += chunk
+        while self._pos < len(self._buffer) and not self.closed:
+            self._step(self._buffer[self._pos])
+            self._pos += 1
+        return self.fields
+
+    def _step(self, char: str):
+        if not self._started:
+            if char == "{":
+                self._started = True
+            return
+
+        if self._in_string:
+            self._consume_string_char(char)
+            return
+
+        if self._token_kind == "scalar":
+            if char not in _SCALAR_END:
+                self._token.append(char)
+                return
+            self._finish_scalar()
+
+        if char == '"':
+            self._in_string = True
+            self._token = []
+            if self._depth > 0:
+                self._token_kind = "nested"
+            elif self._expect_value:
+                self._token_kind = "string"
+            else:
+                self._token_kind = "key"
+        elif char in "{[":
+            self._depth += 1
+        elif char in "}]":
+            if self._depth == 0:
+                self.closed = True
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._expect_value = False
+        elif char == ":" and self._depth == 0:
+            self._expect_value = True
+        elif char == "," and self._depth == 0:
+            self._expect_value = False
+        elif self._depth == 0 and self._expect_value and not char.isspace():
+            self._token_kind = "scalar"
+            self._token = [char]
+
+    def _consume_string_char(self, char: str):
+        if self._unicode:
+            self._unicode += char
+            if len(self._unicode) == 5:
+                self._token.append(chr(int(self._unicode[1:], 16)))
+                self._unicode = ""
+            return
+        if self._escape:
+            self._escape = False
+            if char == "u":
+                self._unicode = "u"
+            else:
+                self._token.append(_ESCAPES.get(char, char))
+            return
+        if char == "\\":
+            self._escape = True
+        elif char == '"':
+            self._in_string = False
+            # 还原 \uXXXX 代理对
+            value = "".join(self._token).encode("utf-16", "surrogatepass").decode("utf-16")
+            if self._token_kind == "key":
+                self._key = value
+            elif self._token_kind == "string":
+                self.fields[self._key] = value
+                self._expect_value = False
+            self._token_kind = ""
+        else:
+            self._token.append(char)
+
+    def _finish_scalar(self):
+        raw = "".join(self._token)
+        try:
+            self.fields[self._key] = json.loads(raw)
+        except ValueError:
+            self.fields[self._key] = raw
+        self._token_kind = ""
+        self._token = []
+        self._expect_value = False
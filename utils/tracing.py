@@ -0,0 +1,252 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from logging.handlers import RotatingFileHandler
+from typing import AsyncGenerator, Iterator, Optional, Protocol, TypeVar
+
+from .logger import logger
+
+T = TypeVar("T")
+
+# 跨度层级，由外到内
+SPAN_KINDS = ("session", "phase", "agent", "llm")
+
+# 当前协程/任务所在的跨度；asyncio.create_task 会复制上下文，子任务自动继承父跨度
+_current_span: ContextVar[Optional["Span"]] = ContextVar("pm_current_span", default=None)
+
+
+@dataclass
+class Span:
+    """
+    一段被追踪的执行区间
+
+    Attributes:
+        name: 跨度名称 (智能体名、阶段名或模型名)
+        kind: session / phase / agent / llm
+        trace_id: 所属追踪，同一次编排调用内的全部跨度共享
+        span_id: 跨度 ID
+        parent_id: 父跨度 ID，根跨度为 None
+        sampled: 是否被采样导出；由根跨度决定，子跨度继承
+        start_time: 开始时间 (Unix 时间戳，秒)
+        duration: 持续时间 (秒)，结束后填写
+        status: ok / error / cancelled
+        attributes: 附加属性 (token 数、TTFT、缓存命中、审计结论等)
+    """
+    name: str
+    kind: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    sampled: bool
+    start_time: float
+    duration: Optional[float] = None
+    status: str = "ok"
+    error: Optional[str] = None
+    attributes: dict = field(default_factory=dict)
+    parent: Optional["Span"] = field(default=None, repr=False, compare=False)
+    _started: float = field(default_factory=time.perf_counter, repr=False, compare=False)
+
+    def set(self, **attributes) -> "Span":
+        self.attributes.update(attributes)
+        return self
+
+    def elapsed(self) -> float:
+        """距跨度开始经过的秒数"""
+        return time.perf_counter() - self._started
+
+    def nearest(self, kind: str) -> Optional["Span"]:
+        """沿父链查找最近的指定类型跨度 (包含自身)"""
+        span = self
+        while span is not None and span.kind != kind:
+            span = span.parent
+        return span
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter(Protocol):
+    def export(self, span: Span) -> None: ...
+
+
+class InMemoryExporter:
+    """进程内导出器：保留最近 max_spans 个跨度，供基准测试与调试读取"""
+
+    def __init__(self, max_spans: int = 10000):
+        self._spans: deque[Span] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+
+    @property
+    def spans(self) -> list[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+class JsonlExporter:
+    """
+    JSONL 文件导出器：每个跨度一行，文件超过 max_bytes 时轮转 (保留 backup_count 份)
+    轮转与并发写入交给标准库 RotatingFileHandler
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        # 独立的 logger，不向根 logger 传播
+        self._logger = logging.getLogger(f"{__name__}.jsonl.{uuid.uuid4().hex[:8]}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._logger.addHandler(handler)
+        self._handler = handler
+
+    def export(self, span: Span):
+        self._logger.info(json.dumps(span.to_dict(), ensure_ascii=False, default=str))
+
+    def close(self):
+        self._logger.removeHandler(self._handler)
+        self._handler.close()
+
+
+class Tracer:
+    """
+    轻量追踪器：session -> phase -> agent -> llm 四级跨度
+
+    跨度始终会创建 (供 SafeLiteLlm 等按当前智能体归集指标)，
+    只有配置了导出器且根跨度被采样时才会导出。
+    """
+
+    def __init__(self, exporter: Optional[SpanExporter] = None, sample_rate: float = 1.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        """
+        从环境变量读取配置：
+        - TRACE_EXPORTER: off (默认) / memory / jsonl
+        - TRACE_FILE: jsonl 文件路径，默认 .pm_state/traces.jsonl
+        - TRACE_SAMPLE_RATE: 根跨度采样率 0-1，默认 1
+        - TRACE_MAX_BYTES / TRACE_BACKUP_COUNT: 轮转阈值与保留份数
+        """
+        kind = os.getenv("TRACE_EXPORTER", "off").lower()
+        sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "1"))
+        if kind == "memory":
+            return cls(InMemoryExporter(), sample_rate)
+        if kind == "jsonl":
+            exporter = JsonlExporter(
+                os.getenv("TRACE_FILE", os.path.join(".pm_state", "traces.jsonl")),
+                max_bytes=int(os.getenv("TRACE_MAX_BYTES", str(10 * 1024 * 1024))),
+                backup_count=int(os.getenv("TRACE_BACKUP_COUNT", "5")),
+            )
+            return cls(exporter, sample_rate)
+        if kind not in ("off", ""):
+            logger.warning(f"未知的 TRACE_EXPORTER={kind}，追踪导出已关闭")
+        return cls(None, sample_rate)
+
+    def configure(self, exporter: Optional[SpanExporter] = None, sample_rate: Optional[float] = None) -> "Tracer":
+        """运行期替换导出器或采样率 (例如基准测试改用进程内导出)"""
+        self.exporter = exporter
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        return self
+
+    @staticmethod
+    def current() -> Optional[Span]:
+        return _current_span.get()
+
+    @contextmanager
+    def span(self, name: str, kind: str, **attributes) -> Iterator[Span]:
+        """开启一个跨度并设为当前跨度；异常会记录到跨度后继续抛出"""
+        parent = _current_span.get()
+        if parent is None:
+            trace_id = uuid.uuid4().hex
+            sampled = self.sample_rate >= 1 or random.random() < self.sample_rate
+        else:
+            trace_id, sampled = parent.trace_id, parent.sampled
+        span = Span(
+            name=name,
+            kind=kind,
+            trace_id=trace_id,
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent else None,
+            sampled=sampled,
+            start_time=time.time(),
+            attributes=attributes,
+            parent=parent,
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except GeneratorExit:
+            # 事件流被上游提前关闭 (例如审计结论已明确)
+            span.status = "cancelled"
+            raise
+        except BaseException as e:
+            span.status = "cancelled" if type(e).__name__ == "CancelledError" else "error"
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = span.elapsed()
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # 异步生成器在另一个上下文中被关闭时 token 无法复用
+                _current_span.set(parent)
+            if sampled and self.exporter is not None:
+                try:
+                    self.exporter.export(span)
+                except Exception as e:
+                    logger.warning(f"跨度导出失败: {e}")
+
+    async def trace_events(
+        self, events: AsyncGenerator[T, None], name: str, kind: str, **attributes
+    ) -> AsyncGenerator[T, None]:
+        """
+        在跨度内消费一个事件流 (例如 agent.run_async(ctx))，并记录事件数与首事件时间
+        事件流的生成器体在首次迭代时才执行，因此其中的 LLM 调用都归属于该跨度
+        """
+        with self.span(name, kind, **attributes) as span:
+            count = 0
+            try:
+                async for event in events:
+                    if count == 0:
+                        span.set(ttfe=span.elapsed())
+                    count += 1
+                    yield event
+            finally:
+                span.set(events=count)
+                await events.aclose()
+
+
+# 全局追踪器
+tracer = Tracer.from_env()